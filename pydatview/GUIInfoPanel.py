@@ -5,9 +5,11 @@ import numpy as np
 try:
     from .common import *
     from .GUICommon import *
+    from .plotdata import statsMultiplePD
 except:
     from common import *
     from GUICommon import *
+    from plotdata import statsMultiplePD
 import os
 # --------------------------------------------------------------------------------}
 # --- InfoPanel 
@@ -91,10 +93,15 @@ class InfoPanel(wx.Panel):
         self.ColsReg.append({'name':'Meas 1'       , 'al':'R' , 'm':'meas1'  , 's' :False})
         self.ColsReg.append({'name':'Meas 2'       , 'al':'R' , 'm':'meas2'  , 's' :False})
         self.ColsReg.append({'name':'Mean (Meas)'  , 'al':'R' , 'm':'yMeanMeas'  , 's' :False})
+        self.ColsReg.append({'name':'Std (Meas)'   , 'al':'R' , 'm':'yStdMeas'  , 's' :False})
         self.ColsReg.append({'name':'Min (Meas)'   , 'al':'R' , 'm':'yMinMeas'  , 's' :False})
         self.ColsReg.append({'name':'Max (Meas)'   , 'al':'R' , 'm':'yMaxMeas'  , 's' :False})
         self.ColsReg.append({'name':'x@Min (Meas)' , 'al':'R' , 'm':'xAtYMinMeas'  , 's' :False})
         self.ColsReg.append({'name':'x@Max (Meas)' , 'al':'R' , 'm':'xAtYMaxMeas'  , 's' :False})
+        self.ColsReg.append({'name':'Mean (Zoom)'  , 'al':'R' , 'm':'yMeanZoom'  , 's' :False})
+        self.ColsReg.append({'name':'Std (Zoom)'   , 'al':'R' , 'm':'yStdZoom'  , 's' :False})
+        self.ColsReg.append({'name':'Min (Zoom)'   , 'al':'R' , 'm':'yMinZoom'  , 's' :False})
+        self.ColsReg.append({'name':'Max (Zoom)'   , 'al':'R' , 'm':'yMaxZoom'  , 's' :False})
         self.ColsReg.append({'name':'xMin'         , 'al':'R' , 'm':'xMin'  , 's' :False})
         self.ColsReg.append({'name':'xMax'         , 'al':'R' , 'm':'xMax'  , 's' :False})
         self.ColsReg.append({'name':'xRange'       , 'al':'R' , 'm':'xRange', 's' :False})
@@ -135,14 +142,20 @@ class InfoPanel(wx.Panel):
         self.ColsFFT.append({'name':'nSeg(FFT)'     , 'al':'R' , 'f':lambda x:x.Info('LSeg')  , 's' :False})
         self.ColsFFT.append({'name':'nWin(FFT)'     , 'al':'R' , 'f':lambda x:x.Info('LWin')  , 's' :False})
         self.ColsFFT.append({'name':'nFFT(FFT)'     , 'al':'R' , 'f':lambda x:x.Info('nFFT')  , 's' :False})
+        self.ColsFFT.append({'name':'nDecim(FFT)'   , 'al':'R' , 'f':lambda x:x.Info('nDecim'), 's' :False})
         self.ColsFFT.append({'name':'n(FFT)'        , 'al':'R' , 'm':'ylen'  , 's' :True})
         self.ColsFFT.append({'name':'Meas 1'        , 'al':'R' , 'm':'meas1'  , 's' :False})
         self.ColsFFT.append({'name':'Meas 2'        , 'al':'R' , 'm':'meas2'  , 's' :False})
         self.ColsFFT.append({'name':'Mean (Meas)'   , 'al':'R' , 'm':'yMeanMeas'  , 's' :False})
+        self.ColsFFT.append({'name':'Std (Meas)'    , 'al':'R' , 'm':'yStdMeas'  , 's' :False})
         self.ColsFFT.append({'name':'Min (Meas)'    , 'al':'R' , 'm':'yMinMeas'  , 's' :False})
         self.ColsFFT.append({'name':'Max (Meas)'    , 'al':'R' , 'm':'yMaxMeas'  , 's' :False})
         self.ColsFFT.append({'name':'x@Min (Meas)'  , 'al':'R' , 'm':'xAtYMinMeas'  , 's' :False})
         self.ColsFFT.append({'name':'x@Max (Meas)'  , 'al':'R' , 'm':'xAtYMaxMeas'  , 's' :False})
+        self.ColsFFT.append({'name':'Mean (Zoom)'   , 'al':'R' , 'm':'yMeanZoom'  , 's' :False})
+        self.ColsFFT.append({'name':'Std (Zoom)'    , 'al':'R' , 'm':'yStdZoom'  , 's' :False})
+        self.ColsFFT.append({'name':'Min (Zoom)'    , 'al':'R' , 'm':'yMinZoom'  , 's' :False})
+        self.ColsFFT.append({'name':'Max (Zoom)'    , 'al':'R' , 'm':'yMaxZoom'  , 's' :False})
         self.ColsFFT.append({'name':'n     '        , 'al':'R' , 'm':'n0'    , 's' :True})
         self.ColsMinMax=[]
         self.ColsMinMax.append({'name':'Directory'                  , 'al':'L' , 'm':'baseDir', 's':False})
@@ -180,10 +193,15 @@ class InfoPanel(wx.Panel):
         self.ColsPDF.append({'name':'Meas 1'        , 'al':'R' , 'm':'meas1'  , 's' :False})
         self.ColsPDF.append({'name':'Meas 2'        , 'al':'R' , 'm':'meas2'  , 's' :False})
         self.ColsPDF.append({'name':'Mean (Meas)'   , 'al':'R' , 'm':'yMeanMeas'  , 's' :False})
+        self.ColsPDF.append({'name':'Std (Meas)'    , 'al':'R' , 'm':'yStdMeas'  , 's' :False})
         self.ColsPDF.append({'name':'Min (Meas)'    , 'al':'R' , 'm':'yMinMeas'  , 's' :False})
         self.ColsPDF.append({'name':'Max (Meas)'    , 'al':'R' , 'm':'yMaxMeas'  , 's' :False})
         self.ColsPDF.append({'name':'x@Min (Meas)'  , 'al':'R' , 'm':'xAtYMinMeas'  , 's' :False})
         self.ColsPDF.append({'name':'x@Max (Meas)'  , 'al':'R' , 'm':'xAtYMaxMeas'  , 's' :False})
+        self.ColsPDF.append({'name':'Mean (Zoom)'   , 'al':'R' , 'm':'yMeanZoom'  , 's' :False})
+        self.ColsPDF.append({'name':'Std (Zoom)'    , 'al':'R' , 'm':'yStdZoom'  , 's' :False})
+        self.ColsPDF.append({'name':'Min (Zoom)'    , 'al':'R' , 'm':'yMinZoom'  , 's' :False})
+        self.ColsPDF.append({'name':'Max (Zoom)'    , 'al':'R' , 'm':'yMaxZoom'  , 's' :False})
         self.ColsPDF.append({'name':'n(PDF)'        , 'al':'R' , 'm':'ylen'  , 's' :True})
         self.ColsCmp=[]
         self.ColsCmp.append({'name':'Directory' , 'al':'L' , 'm':'baseDir' , 's':False})
@@ -195,6 +213,54 @@ class InfoPanel(wx.Panel):
         self.ColsCmp.append({'name':'Min(Cmp)'  , 'al':'R' , 'm':'yMin'   , 's' :True})
         self.ColsCmp.append({'name':'Max(Cmp)'  , 'al':'R' , 'm':'yMax'   , 's' :True})
         self.ColsCmp.append({'name':'n(Cmp)'    , 'al':'R' , 'm':'ylen'   , 's' :True})
+        self.ColsSpc=[]
+        self.ColsSpc.append({'name':'Directory'     , 'al':'L' , 'm':'baseDir'  , 's':False})
+        self.ColsSpc.append({'name':'Filename'      , 'al':'L' , 'm':'fileName' , 's':False})
+        self.ColsSpc.append({'name':'Table'         , 'al':'L' , 'm':'tabName'  , 's':False})
+        self.ColsSpc.append({'name':'Column'        , 'al':'L' , 'm':'yName'    , 's':True})
+        self.ColsSpc.append({'name':'Mean f(peak)'  , 'al':'R' , 'm':'yMean'    , 's' :True})
+        self.ColsSpc.append({'name':'Min f(peak)'   , 'al':'R' , 'm':'yMin'     , 's' :True})
+        self.ColsSpc.append({'name':'Max f(peak)'   , 'al':'R' , 'm':'yMax'     , 's' :True})
+        self.ColsSpc.append({'name':'dt(Spec)'      , 'al':'R' , 'm':'dx'       , 's' :True})
+        self.ColsSpc.append({'name':'nOvlp(Spec)'   , 'al':'R' , 'f':lambda x:x.Info('LOvlp') , 's' :False})
+        self.ColsSpc.append({'name':'nFFT(Spec)'    , 'al':'R' , 'f':lambda x:x.Info('nFFT')  , 's' :True})
+        self.ColsSpc.append({'name':'n(Spec)'       , 'al':'R' , 'm':'ylen'     , 's' :True})
+        self.ColsSpc.append({'name':'n     '        , 'al':'R' , 'm':'n0'       , 's' :True})
+
+        self.ColsCross=[]
+        self.ColsCross.append({'name':'Directory'    , 'al':'L' , 'm':'baseDir'  , 's':False})
+        self.ColsCross.append({'name':'Filename'     , 'al':'L' , 'm':'fileName' , 's':False})
+        self.ColsCross.append({'name':'Table'        , 'al':'L' , 'm':'tabName'  , 's':False})
+        self.ColsCross.append({'name':'Column'       , 'al':'L' , 'm':'yName'    , 's':True})
+        self.ColsCross.append({'name':'Mean'         , 'al':'R' , 'm':'yMean'    , 's' :True})
+        self.ColsCross.append({'name':'Max'          , 'al':'R' , 'm':'yMax'     , 's' :True})
+        self.ColsCross.append({'name':'x@Max'        , 'al':'R' , 'm':'xAtYMax'  , 's' :True})
+        self.ColsCross.append({'name':'df(Cross)'    , 'al':'R' , 'm':'dx'       , 's' :False})
+        self.ColsCross.append({'name':'nOvlp(Cross)' , 'al':'R' , 'f':lambda x:x.Info('LOvlp') , 's' :False})
+        self.ColsCross.append({'name':'nFFT(Cross)'  , 'al':'R' , 'f':lambda x:x.Info('nFFT')  , 's' :True})
+        self.ColsCross.append({'name':'n(Cross)'     , 'al':'R' , 'm':'ylen'     , 's' :True})
+        self.ColsMkv=[]
+        self.ColsMkv.append({'name':'Directory'    , 'al':'L' , 'm':'baseDir'  , 's':False})
+        self.ColsMkv.append({'name':'Filename'     , 'al':'L' , 'm':'fileName' , 's':False})
+        self.ColsMkv.append({'name':'Table'        , 'al':'L' , 'm':'tabName'  , 's':True})
+        self.ColsMkv.append({'name':'Column'       , 'al':'L' , 'm':'yName'    , 's':True})
+        self.ColsMkv.append({'name':'Cycles'       , 'al':'R' , 'f':lambda x:x.Info('nCycles') , 's' :True})
+        self.ColsMkv.append({'name':'Max range'    , 'al':'R' , 'm':'yMax'     , 's' :True})
+        self.ColsMkv.append({'name':'Min mean'     , 'al':'R' , 'm':'xMin'     , 's' :False})
+        self.ColsMkv.append({'name':'Max mean'     , 'al':'R' , 'm':'xMax'     , 's' :False})
+        self.ColsMkv.append({'name':'n(Mean bins)' , 'al':'R' , 'm':'ylen'     , 's' :False})
+        self.ColsEns=[]
+        self.ColsEns.append({'name':'Directory'  , 'al':'L' , 'm':'baseDir'   , 's':False})
+        self.ColsEns.append({'name':'Filename'   , 'al':'L' , 'm':'fileName'  , 's':False})
+        self.ColsEns.append({'name':'Table'      , 'al':'L' , 'm':'tabName'   , 's':True})
+        self.ColsEns.append({'name':'Column'     , 'al':'L' , 'm':'yName'     , 's':True})
+        self.ColsEns.append({'name':'n tables'   , 'al':'R' , 'm':'ensN'      , 's' :True})
+        self.ColsEns.append({'name':'Mean'       , 'al':'R' , 'm':'yMean'     , 's' :True})
+        self.ColsEns.append({'name':'Std'        , 'al':'R' , 'm':'yStd'      , 's' :False})
+        self.ColsEns.append({'name':'Std(Ens)'   , 'al':'R' , 'm':'ensStdMean', 's' :True})
+        self.ColsEns.append({'name':'Min(Ens)'   , 'al':'R' , 'm':'ensMin'    , 's' :True})
+        self.ColsEns.append({'name':'Max(Ens)'   , 'al':'R' , 'm':'ensMax'    , 's' :True})
+        self.ColsEns.append({'name':'n'          , 'al':'R' , 'm':'ylen'      , 's' :True})
 
         self.menuReg=ColCheckMenu(self)
         self.menuReg.setColumns(self.ColsReg)
@@ -206,6 +272,14 @@ class InfoPanel(wx.Panel):
         self.menuMinMax.setColumns(self.ColsMinMax)
         self.menuCmp=ColCheckMenu(self)
         self.menuCmp.setColumns(self.ColsCmp)
+        self.menuSpc=ColCheckMenu(self)
+        self.menuSpc.setColumns(self.ColsSpc)
+        self.menuCross=ColCheckMenu(self)
+        self.menuCross.setColumns(self.ColsCross)
+        self.menuMkv=ColCheckMenu(self)
+        self.menuMkv.setColumns(self.ColsMkv)
+        self.menuEns=ColCheckMenu(self)
+        self.menuEns.setColumns(self.ColsEns)
 
         self.Cols=self.ColsReg
         self.menu=self.menuReg
@@ -214,6 +288,7 @@ class InfoPanel(wx.Panel):
         self.last_sub = False
         self.meas_xy1 = (None, None)
         self.meas_xy2 = (None, None)
+        self.zoom_xlim = None
 
         self.tbStats = TestListCtrl(self, size=(-1,100),
                          style=wx.LC_REPORT
@@ -295,6 +370,18 @@ class InfoPanel(wx.Panel):
         elif plotType=='Compare':
             self.menu=self.menuCmp
             self.Cols=self.ColsCmp
+        elif plotType=='Spectrogram':
+            self.menu=self.menuSpc
+            self.Cols=self.ColsSpc
+        elif plotType=='Cross':
+            self.menu=self.menuCross
+            self.Cols=self.ColsCross
+        elif plotType=='Markov':
+            self.menu=self.menuMkv
+            self.Cols=self.ColsMkv
+        elif plotType=='Ensemble':
+            self.menu=self.menuEns
+            self.Cols=self.ColsEns
         elif plotType=='FFT':
             self.menu=self.menuFFT
             self.Cols=self.ColsFFT
@@ -313,6 +400,8 @@ class InfoPanel(wx.Panel):
             for i,c in enumerate(selCols):
                 if c['s']:
                     self.tbStats.InsertColumn(i,c['name'], AL[c['al']])
+        # Range statistics (mean, std, min, max...) of all series at once
+        statsMultiplePD(self.PD)
         # Inserting items
         index = self.tbStats.GetItemCount()
         for PD in self.PD:
@@ -321,6 +410,8 @@ class InfoPanel(wx.Panel):
                 if 'm' in c.keys():
                     if c['m'] in ('meas1', 'meas2'):
                         v,sv=getattr(PD,c['m'])(self.meas_xy1, self.meas_xy2)
+                    elif c['m'].endswith('Zoom'):
+                        v,sv=getattr(PD,c['m'])(self.zoom_xlim)
                     else:
                         v,sv=getattr(PD,c['m'])()
                 else:
@@ -463,11 +554,17 @@ class InfoPanel(wx.Panel):
                 self.menu.setItem(col, True)
                 self.setCol(col, True)
         elif xy1 is None:
-            for col in ['Meas 1', 'Meas 2', 'Mean (Meas)', 'Min (Meas)', 'Max (Meas)']:
+            for col in ['Meas 1', 'Meas 2', 'Mean (Meas)', 'Std (Meas)', 'Min (Meas)', 'Max (Meas)']:
                 self.menu.setItem(col, False)
                 self.setCol(col, False)
         self._showStats()
 
+    def setZoomWindow(self, xlim):
+        """ Set the x-limits used by the "(Zoom)" columns, refresh the table if they are shown """
+        self.zoom_xlim = xlim
+        if any([c['s'] and c.get('m','').endswith('Zoom') for c in self.Cols]):
+            self._showStats()
+
     def clean(self):
         self.tbStats.DeleteAllItems()
         self.tbStats.DeleteAllColumns()
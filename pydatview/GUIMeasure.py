@@ -52,20 +52,26 @@ class GUIMeasure:
         x_closest = self.x
         y_closest = self.y
         rdist_min = 1e9
+        curves = []
         for line in ax.get_lines():
             # TODO: check if 'if'can be avoided by using len(PD):
             if str(line).startswith('Line2D(_line') is False:
-                xy = np.array([line.get_xdata(), line.get_ydata()]).transpose()
-                try:
-                    x, y = find_closest(xy, [self.x, self.y])
-                    rdist = abs(x - self.x) + abs(y - self.y)
-                    if rdist < rdist_min:
-                        rdist_min = rdist
-                        x_closest = x
-                        y_closest = y
-                except (TypeError,ValueError):
-                    # Fails when x/y data are dates or strings 
-                    pass
+                curves.append(np.array([line.get_xdata(), line.get_ydata()]).transpose())
+        for coll in ax.collections:
+            # Curves drawn at once as a LineCollection
+            if hasattr(coll, 'get_segments'):
+                curves += coll.get_segments()
+        for xy in curves:
+            try:
+                x, y = find_closest(xy, [self.x, self.y])
+                rdist = abs(x - self.x) + abs(y - self.y)
+                if rdist < rdist_min:
+                    rdist_min = rdist
+                    x_closest = x
+                    y_closest = y
+            except (TypeError,ValueError):
+                # Fails when x/y data are dates or strings 
+                pass
         self.x = x_closest
         self.y = y_closest
 
@@ -37,7 +37,7 @@ from pandas.plotting import register_matplotlib_converters
 import gc
 
 from .common import * # unique, CHAR
-from .plotdata import PlotData, compareMultiplePD
+from .plotdata import PlotData, compareMultiplePD, statsMultiplePD, ensembleMultiplePD, fftMultiplePD, crossMultiplePD, markovMultiplePD
 from .GUICommon import * 
 from .GUIToolBox import MyMultiCursor, MyNavigationToolbar2Wx, TBAddTool, TBAddCheckTool
 from .GUIMeasure import GUIMeasure
@@ -47,6 +47,9 @@ font = {'size'   : 8}
 matplotlib_rc('font', **font)
 pyplot_rc['agg.path.chunksize'] = 20000
 
+# Above this number of curves on one axis, the curves are drawn as one LineCollection
+N_LINE_COLLECTION = 50
+
 
 class PDFCtrlPanel(wx.Panel):
     def __init__(self, parent):
@@ -104,6 +107,82 @@ class CompCtrlPanel(wx.Panel):
         self.parent.load_and_draw(); # DATA HAS CHANGED
 
 
+class EnsembleCtrlPanel(wx.Panel):
+    def __init__(self, parent):
+        super(EnsembleCtrlPanel,self).__init__(parent)
+        self.parent   = parent
+        lb = wx.StaticText( self, -1, 'Percentiles:')
+        self.cbBand = wx.ComboBox(self, choices=['5-95','10-90','25-75'] , style=wx.CB_READONLY)
+        self.cbBand.SetSelection(0)
+        self.cbMinMax = wx.CheckBox(self, -1, 'Min-Max',(10,10))
+        self.cbMedian = wx.CheckBox(self, -1, 'Median',(10,10))
+        self.cbMinMax.SetValue(True)
+        self.cbMedian.SetValue(False)
+        dummy_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        dummy_sizer.Add(lb             ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbBand    ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbMinMax  ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        dummy_sizer.Add(self.cbMedian  ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        self.SetSizer(dummy_sizer)
+        self.Bind(wx.EVT_COMBOBOX, self.onEnsembleChange)
+        self.Bind(wx.EVT_CHECKBOX, self.onEnsembleChange)
+        self.Hide() 
+
+    def percentiles(self):
+        lo, hi = self.cbBand.GetValue().split('-')
+        return [float(lo), 50, float(hi)]
+
+    def onEnsembleChange(self,event=None):
+        self.parent.load_and_draw(); # DATA HAS CHANGED
+
+
+class CrossSpectraCtrlPanel(wx.Panel):
+    def __init__(self, parent):
+        super(CrossSpectraCtrlPanel,self).__init__(parent)
+        self.parent   = parent
+        lb = wx.StaticText( self, -1, 'Cross-spectra:')
+        self.cbType = wx.ComboBox(self, choices=['Coherence','|H1|','Phase H1','|CSD|'] , style=wx.CB_READONLY)
+        self.cbType.SetSelection(0)
+        lbRef = wx.StaticText( self, -1, '(reference: first signal selected, window and 2^n from the spectral options)')
+        dummy_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        dummy_sizer.Add(lb         ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbType,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(lbRef      ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        self.SetSizer(dummy_sizer)
+        self.Bind(wx.EVT_COMBOBOX, self.onTypeChange)
+        self.Hide() 
+
+    def onTypeChange(self,event=None):
+        self.parent.load_and_draw(); # DATA HAS CHANGED
+
+
+class MarkovCtrlPanel(wx.Panel):
+    def __init__(self, parent):
+        super(MarkovCtrlPanel,self).__init__(parent)
+        self.parent   = parent
+        lbA = wx.StaticText( self, -1, 'Range bins:')
+        lbM = wx.StaticText( self, -1, 'Mean bins:')
+        self.cbAmpl = wx.ComboBox(self, choices=['10','20','50','100'] , style=wx.CB_READONLY)
+        self.cbMean = wx.ComboBox(self, choices=['1','10','20','50','100'] , style=wx.CB_READONLY)
+        self.cbAmpl.SetSelection(1)
+        self.cbMean.SetSelection(2)
+        self.cbMerge = wx.CheckBox(self, -1, 'Sum tables',(10,10))
+        self.cbMerge.SetValue(False)
+        dummy_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        dummy_sizer.Add(lbA          ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbAmpl  ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(lbM          ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        dummy_sizer.Add(self.cbMean  ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbMerge ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        self.SetSizer(dummy_sizer)
+        self.Bind(wx.EVT_COMBOBOX, self.onMarkovChange)
+        self.Bind(wx.EVT_CHECKBOX, self.onMarkovChange)
+        self.Hide() 
+
+    def onMarkovChange(self,event=None):
+        self.parent.load_and_draw(); # DATA HAS CHANGED
+
+
 class SpectralCtrlPanel(wx.Panel):
     def __init__(self, parent):
         super(SpectralCtrlPanel,self).__init__(parent)
@@ -125,10 +204,16 @@ class SpectralCtrlPanel(wx.Panel):
         lbMaxFreq     = wx.StaticText( self, -1, 'Xlim:')
         self.tMaxFreq = wx.TextCtrl(self,size = (30,-1),style=wx.TE_PROCESS_ENTER)
         self.tMaxFreq.SetValue("-1")
+        self.cbZoom    = wx.CheckBox(self, -1, 'Zoom',(10,10))
+        self.cbZoom.SetToolTip(wx.ToolTip('Compute the spectrum only up to Xlim, on the decimated signal (finer resolution)'))
         self.cbDetrend = wx.CheckBox(self, -1, 'Detrend',(10,10))
         lbX = wx.StaticText( self, -1, 'x:')
         self.cbTypeX = wx.ComboBox(self, choices=['1/x','2pi/x','x'] , style=wx.CB_READONLY)
         self.cbTypeX.SetSelection(0)
+        lbBins = wx.StaticText( self, -1, 'Bins:')
+        self.cbBins = wx.ComboBox(self, choices=['All','10/dec','20/dec','50/dec','100/dec'] , style=wx.CB_READONLY)
+        self.cbBins.SetSelection(0)
+        self.cbBins.SetToolTip(wx.ToolTip('Average the spectrum in logarithmically spaced frequency bins'))
         # Layout
         dummy_sizer = wx.BoxSizer(wx.HORIZONTAL)
         dummy_sizer.Add(lb                    ,0, flag = wx.CENTER|wx.LEFT,border = 1)
@@ -142,18 +227,27 @@ class SpectralCtrlPanel(wx.Panel):
         dummy_sizer.Add(self.lbWinLength      ,0, flag = wx.CENTER|wx.LEFT,border = 1)
         dummy_sizer.Add(lbMaxFreq             ,0, flag = wx.CENTER|wx.LEFT,border = 6)
         dummy_sizer.Add(self.tMaxFreq         ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(self.cbZoom           ,0, flag = wx.CENTER|wx.LEFT,border = 3)
         dummy_sizer.Add(lbX                   ,0, flag = wx.CENTER|wx.LEFT,border = 6)
         dummy_sizer.Add(self.cbTypeX          ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(lbBins                ,0, flag = wx.CENTER|wx.LEFT,border = 6)
+        dummy_sizer.Add(self.cbBins           ,0, flag = wx.CENTER|wx.LEFT,border = 1)
         dummy_sizer.Add(self.cbDetrend        ,0, flag = wx.CENTER|wx.LEFT,border = 7)
         self.SetSizer(dummy_sizer)
         self.Bind(wx.EVT_COMBOBOX  ,self.onSpecCtrlChange)
         self.Bind(wx.EVT_TEXT      ,self.onP2ChangeText  ,self.scP2     )
         self.Bind(wx.EVT_TEXT_ENTER,self.onXlimChange    ,self.tMaxFreq )
         self.Bind(wx.EVT_CHECKBOX  ,self.onDetrendChange ,self.cbDetrend)
+        self.Bind(wx.EVT_CHECKBOX  ,self.onZoomChange    ,self.cbZoom   )
         self.Hide() 
 
     def onXlimChange(self,event=None):
-        self.parent.redraw_same_data();
+        if self.cbZoom.IsChecked():
+            self.parent.load_and_draw() # Data changes
+        else:
+            self.parent.redraw_same_data();
+    def onZoomChange(self,event=None):
+        self.parent.load_and_draw() # Data changes
     def onSpecCtrlChange(self,event=None):
         self.parent.load_and_draw() # Data changes
     def onDetrendChange(self,event=None):
@@ -167,6 +261,30 @@ class SpectralCtrlPanel(wx.Panel):
     def updateP2(self,P2):
         self.lbWinLength.SetLabel("({})".format(2**P2))
 
+    def zoomFreq(self):
+        """ Maximum frequency of the zoom spectrum, from Xlim, or None if the full spectrum is to be computed """
+        if not self.cbZoom.IsChecked():
+            return None
+        try:
+            xlim = float(self.tMaxFreq.GetLineText(0))
+        except:
+            return None
+        if xlim<=0:
+            return None
+        xType = self.cbTypeX.GetStringSelection()
+        if xType=='1/x':
+            return xlim
+        elif xType=='2pi/x':
+            return xlim/(2*np.pi)
+        return None # Xlim is a period
+
+    def nPerDecade(self):
+        """ Number of log-spaced frequency bins per decade, None for all the frequencies """
+        s = self.cbBins.GetStringSelection()
+        if s=='All' or len(s)==0:
+            return None
+        return int(s.split('/')[0])
+
 
 
 
@@ -183,19 +301,31 @@ class PlotTypePanel(wx.Panel):
         self.cbFFT     = wx.RadioButton(self, -1, 'FFT'    ,                 )
         self.cbMinMax  = wx.RadioButton(self, -1, 'MinMax' ,                 )
         self.cbCompare = wx.RadioButton(self, -1, 'Compare',                 )
+        self.cbEnsemble= wx.RadioButton(self, -1, 'Ensemble',                )
+        self.cbSpectro = wx.RadioButton(self, -1, 'Spectrogram',             )
+        self.cbCross   = wx.RadioButton(self, -1, 'Cross-spectra',           )
+        self.cbMarkov  = wx.RadioButton(self, -1, 'Markov',                  )
         self.cbRegular.SetValue(True)
         self.Bind(wx.EVT_RADIOBUTTON, self.pdf_select    , self.cbPDF    )
         self.Bind(wx.EVT_RADIOBUTTON, self.fft_select    , self.cbFFT    )
         self.Bind(wx.EVT_RADIOBUTTON, self.minmax_select , self.cbMinMax )
         self.Bind(wx.EVT_RADIOBUTTON, self.compare_select, self.cbCompare)
         self.Bind(wx.EVT_RADIOBUTTON, self.regular_select, self.cbRegular)
+        self.Bind(wx.EVT_RADIOBUTTON, self.ensemble_select, self.cbEnsemble)
+        self.Bind(wx.EVT_RADIOBUTTON, self.spectro_select, self.cbSpectro)
+        self.Bind(wx.EVT_RADIOBUTTON, self.cross_select  , self.cbCross  )
+        self.Bind(wx.EVT_RADIOBUTTON, self.markov_select , self.cbMarkov )
         # LAYOUT
-        cb_sizer  = wx.FlexGridSizer(rows=5, cols=1, hgap=0, vgap=0)
+        cb_sizer  = wx.FlexGridSizer(rows=9, cols=1, hgap=0, vgap=0)
         cb_sizer.Add(self.cbRegular , 0, flag=wx.ALL, border=1)
         cb_sizer.Add(self.cbPDF     , 0, flag=wx.ALL, border=1)
         cb_sizer.Add(self.cbFFT     , 0, flag=wx.ALL, border=1)
         cb_sizer.Add(self.cbMinMax  , 0, flag=wx.ALL, border=1)
         cb_sizer.Add(self.cbCompare , 0, flag=wx.ALL, border=1)
+        cb_sizer.Add(self.cbEnsemble, 0, flag=wx.ALL, border=1)
+        cb_sizer.Add(self.cbSpectro , 0, flag=wx.ALL, border=1)
+        cb_sizer.Add(self.cbCross   , 0, flag=wx.ALL, border=1)
+        cb_sizer.Add(self.cbMarkov  , 0, flag=wx.ALL, border=1)
         self.SetSizer(cb_sizer)
 
     def plotType(self):
@@ -208,6 +338,14 @@ class PlotTypePanel(wx.Panel):
             plotType='FFT'
         elif self.cbCompare.GetValue():
             plotType='Compare'
+        elif self.cbEnsemble.GetValue():
+            plotType='Ensemble'
+        elif self.cbSpectro.GetValue():
+            plotType='Spectrogram'
+        elif self.cbCross.GetValue():
+            plotType='Cross'
+        elif self.cbMarkov.GetValue():
+            plotType='Markov'
         return plotType
 
     def regular_select(self, event=None):
@@ -218,7 +356,10 @@ class PlotTypePanel(wx.Panel):
         self.parent.pdfPanel.Hide();
         self.parent.cmpPanel.Hide();
         self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
         self.parent.slEsth.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
         self.parent.plotsizer.Layout()
         #
         self.parent.load_and_draw() # Data changes
@@ -230,6 +371,9 @@ class PlotTypePanel(wx.Panel):
         self.parent.spcPanel.Hide();
         self.parent.pdfPanel.Hide();
         self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
         self.parent.plotsizer.Layout()
         self.parent.load_and_draw() # Data changes
 
@@ -239,6 +383,9 @@ class PlotTypePanel(wx.Panel):
         self.parent.cbLogY.SetValue(self.cbFFT.GetValue())
         self.parent.pdfPanel.Hide();
         self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
         self.parent.plotsizer.Layout()
         self.parent.load_and_draw() # Data changes
 
@@ -250,6 +397,9 @@ class PlotTypePanel(wx.Panel):
         self.parent.spcPanel.Hide();
         self.parent.cmpPanel.Hide();
         self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
         self.parent.plotsizer.Layout()
         self.parent.load_and_draw() # Data changes
 
@@ -260,6 +410,64 @@ class PlotTypePanel(wx.Panel):
         self.parent.spcPanel.Hide();
         self.parent.pdfPanel.Hide();
         self.parent.cmpPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
+        self.parent.plotsizer.Layout()
+        self.parent.load_and_draw() # Data changes
+
+    def spectro_select(self, event=None):
+        self.clear_measures()
+        self.parent.cbLogX.SetValue(False)
+        self.parent.cbLogY.SetValue(False)
+        self.parent.show_hide(self.parent.spcPanel, self.cbSpectro.GetValue())
+        self.parent.pdfPanel.Hide();
+        self.parent.cmpPanel.Hide();
+        self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
+        self.parent.plotsizer.Layout()
+        self.parent.load_and_draw() # Data changes
+
+    def cross_select(self, event=None):
+        self.clear_measures()
+        self.parent.cbLogX.SetValue(False)
+        self.parent.cbLogY.SetValue(False)
+        self.parent.show_hide(self.parent.spcPanel  , self.cbCross.GetValue())
+        self.parent.show_hide(self.parent.crossPanel, self.cbCross.GetValue())
+        self.parent.pdfPanel.Hide();
+        self.parent.cmpPanel.Hide();
+        self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.mkvPanel.Hide();
+        self.parent.plotsizer.Layout()
+        self.parent.load_and_draw() # Data changes
+
+    def markov_select(self, event=None):
+        self.clear_measures()
+        self.parent.cbLogX.SetValue(False)
+        self.parent.cbLogY.SetValue(False)
+        self.parent.show_hide(self.parent.mkvPanel, self.cbMarkov.GetValue())
+        self.parent.spcPanel.Hide();
+        self.parent.pdfPanel.Hide();
+        self.parent.cmpPanel.Hide();
+        self.parent.mmxPanel.Hide();
+        self.parent.ensPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.plotsizer.Layout()
+        self.parent.load_and_draw() # Data changes
+
+    def ensemble_select(self, event=None):
+        self.clear_measures()
+        self.parent.cbLogY.SetValue(False)
+        self.parent.show_hide(self.parent.ensPanel, self.cbEnsemble.GetValue())
+        self.parent.spcPanel.Hide();
+        self.parent.pdfPanel.Hide();
+        self.parent.cmpPanel.Hide();
+        self.parent.mmxPanel.Hide();
+        self.parent.crossPanel.Hide();
+        self.parent.mkvPanel.Hide();
         self.parent.plotsizer.Layout()
         self.parent.load_and_draw() # Data changes
 
@@ -291,6 +499,10 @@ class EstheticsPanel(wx.Panel):
         lbMS = wx.StaticText( self, -1, 'Marker size:')
         self.cbMS= wx.ComboBox(self, choices=['0.5','1','2','3','4','5','6','7','8'] , style=wx.CB_READONLY)
         self.cbMS.SetSelection(2)
+        lbCBar = wx.StaticText( self, -1, 'Colorbar:')
+        self.cbColorBar = wx.ComboBox(self, choices=['None','Table index','Number in table name'] , style=wx.CB_READONLY)
+        self.cbColorBar.SetSelection(0)
+        self.cbColorBar.SetToolTip(wx.ToolTip('Colors used when many curves are plotted at once (more than {})'.format(N_LINE_COLLECTION)))
 
         # Layout
         #dummy_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -305,6 +517,8 @@ class EstheticsPanel(wx.Panel):
         dummy_sizer.Add(self.cbLegend         ,0, flag = wx.CENTER|wx.LEFT,border = 1)
         dummy_sizer.Add(lbLgdFont             ,0, flag = wx.CENTER|wx.LEFT,border = 5)
         dummy_sizer.Add(self.cbLgdFont        ,0, flag = wx.CENTER|wx.LEFT,border = 1)
+        dummy_sizer.Add(lbCBar                ,0, flag = wx.CENTER|wx.LEFT,border = 5)
+        dummy_sizer.Add(self.cbColorBar       ,0, flag = wx.CENTER|wx.LEFT,border = 1)
         self.SetSizer(dummy_sizer)
         self.Hide()
         # Callbacks
@@ -398,6 +612,9 @@ class PlotPanel(wx.Panel):
         self.pdfPanel = PDFCtrlPanel(self)
         self.cmpPanel = CompCtrlPanel(self)
         self.mmxPanel = MinMaxPanel(self)
+        self.ensPanel = EnsembleCtrlPanel(self)
+        self.crossPanel = CrossSpectraCtrlPanel(self)
+        self.mkvPanel = MarkovCtrlPanel(self)
         # --- Esthetics panel
         self.esthPanel = EstheticsPanel(self)
 
@@ -494,15 +711,21 @@ class PlotPanel(wx.Panel):
         plotsizer.Add(self.pdfPanel ,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
         plotsizer.Add(self.cmpPanel ,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
         plotsizer.Add(self.mmxPanel ,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
+        plotsizer.Add(self.ensPanel ,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
+        plotsizer.Add(self.crossPanel,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
+        plotsizer.Add(self.mkvPanel ,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
         plotsizer.Add(self.slEsth   ,0,flag = wx.EXPAND,border = 0)
         plotsizer.Add(self.esthPanel,0,flag = wx.EXPAND|wx.CENTER|wx.TOP|wx.BOTTOM,border = 10)
         plotsizer.Add(self.slCtrl   ,0,flag = wx.EXPAND,border = 0)
         plotsizer.Add(row_sizer     ,0,flag = wx.EXPAND|wx.NORTH ,border = 2)
 
-        self.show_hide(self.spcPanel, self.pltTypePanel.cbFFT.GetValue())
+        self.show_hide(self.spcPanel, self.pltTypePanel.cbFFT.GetValue() or self.pltTypePanel.cbSpectro.GetValue() or self.pltTypePanel.cbCross.GetValue())
+        self.show_hide(self.crossPanel, self.pltTypePanel.cbCross.GetValue())
         self.show_hide(self.cmpPanel, self.pltTypePanel.cbCompare.GetValue())
         self.show_hide(self.pdfPanel, self.pltTypePanel.cbPDF.GetValue())
         self.show_hide(self.mmxPanel, self.pltTypePanel.cbMinMax.GetValue())
+        self.show_hide(self.ensPanel, self.pltTypePanel.cbEnsemble.GetValue())
+        self.show_hide(self.mkvPanel, self.pltTypePanel.cbMarkov.GetValue())
 
         self.SetSizer(plotsizer)
         self.plotsizer=plotsizer;
@@ -721,16 +944,19 @@ class PlotPanel(wx.Panel):
             raise e # Used to be Warn
 
     def setPD_FFT(self,pd):
-        """ Convert plot data to FFT data based on GUI options"""
+        """ Convert plot data (or a list of plot data) to FFT data based on GUI options"""
         yType      = self.spcPanel.cbType.GetStringSelection()
         xType      = self.spcPanel.cbTypeX.GetStringSelection()
         avgMethod  = self.spcPanel.cbAveraging.GetStringSelection()
         avgWindow  = self.spcPanel.cbAveragingMethod.GetStringSelection()
         bDetrend   = self.spcPanel.cbDetrend.IsChecked()
         nExp       = self.spcPanel.scP2.GetValue()
+        fMax       = self.spcPanel.zoomFreq()
+        nPerDecade = self.spcPanel.nPerDecade()
         # Convert plotdata to FFT data
         try:
-            Info = pd.toFFT(yType=yType, xType=xType, avgMethod=avgMethod, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp) 
+            PD = pd if isinstance(pd, list) else [pd]
+            Info = fftMultiplePD(PD, yType=yType, xType=xType, avgMethod=avgMethod, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp, fMax=fMax, nPerDecade=nPerDecade) 
             # Trigger
             if hasattr(Info,'nExp') and Info.nExp!=nExp:
                 self.spcPanel.scP2.SetValue(Info.nExp)
@@ -741,6 +967,20 @@ class PlotPanel(wx.Panel):
             raise e
 
 
+    def setPD_Spectrogram(self,pd):
+        """ Convert plot data to a spectrogram based on GUI options (window length, window and detrend) """
+        avgWindow  = self.spcPanel.cbAveragingMethod.GetStringSelection()
+        bDetrend   = self.spcPanel.cbDetrend.IsChecked()
+        nExp       = self.spcPanel.scP2.GetValue()
+        # Map downsampled to the screen resolution
+        nTimeMax, nFreqMax = [int(v) for v in self.fig.get_size_inches()*self.fig.dpi]
+        try:
+            pd.toSpectrogram(avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp, nTimeMax=max(nTimeMax,10), nFreqMax=max(nFreqMax,10))
+        except Exception as e:
+            self.spcPanel.Hide();
+            self.plotsizer.Layout()
+            raise e
+
     def transformPlotData(self,PD):
         """" 
         Apply MinMax, PDF or FFT transform to plot based on GUI data
@@ -752,6 +992,8 @@ class PlotPanel(wx.Panel):
             self.setPD_PDF(PD,PD.c)  
         elif plotType=='FFT':
             self.setPD_FFT(PD) 
+        elif plotType=='Spectrogram':
+            self.setPD_Spectrogram(PD) 
 
     def getPlotData(self,plotType):
         ID,SameCol,selMode=self.selPanel.getPlotDataSelection()
@@ -764,14 +1006,20 @@ class PlotPanel(wx.Panel):
                 # Initialize each plotdata based on selected table and selected id channels
                 pd=PlotData();
                 pd.fromIDs(tabs,i,idx,SameCol, self.plotDataOptions) 
+                self.plotData.append(pd)
+            # Statistics of the original data, computed for all channels at once
+            statsMultiplePD(self.plotData)
+            for pd in self.plotData:
                 # Possible change of data
                 if plotType=='MinMax':
                     self.setPD_MinMax(pd) 
                 elif plotType=='PDF':
                     self.setPD_PDF(pd,pd.c)  
-                elif plotType=='FFT':
-                    self.setPD_FFT(pd) 
-                self.plotData.append(pd)
+                elif plotType=='Spectrogram':
+                    self.setPD_Spectrogram(pd)
+            if plotType=='FFT':
+                # Channels sharing the same x are transformed at once
+                self.setPD_FFT(self.plotData) 
         except Exception as e:
             self.plotData=[]
             raise e
@@ -785,6 +1033,37 @@ class PlotPanel(wx.Panel):
             self.pltTypePanel.cbRegular.SetValue(True)
             raise e
 
+    def PD_Cross(self):
+        """ Cross-spectra between the first selected PlotData and the others, returns new plotData (one per response) """
+        yType      = self.crossPanel.cbType.GetStringSelection()
+        avgWindow  = self.spcPanel.cbAveragingMethod.GetStringSelection()
+        bDetrend   = self.spcPanel.cbDetrend.IsChecked()
+        nExp       = self.spcPanel.scP2.GetValue()
+        try:
+            self.plotData = crossMultiplePD(self.plotData, yType=yType, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp)
+        except Exception as e:
+            self.pltTypePanel.cbRegular.SetValue(True)
+            raise e
+
+    def PD_Markov(self):
+        """ Markov (range-mean) cycle matrices of the selected PlotData, returns new plotData """
+        nAmpl  = int(self.mkvPanel.cbAmpl.GetStringSelection())
+        nMean  = int(self.mkvPanel.cbMean.GetStringSelection())
+        bMerge = self.mkvPanel.cbMerge.IsChecked()
+        try:
+            self.plotData = markovMultiplePD(self.plotData, nAmpl=nAmpl, nMean=nMean, bMerge=bMerge)
+        except Exception as e:
+            self.pltTypePanel.cbRegular.SetValue(True)
+            raise e
+
+    def PD_Ensemble(self):
+        """ Ensemble statistics of the selected PlotData, returns new plotData (one per column) """
+        try:
+            self.plotData = ensembleMultiplePD(self.plotData, percentiles=self.ensPanel.percentiles())
+        except Exception as e:
+            self.pltTypePanel.cbRegular.SetValue(True)
+            raise e
+
     def _onPlotMatrixLeftClick(self, event):
         """Toggle plot-states from None, to left-axis, to right-axis.
             Left-click goes forwards, right-click goes backwards.
@@ -843,7 +1122,7 @@ class PlotPanel(wx.Panel):
         tight=False
 
         plotType=self.pltTypePanel.plotType()
-        if plotType in ['FFT','Compare']:
+        if plotType in ['FFT','Compare','Ensemble','Spectrogram','Cross','Markov']:
             axis.autoscale(True, axis='both', tight=tight)
             return
         vXString=[PDs[i].xIsString for i in axis.iPD]
@@ -899,6 +1178,7 @@ class PlotPanel(wx.Panel):
         plot_options = dict()
         plot_options['lw']=float(self.esthPanel.cbLW.Value)
         plot_options['ms']=float(self.esthPanel.cbMS.Value)
+        plot_options['ColorBar']=self.esthPanel.cbColorBar.Value
         if self.cbCurveType.Value=='Plain':
             plot_options['LineStyles'] = ['-']
             plot_options['Markers']    = ['']
@@ -982,6 +1262,13 @@ class PlotPanel(wx.Panel):
                         ax_left.invert_xaxis()
                 except:
                     pass
+            elif self.pltTypePanel.cbSpectro.GetValue():
+                try:
+                    flim=float(self.spcPanel.tMaxFreq.GetLineText(0))
+                    if flim>0:
+                        ax_left.set_ylim([0,flim])
+                except:
+                    pass
             elif self.cbAutoScale.IsChecked() is False and keep_limits:
                 self._restore_limits()
 
@@ -1066,6 +1353,14 @@ class PlotPanel(wx.Panel):
         bXHair = self.cbXHair.GetValue()
         self.multiCursors = MyMultiCursor(self.canvas, tuple(self.fig.axes), useblit=True, horizOn=bXHair, vertOn=bXHair, color='gray', linewidth=0.5, linestyle=':')
 
+        # --- Statistics of the zoom window, updated live when the x-limits change (zoom/pan)
+        self.infoPanel.zoom_xlim = axes[0].get_xlim()
+        for ax in axes:
+            ax.callbacks.connect('xlim_changed', self.onXlimChanged)
+
+    def onXlimChanged(self, ax):
+        self.infoPanel.setZoomWindow(ax.get_xlim())
+
     def plotSignals(self, ax, axis_idx, PD, pm, left_right, is_step, opts):
         axis = None
         bAllNeg = True
@@ -1074,7 +1369,7 @@ class PlotPanel(wx.Panel):
         else:
             loop_range = range(len(PD))
 
-        iPlot=-1
+        PDPlot=[]
         for signal_idx in loop_range:
             do_plot = False
             if left_right == 1 and (pm is None or pm[signal_idx][axis_idx] == left_right):
@@ -1089,7 +1384,17 @@ class PlotPanel(wx.Panel):
                     axis._get_lines.prop_cycler = ax._get_lines.prop_cycler
             pd=PD[signal_idx]
             if do_plot:
-                iPlot+=1 
+                PDPlot.append(pd)
+        if any([pd.image is not None for pd in PDPlot]):
+            for pd in PDPlot:
+                self.plotImage(axis, pd, opts)
+        elif any([pd.ensemble is not None for pd in PDPlot]):
+            for pd in PDPlot:
+                self.plotEnsemble(axis, pd, opts)
+        elif len(PDPlot)>N_LINE_COLLECTION and self.canPlotCollection(PDPlot, is_step, opts):
+            self.plotCollection(axis, PDPlot, opts)
+        else:
+            for iPlot, pd in enumerate(PDPlot):
                 # --- styling per plot 
                 if len(pd.x)==1:
                     marker='o'; ls=''
@@ -1102,11 +1407,101 @@ class PlotPanel(wx.Panel):
                 else:
                     plot = axis.plot
                 plot(pd.x,pd.y,label=pd.syl,ms=opts['ms'], lw=opts['lw'], marker=marker, ls=ls)
-                try:
-                    bAllNeg = bAllNeg and all(pd.y<=0)
-                except:
-                    pass # Dates or strings
+        for pd in PDPlot:
+            try:
+                bAllNeg = bAllNeg and pd._yMax[0]<=0 # NOTE: using stored range, no need to scan the data
+            except:
+                pass # Dates or strings
         return axis, bAllNeg
+
+    def plotImage(self, axis, pd, opts):
+        """ 2D map (e.g. spectrogram, cycle matrix) drawn with imshow, with a colorbar. 
+        The map is shown in dB (default), or with a log color scale where empty cells are blank """
+        from matplotlib.colors import LogNorm
+        I = pd.image
+        x, y = I['x'], I['y']
+        dx = (x[-1]-x[0])/(len(x)-1) if len(x)>1 else 1
+        dy = (y[-1]-y[0])/(len(y)-1) if len(y)>1 else 1
+        extent = [x[0]-dx/2, x[-1]+dx/2, y[0]-dy/2, y[-1]+dy/2]
+        if I.get('zScale', 'dB')=='log':
+            Z = np.ma.masked_less_equal(I['z'], 0)
+            norm = LogNorm(vmin=np.min(Z), vmax=np.max(Z)) if Z.count()>0 else None
+            im = axis.imshow(Z, origin='lower', aspect='auto', extent=extent, interpolation='nearest', cmap='viridis', norm=norm)
+        else:
+            Z = 10*np.log10(np.maximum(I['z'], np.finfo(float).tiny))
+            vmax = np.max(Z)
+            vmin = max(np.min(Z), vmax-80) # 80 dB of dynamic range
+            im = axis.imshow(Z, origin='lower', aspect='auto', extent=extent, interpolation='nearest', cmap='viridis', vmin=vmin, vmax=vmax)
+        # NOTE: colorbar drawn in an inset axes (inside the plot), so that figure axes are unchanged
+        cax = axis.inset_axes([0.985, 0.02, 0.012, 0.96])
+        cb  = self.fig.colorbar(im, cax=cax)
+        cb.set_label(I.get('zLabel', 'PSD [dB]'))
+        cax.yaxis.set_ticks_position('left')
+        cax.yaxis.set_label_position('left')
+        return im
+
+    def plotEnsemble(self, axis, pd, opts):
+        """ Ensemble statistics drawn as shaded bands (min-max and percentiles) around the mean """
+        R = pd.ensemble
+        P = sorted(R['percentiles'].keys())
+        color = axis._get_lines.get_next_color()
+        if self.ensPanel.cbMinMax.IsChecked():
+            axis.fill_between(R['x'], R['min'], R['max'], color=color, alpha=0.15, lw=0, label='Min-Max')
+        if len(P)>=2:
+            axis.fill_between(R['x'], R['percentiles'][P[0]], R['percentiles'][P[-1]], color=color, alpha=0.35, lw=0, 
+                    label='{:g}-{:g}%'.format(P[0], P[-1]))
+        if self.ensPanel.cbMedian.IsChecked() and 50 in P:
+            axis.plot(R['x'], R['percentiles'][50], color=color, lw=opts['lw'], ls='--', label='Median')
+        axis.plot(pd.x, pd.y, color=color, lw=opts['lw'], label=pd.syl)
+
+    def canPlotCollection(self, PD, is_step, opts):
+        """ Curves can be drawn as a LineCollection if they are numerical lines without markers """
+        if is_step or any([m!='' for m in opts['Markers']]):
+            return False
+        return not any([pd.xIsString or pd.xIsDate or pd.yIsString or pd.yIsDate for pd in PD])
+
+    def plotCollection(self, axis, PD, opts):
+        """ 
+        Draw many curves at once as one LineCollection (one artist instead of one Line2D per curve)
+        Colors follow the color cycle, or a colormap (with colorbar) based on the table index or
+        on a number found in the table name. The legend has a single entry for all the curves.
+        """
+        from matplotlib.collections import LineCollection
+        import re
+        segs = [np.column_stack((pd.x, pd.y)) for pd in PD]
+        ls   = [opts['LineStyles'][np.mod(i,len(opts['LineStyles']))] for i in range(len(PD))]
+        label = '{} curves'.format(len(PD))
+        if len(PD[0].syl)>0:
+            label = '{} ... {} ({})'.format(PD[0].syl, PD[-1].syl, label)
+        cbar = opts['ColorBar']
+        if cbar == 'None':
+            cycle  = pyplot_rc['axes.prop_cycle'].by_key()['color']
+            colors = [cycle[np.mod(i,len(cycle))] for i in range(len(PD))]
+            lc = LineCollection(segs, colors=colors, linewidths=opts['lw'], linestyles=ls, label=label)
+            axis.add_collection(lc, autolim=True)
+        else:
+            if cbar == 'Table index':
+                values = np.array([pd.it for pd in PD], dtype=float)
+            else:
+                values = np.array([np.nan]*len(PD))
+                for i,pd in enumerate(PD):
+                    nums = re.findall(r'[-+]?\d*\.?\d+', pd.tabname)
+                    if len(nums)>0:
+                        values[i] = float(nums[-1])
+                if np.any(np.isnan(values)):
+                    values = np.array([pd.it for pd in PD], dtype=float)
+                    cbar   = 'Table index'
+            lc = LineCollection(segs, array=values, cmap='viridis', linewidths=opts['lw'], linestyles=ls, label=label)
+            axis.add_collection(lc, autolim=True)
+            # NOTE: colorbar drawn in an inset axes (inside the plot), so that figure axes are unchanged
+            cax = axis.inset_axes([0.985, 0.02, 0.012, 0.96])
+            cb  = self.fig.colorbar(lc, cax=cax)
+            cb.set_label(cbar)
+            cax.yaxis.set_ticks_position('left')
+            cax.yaxis.set_label_position('left')
+        if axis.get_autoscalex_on() or axis.get_autoscaley_on():
+            axis.autoscale_view()
+        return lc
             
     def findPlotMode(self,PD):
         uTabs = unique([pd.it for pd in PD])
@@ -1304,6 +1699,12 @@ class PlotPanel(wx.Panel):
             if len(self.plotData)==0: 
                 self.cleanPlot();
                 return
+        elif self.pltTypePanel.cbEnsemble.GetValue():
+            self.PD_Ensemble()
+        elif self.pltTypePanel.cbCross.GetValue():
+            self.PD_Cross()
+        elif self.pltTypePanel.cbMarkov.GetValue():
+            self.PD_Markov()
         self.redraw_same_data()
         if self.infoPanel is not None:
             self.infoPanel.showStats(self.plotData,self.pltTypePanel.plotType())
@@ -1333,7 +1734,7 @@ class PlotPanel(wx.Panel):
         self.set_subplots(nPlots)
         self.distributePlots(mode,nPlots,spreadBy)
 
-        if not self.pltTypePanel.cbCompare.GetValue():
+        if not (self.pltTypePanel.cbCompare.GetValue() or self.pltTypePanel.cbEnsemble.GetValue() or self.pltTypePanel.cbCross.GetValue()):
             self.setLegendLabels(mode)
 
         self.plot_all(keep_limits)
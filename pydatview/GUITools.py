@@ -204,7 +204,9 @@ class FilterToolPanel(GUIToolPanel):
         self.btClear     = self.getBtBitmap(self, 'Clear Plot','sun'   , self.onClear)
         self.btComp = self.getToggleBtBitmap(self,'Apply','cloud',self.onToggleCompute)
         self.btPlot      = self.getBtBitmap(self, 'Plot' ,'chart'  , self.onPlot)
+        self.btAdd       = self.getBtBitmap(self, 'Add','add'  , self.onAdd)
 
+        self.cbTabs = wx.ComboBox(self, -1, choices=[], style=wx.CB_READONLY)
         lb1 = wx.StaticText(self, -1, 'Filter:')
         self.cbFilters = wx.ComboBox(self, choices=[filt['name'] for filt in self._DEFAULT_FILTERS], style=wx.CB_READONLY)
         self.lbParamName = wx.StaticText(self, -1, '            :')
@@ -220,9 +222,12 @@ class FilterToolPanel(GUIToolPanel):
         btSizer.Add(self.btClear    ,0,flag = wx.ALL|wx.EXPAND, border = 1)
         btSizer.Add(self.btComp,0,flag = wx.ALL|wx.EXPAND, border = 1)
         btSizer.Add(self.btPlot     ,0,flag = wx.ALL|wx.EXPAND, border = 1)
+        btSizer.Add(self.btAdd      ,0,flag = wx.ALL|wx.EXPAND, border = 1)
         #btSizer.Add(btHelp     ,0,flag = wx.ALL|wx.EXPAND, border = 1)
 
         horzSizer = wx.BoxSizer(wx.HORIZONTAL)
+        horzSizer.Add(wx.StaticText(self, -1, 'Table:'),0,flag = wx.LEFT|wx.CENTER,border = 5)
+        horzSizer.Add(self.cbTabs      ,0,flag = wx.LEFT|wx.CENTER,border = 1)
         horzSizer.Add(lb1              ,0,flag = wx.LEFT|wx.CENTER,border = 5)
         horzSizer.Add(self.cbFilters   ,0,flag = wx.LEFT|wx.CENTER,border = 1)
         horzSizer.Add(self.lbParamName ,0,flag = wx.LEFT|wx.CENTER,border = 5)
@@ -249,6 +254,7 @@ class FilterToolPanel(GUIToolPanel):
 
         self.onSelectFilt()
         self.onToggleCompute(init=True)
+        self.updateTabList()
 
     def destroy(self,event=None):
         self.parent.plotDataOptions['Filter']=None
@@ -294,7 +300,8 @@ class FilterToolPanel(GUIToolPanel):
             self.parent.plotDataOptions['Filter'] = None
             self.lbInfo.SetLabel(
                     'Click on "Apply" to set filter on the fly for all plots. '+
-                    'Click on "Plot" to try a filter on the current plot.'
+                    'Click on "Plot" to try a filter on the current plot. '+
+                    'Click on "Add" to add filtered tables.'
                     )
             self.btPlot.Enable(True)
             self.btClear.Enable(True)
@@ -308,7 +315,10 @@ class FilterToolPanel(GUIToolPanel):
     def _GUI2Filt(self):
         iFilt = self.cbFilters.GetSelection()
         filt = self._DEFAULT_FILTERS[iFilt].copy()
-        filt['param']=np.float(self.spintxt.Value)
+        if platform.system()=='Windows':
+            filt['param']=float(self.spintxt.Value)
+        else:
+            filt['param']=float(self.tParam.GetValue())
         return filt
 
     def onPlot(self, event=None):
@@ -331,8 +341,41 @@ class FilterToolPanel(GUIToolPanel):
         ax.plot(PD_new.x, PD_new.y, '-')
         self.parent.canvas.draw()
 
+    def onAdd(self,event=None):
+        """ 
+        Add filtered copies of the selected table(s): all the numeric columns are filtered, except x
+        """
+        iSel         = self.cbTabs.GetSelection()
+        tabList      = self.parent.selPanel.tabList
+        mainframe    = self.parent.mainframe
+        icol, colname = self.parent.selPanel.xCol
+        filt = self._GUI2Filt()
+        errors=[]
+        if iSel==0:
+            dfs, names, errors = tabList.applyFiltering(icol, filt, bAdd=True)
+            mainframe.load_dfs(dfs,names,bAdd=True)
+        else:
+            df, name = tabList.get(iSel-1).applyFiltering(icol, filt, bAdd=True)
+            mainframe.load_df(df,name,bAdd=True)
+        self.updateTabList()
+
+        if len(errors)>0:
+            raise Exception('Error: The filtering failed on some tables:\n\n'+'\n'.join(errors))
+
+    def updateTabList(self,event=None):
+        tabList = self.parent.selPanel.tabList
+        tabListNames = ['All opened tables']+tabList.getDisplayTabNames()
+        try:
+            iSel=np.max([np.min([self.cbTabs.GetSelection(),len(tabListNames)]),0])
+            self.cbTabs.Clear()
+            [self.cbTabs.Append(tn) for tn in tabListNames]
+            self.cbTabs.SetSelection(iSel)
+        except RuntimeError:
+            pass
+
     def onClear(self, event):
         self.parent.load_and_draw() # Data will change
+        self.updateTabList()
 
     def onParamChange(self, event=None):
         if self._filterApplied:
@@ -1,5 +1,6 @@
 import numpy as np
 import os.path
+import weakref
 from dateutil import parser
 import pandas as pd
 import pydatview.fast.fastlib as fastlib
@@ -236,6 +237,19 @@ class TableList(object): # todo inherit list
 
         return dfs_new, names_new, errors
 
+    def applyFiltering(self,iCol,filtDict,bAdd=True):
+        dfs_new   = []
+        names_new = []
+        errors=[]
+        for i,t in enumerate(self._tabs):
+            try:
+                df_new, name_new = t.applyFiltering(iCol,filtDict, bAdd=bAdd)
+                if df_new is not None: 
+                    dfs_new.append(df_new)
+                    names_new.append(name_new)
+            except Exception as e:
+                errors.append('Filtering failed for table: '+t.active_name+' ({})'.format(e))
+        return dfs_new, names_new, errors
 
 
 
@@ -272,6 +286,10 @@ class TableList(object): # todo inherit list
 class Table(object):
     def __init__(self,data=None,name='',filename='',columns=[],fileformat=''):
         # Default init
+        self._colCache = weakref.WeakValueDictionary() # shared column arrays, see getColumn
+        self._index    = None
+        self._sampling = {}
+        self._spectra  = {}
         self.maskString=''
         self.mask=None
 
@@ -294,6 +312,7 @@ class Table(object):
         self.setupName(name=str(name))
         
         self.convertTimeColumns()
+        self._hasNaN = self.columnsHasNaN(self.data)
 
 
     def setupName(self,name=''):
@@ -327,6 +346,46 @@ class Table(object):
     def columnsFromDF(self,df):
         return [s.replace('_',' ') for s in df.columns.values.astype(str)]
 
+    @staticmethod
+    def columnsHasNaN(df):
+        """ For each column of a dataframe, True if the column contains NaN (or NaT/None) """
+        return [bool(b) for b in df.isna().any(axis=0).values]
+
+    def hasNaN(self,i):
+        """ True if column i contains NaN, where i=0 is the index column.
+        The flag is computed once at load and updated when columns are modified.
+        It refers to the full column, it is therefore conservative when a mask is applied.
+        """
+        if i <= 0:
+            return False
+        return self._hasNaN[i-1]
+
+
+    # --- Data and mask, the shared column arrays are dropped when they are set
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data  = data
+        self._clearColumnCache()
+
+    @property
+    def mask(self):
+        return self._mask
+
+    @mask.setter
+    def mask(self, mask):
+        self._mask      = mask
+        self._maskIndex = None if mask is None else np.flatnonzero(mask)
+        self._clearColumnCache()
+
+    def _clearColumnCache(self):
+        self._colCache.clear()
+        self._index = None
+        self._sampling = {}
+        self._spectra  = {}
 
     def clearMask(self):
         self.maskString=''
@@ -340,7 +399,7 @@ class Table(object):
 
     def applyMaskString(self,maskString,bAdd=True):
         df = self.data
-        Index = np.array(range(df.shape[0]))
+        Index = np.arange(df.shape[0])
         sMask=maskString.replace('{Index}','Index')
         for i,c in enumerate(self.columns):
             c_no_unit = no_unit(c).strip()
@@ -379,6 +438,26 @@ class Table(object):
         else:
             name_new=None
             self.data=df_new
+            self._hasNaN = self.columnsHasNaN(self.data)
+        return df_new, name_new
+
+    def applyFiltering(self,iCol,filtDict,bAdd=True,nThreads=None):
+        """ Apply a filter (see signal.FILTERS) to all the numeric columns, by blocks of columns """
+        from pydatview.tools.signal import applyFilterDF
+        if iCol==0:
+            colName=None # the index is used as x
+        else:
+            colName=self.data.columns[iCol-1]
+        if nThreads is None:
+            import multiprocessing
+            nThreads=multiprocessing.cpu_count()
+        df_new =applyFilterDF(self.data, colName, filtDict, nThreads=nThreads)
+        if bAdd:
+            name_new=self.raw_name+'_filtered'
+        else:
+            name_new=None
+            self.data=df_new
+            self._hasNaN = self.columnsHasNaN(self.data)
         return df_new, name_new
 
 
@@ -459,6 +538,7 @@ class Table(object):
     def renameColumn(self,iCol,newName):
         self.columns[iCol]=newName
         self.data.columns.values[iCol]=newName
+        self._clearColumnCache()
 
     def deleteColumns(self,ICol):
         """ Delete columns by index, not column names which can have duplicates"""
@@ -466,6 +546,7 @@ class Table(object):
         self.data = self.data.iloc[:, IKeep] # Drop won't work for duplicates
         for i in sorted(ICol, reverse=True):
             del(self.columns[i])
+            del(self._hasNaN[i])
             for f in self.formulas:
                 if f['pos'] == (i + 1):
                     self.formulas.remove(f)
@@ -481,7 +562,9 @@ class Table(object):
         if i<0:
             i=self.data.shape[1]
         self.data.insert(int(i),sNewName,NewCol)
+        self._clearColumnCache()
         self.columns=self.columnsFromDF(self.data)
+        self._hasNaN.insert(int(i), self.columnsHasNaN(self.data.iloc[:,[int(i)]])[0])
         for f in self.formulas:
             if f['pos'] > i:
                 f['pos'] = f['pos'] + 1
@@ -493,6 +576,7 @@ class Table(object):
         self.data = self.data.drop(columns=self.data.columns[i-1])
         self.data.insert(int(i-1),sNewName,NewCol)
         self.columns=self.columnsFromDF(self.data)
+        self._hasNaN[i-1] = self.columnsHasNaN(self.data.iloc[:,[int(i-1)]])[0]
         for f in self.formulas:
             if f['pos'] == i:
                 f['name'] = sNewName
@@ -501,22 +585,29 @@ class Table(object):
     def getColumn(self,i):
         """ Return column of data, where i=0 is the index column
         If a mask exist, the mask is applied
+        NOTE: to limit the memory usage, the arrays returned are views on the data when possible.
+              The index column and masked columns are stored and shared between calls 
+              (for as long as they are used), they should not be modified in place.
         """
         if i <= 0 :
-            x = np.array(range(self.data.shape[0]))
+            if self._index is None:
+                self._index = np.arange(self.data.shape[0])
+                self._index.flags.writeable = False
+            x = self._index
             if self.mask is not None:
-                x=x[self.mask]
+                x = self._sharedColumn(0, lambda: self._maskIndex)
 
             c = None
             isString = False
             isDate   = False
         else:
+            c = self.data.iloc[:, i-1]
             if self.mask is not None:
-                c = self.data.iloc[self.mask, i-1]
-                x = self.data.iloc[self.mask, i-1].values
+                # NOTE: masking done once, using the index array of the mask
+                x = self._sharedColumn(i, lambda: c.values[self._maskIndex])
+                c = pd.Series(x, name=c.name, copy=False)
             else:
-                c = self.data.iloc[:, i-1]
-                x = self.data.iloc[:, i-1].values
+                x = c.values
 
             isString = c.dtype == object and isinstance(c.values[0], str)
             if isString:
@@ -530,11 +621,61 @@ class Table(object):
                     x=x.astype('datetime64')
         return x,isString,isDate,c
 
+    def columnSampling(self, i):
+        """ Ordering and spacing properties of column i, with mask applied (see signal.sampling_info).
+        Computed once, until the data or the mask are changed """
+        from pydatview.tools.signal import sampling_info
+        try:
+            return self._sampling[i]
+        except KeyError:
+            pass
+        x, isString, isDate, _ = self.getColumn(i)
+        if isString or isDate:
+            info = sampling_info(None)
+        elif i <= 0 and self.mask is None:
+            info = sampling_info(x[:2]) # index: uniform by construction, no need to scan
+        else:
+            info = sampling_info(x)
+        self._sampling[i] = info
+        return info
+
+    def columnSpectrum(self, ix, iy, key, fcompute=None):
+        """ Spectrum of column iy vs column ix, computed with fcompute for the transform options `key`.
+        The last spectrum of each pair of columns is kept until the data or the mask are changed,
+        such that changes of options that do not affect the transform do not recompute it. 
+        If fcompute is None, returns None when the spectrum is not stored. """
+        try:
+            keyLast, spec = self._spectra[(ix,iy)]
+            if keyLast==key:
+                return spec
+        except KeyError:
+            pass
+        if fcompute is None:
+            return None
+        spec = fcompute()
+        for v in spec:
+            if isinstance(v, np.ndarray):
+                v.flags.writeable = False # shared by the plot data using it
+        self._spectra[(ix,iy)] = (key, spec)
+        return spec
+
+    def _sharedColumn(self, i, fget):
+        """ Return the array of column i stored in the cache or compute it with fget.
+        The cache holds weak references, the array is freed when not used anymore. """
+        try:
+            return self._colCache[i]
+        except KeyError:
+            pass
+        x = fget()
+        x.flags.writeable = False
+        self._colCache[i] = x
+        return x
+
 
 
     def evalFormula(self,sFormula):
         df = self.data
-        Index = np.array(range(df.shape[0]))
+        Index = np.arange(df.shape[0])
         sFormula=sFormula.replace('{Index}','Index')
         for i,c in enumerate(self.columns):
             c_no_unit = no_unit(c).strip()
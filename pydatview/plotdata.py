@@ -5,8 +5,36 @@ from .common import no_unit, unit, inverse_unit, has_chinese_char
 from .common import isString, isDate, getDt
 from .common import unique, pretty_num, pretty_time
 from .GUIMeasure import find_closest # Should not depend on wx 
+import functools
+
+def _memoized(f):
+    """ Decorator for PlotData statistics: the value is computed the first time it is 
+    requested and stored in PD._cache (keyed by method name and arguments).
+    The cache is emptied whenever PD.x or PD.y are set. """
+    @functools.wraps(f)
+    def wrapper(PD, *args, **kwargs):
+        key = (f.__name__,) + args + tuple(sorted(kwargs.items()))
+        try:
+            return PD._cache[key]
+        except KeyError:
+            v = f(PD, *args, **kwargs)
+            PD._cache[key] = v
+            return v
+    return wrapper
+
+def _rangeProperty(key, data='y'):
+    """ Property giving access to one of the range statistics, e.g. PD._yMin 
+    data: 'y' for the current data, 'y0' for the original data """
+    def fget(PD):
+        return PD._range()[key] if data=='y' else PD._range0()[key]
+    def fset(PD, v):
+        if data=='y':
+            PD._range()[key] = v
+        else:
+            PD._range0()[key] = v
+    return property(fget, fset)
 
-class PlotData():
+class PlotData(object):
     """ 
     Class for plot data
 
@@ -31,10 +59,43 @@ class PlotData():
         PD.xIsDate  =False  # true if dates
         PD.yIsString=False  # true if strings
         PD.yIsDate  =False  # true if dates
+        PD.xHasNaN  =None   # False if x is known to have no NaN (None: unknown)
+        PD.yHasNaN  =None   # False if y is known to have no NaN (None: unknown)
+
+        PD.x0       =None   # original x data
+        PD.y0       =None   # original y data
+        PD._stats0  =None   # range statistics of the original data
+        PD._types0  =(False,False,False,False)
+        PD._hasNaN0 =(None,None)
+        PD._xSampling0=None # getter of the sampling properties of x0, provided by the table
+        PD._spectrum0 =None # getter of the cached spectrum of x0,y0, provided by the table
+        PD.ensemble =None   # ensemble statistics, see ensembleMultiplePD
+        PD.image    =None   # 2D map (e.g. spectrogram), dictionary with keys x, y, z (optional: zScale, zLabel)
 
         if x is not None and y is not None:
             PD.fromXY(x,y,sx,sy)
 
+    # --- Data, the statistics cache and the NaN flag are reset when the data is set
+    @property
+    def x(PD):
+        return PD._x
+
+    @x.setter
+    def x(PD, x):
+        PD._x = x
+        PD._cache = {}
+        PD.xHasNaN = None
+
+    @property
+    def y(PD):
+        return PD._y
+
+    @y.setter
+    def y(PD, y):
+        PD._y = y
+        PD._cache = {}
+        PD.yHasNaN = None
+
     def fromIDs(PD, tabs, i, idx, SameCol, Options={}):
         """ Nasty initialization of plot data from "IDs" """
         PD.id = i
@@ -51,8 +112,16 @@ class PlotData():
         PD.x, PD.xIsString, PD.xIsDate,_ = tabs[PD.it].getColumn(PD.ix)  # actual x data, with info
         PD.y, PD.yIsString, PD.yIsDate,c = tabs[PD.it].getColumn(PD.iy)  # actual y data, with info
         PD.c =c  # raw values, used by PDF
+        PD.xHasNaN = tabs[PD.it].hasNaN(PD.ix) # flags cached by the table
+        PD.yHasNaN = tabs[PD.it].hasNaN(PD.iy)
+        xRaw, yRaw = PD.x, PD.y
 
         PD._post_init(Options=Options)
+        # Properties cached by the table are only valid if the data was not modified on the fly
+        if PD.x is xRaw:
+            PD._xSampling0 = functools.partial(tabs[PD.it].columnSampling, PD.ix)
+            if PD.y is yRaw:
+                PD._spectrum0 = functools.partial(tabs[PD.it].columnSpectrum, PD.ix, PD.iy)
 
     def fromXY(PD, x, y, sx='', sy=''):
         PD.x  = x
@@ -98,20 +167,14 @@ class PlotData():
                 raise Exception('Error: y values contain more than 1000 string. This is not suitable for plotting.\n\nPlease select another column for table: {}\nProblematic column: {}\n'.format(PD.st,PD.sy))
 
         PD.needChineseFont = has_chinese_char(PD.sy) or has_chinese_char(PD.sx)
-        # Stats of the raw data (computed once and for all, since it can be expensive for large dataset
-        PD.computeRange()
-        # Store the values of the original data (labelled "0"), since the data might be modified later by PDF or MinMax etc.
-        PD._y0Min = PD._yMin
-        PD._y0Max = PD._yMax
-        PD._x0Min = PD._xMin
-        PD._x0Max = PD._xMax
-        PD._x0AtYMin = PD._xAtYMin
-        PD._x0AtYMax = PD._xAtYMax
-        PD._y0Std  = PD.yStd()
-        PD._y0Mean = PD.yMean()
+        # Store the original data (labelled "0"), since the data might be modified later by PDF or MinMax etc.
+        # Stats of the original data are computed lazily, once and for all, see _range0
         PD._n0     = (n,'{:d}'.format(n))
         PD.x0 =PD.x
         PD.y0 =PD.y
+        PD._types0 = (PD.xIsString, PD.xIsDate, PD.yIsString, PD.yIsDate)
+        PD._hasNaN0= (PD.xHasNaN, PD.yHasNaN)
+        PD._stats0 = None
         # Store xyMeas input values so we don't need to recompute xyMeas in case they didn't change
         PD.xyMeasInput1, PD.xyMeasInput2 = None, None
         PD.xyMeas1, PD.xyMeas2 = None, None
@@ -143,11 +206,11 @@ class PlotData():
                 nBins=n
             if smooth:
                 try:
-                    PD.x, PD.y = pdf_gaussian_kde(PD.y, nOut=nBins)
+                    PD.x, PD.y = pdf_gaussian_kde(PD.y, nOut=nBins, hasNaN=PD.yHasNaN)
                 except np.linalg.LinAlgError as e:
-                    PD.x, PD.y = pdf_histogram(PD.y, nBins=nBins, norm=True, count=False)
+                    PD.x, PD.y = pdf_histogram(PD.y, nBins=nBins, norm=True, count=False, hasNaN=PD.yHasNaN)
             else:
-                PD.x, PD.y = pdf_histogram(PD.y, nBins=nBins, norm=True, count=False)
+                PD.x, PD.y = pdf_histogram(PD.y, nBins=nBins, norm=True, count=False, hasNaN=PD.yHasNaN)
             PD.xIsString=False
             PD.yIsString=False
 
@@ -157,9 +220,6 @@ class PlotData():
         if len(iu)>0:
             PD.sy += ' ['+ iu +']'
 
-        # Compute min max once and for all
-        PD.computeRange()
-
         return nBins
 
 
@@ -172,10 +232,12 @@ class PlotData():
                 raise Exception('Warn: Cannot compute min-max for strings')
             mi = PD._y0Min[0] #mi= np.nanmin(PD.y)
             mx = PD._y0Max[0] #mx= np.nanmax(PD.y)
+            hasNaN = PD.yHasNaN
             if mi == mx:
                 PD.y=PD.y*0
             else:
                 PD.y = (PD.y-mi)/(mx-mi)
+            PD.yHasNaN = hasNaN
             PD._yMin=0,'0'
             PD._yMax=1,'1'
         if xScale:
@@ -183,10 +245,12 @@ class PlotData():
                 raise Exception('Warn: Cannot compute min-max for strings')
             mi= PD._x0Min[0]
             mx= PD._x0Max[0]
+            hasNaN = PD.xHasNaN
             if mi == mx:
                 PD.x=PD.x*0
             else:
                 PD.x = (PD.x-mi)/(mx-mi)
+            PD.xHasNaN = hasNaN
             PD._xMin=0,'0'
             PD._xMax=1,'1'
 
@@ -196,19 +260,73 @@ class PlotData():
         return None
 
 
-    def toFFT(PD, yType='Amplitude', xType='1/x', avgMethod='Welch', avgWindow='Hamming', bDetrend=True, nExp=8):
+    def toFFT(PD, yType='Amplitude', xType='1/x', avgMethod='Welch', avgWindow='Hamming', bDetrend=True, nExp=8, fMax=None, nPerDecade=None):
         """ 
         Uses spectral.fft_wrap to generate a "FFT" plot data, with various options:
            yType      : amplitude, PSD, f x PSD
            xType      : 1/x, x, 2pi/x
            avgMethod : None, Welch
            avgWindow : Hamming, Hann, Rectangular
+           fMax      : if provided, zoom spectrum, computed on the decimated signal up to the frequency fMax
+           nPerDecade: if provided, the output is averaged in log-spaced frequency bins (nPerDecade per decade)
         see module spectral for more
 
         NOTE: inplace (modifies itself), does not return a new instance
         """
-        from pydatview.tools.spectral import fft_wrap
+        from pydatview.tools.spectral import psd_wrap
+        dt = PD._fftDt()
+        # --- Computing PSD, stored by the table if the data is the original one
+        x, y, hasNaN = PD.x, PD.y, PD.yHasNaN
+        fcompute = lambda: psd_wrap(x, y, dt=dt, averaging=avgMethod, averaging_window=avgWindow, detrend=bDetrend, nExp=nExp, hasNaN=hasNaN, fmax=fMax)
+        spectrum0 = PD._spectrumCache()
+        if spectrum0 is not None:
+            frq, PSD, Info = spectrum0((avgMethod, avgWindow, bDetrend, nExp, dt, fMax), fcompute)
+        else:
+            frq, PSD, Info = fcompute()
+        return PD._fromPSD(frq, PSD, Info, yType=yType, xType=xType, bDetrend=bDetrend, nPerDecade=nPerDecade)
 
+    def toSpectrogram(PD, avgWindow='Hamming', bDetrend=True, nExp=8, nTimeMax=2000, nFreqMax=1000):
+        """ 
+        Uses spectral.spectrogram to generate a time-frequency map, stored in PD.image (x: time, y: frequency, z: PSD).
+        The map is computed block by block and downsampled to nTimeMax x nFreqMax (typically the screen resolution).
+        x and y of the plot data are set to the time and the dominant frequency of each (averaged) segment.
+
+        NOTE: inplace (modifies itself), does not return a new instance
+        """
+        from pydatview.tools.spectral import spectrogram
+        dt = PD._fftDt()
+        x, y = PD.x, PD.y
+        if PD.yHasNaN is not False:
+            b = ~np.isnan(y)
+            if not np.all(b):
+                x, y = x[b], y[b]
+        n = len(y)
+        if dt is None:
+            dt = (np.max(x)-np.min(x))/(n-1)
+        nPerSeg = min(2**nExp, 2**int(np.log2(max(n,2))))
+        fcompute = lambda: spectrogram(y, fs=1/dt, window=avgWindow, nperseg=nPerSeg, detrend=bDetrend, nTimeMax=nTimeMax, nFreqMax=nFreqMax)
+        spectrum0 = PD._spectrumCache()
+        if spectrum0 is not None:
+            f, t, S, Info = spectrum0(('Spectrogram', avgWindow, bDetrend, nPerSeg, dt, nTimeMax, nFreqMax), fcompute)
+        else:
+            f, t, S, Info = fcompute()
+        bDate = PD.xIsDate
+        if not bDate:
+            t = t + x[0] # NOTE: for dates, time relative to the first sample
+        PD.image = {'x':t, 'y':f, 'z':S}
+        PD.x = t
+        PD.y = f[np.argmax(S, axis=0)]
+        PD._Info=Info
+        PD.xIsDate=False
+        if unit(PD.sx)=='s' or bDate:
+            PD.sx = 'Time [s]'
+            PD.sy = 'Frequency [Hz]'
+        else:
+            PD.sy = 'Frequency [1/{}]'.format(unit(PD.sx)) if len(unit(PD.sx))>0 else 'Frequency'
+        return Info
+
+    def _fftDt(PD):
+        """ Check that the FFT can be computed, and return the time step if it is known (None otherwise) """
         # --- TODO, make this independent of GUI
         if PD.yIsString or PD.yIsDate:
             raise Exception('Warn: Cannot plot FFT of dates or strings')
@@ -218,8 +336,23 @@ class PlotData():
         dt=None
         if PD.xIsDate:
             dt = getDt(PD.x)
-        # --- Computing fft - x is freq, y is Amplitude
-        PD.x, PD.y, Info = fft_wrap(PD.x, PD.y, dt=dt, output_type=yType,averaging=avgMethod, averaging_window=avgWindow,detrend=bDetrend,nExp=nExp)
+        elif PD._xSampling()['uniform']:
+            dt = PD._xSampling()['dx'] # known constant time step
+        return dt
+
+    def _spectrumCache(PD):
+        """ Getter of the spectrum stored by the table, if the data is the original one (None otherwise) """
+        if PD._spectrum0 is not None and PD.x is PD.x0 and PD.y is PD.y0:
+            return PD._spectrum0
+        return None
+
+    def _fromPSD(PD, frq, PSD, Info, yType='Amplitude', xType='1/x', bDetrend=True, nPerDecade=None):
+        """ Set the FFT plot data from a one-sided PSD, see toFFT """
+        from pydatview.tools.spectral import psd_to_output, log_bins
+        # --- Output type, rescaling of the PSD - x is freq, y is Amplitude
+        PD.x, PD.y = psd_to_output(frq, PSD, output_type=yType, detrend=bDetrend)
+        if nPerDecade is not None:
+            PD.x, PD.y = log_bins(PD.x, PD.y, nPerDecade=nPerDecade)
         # --- Setting plot options
         PD._Info=Info
         PD.xIsDate=False
@@ -253,7 +386,6 @@ class PlotData():
         else:
             raise Exception('Unsupported x-type {} '.format(xType))
 
-        PD.computeRange()
         return Info
 
     def computeRange(PD):
@@ -262,78 +394,51 @@ class PlotData():
         so we store it to reuse these as much as possible. 
         If possible, should be used for the plotting as well, so that matplotlib don't
         have to compute them again
+        NOTE: the range is computed lazily when first needed (see _range), calling this
+              function only forces the computation.
         NOTE: each variable is a tuple (v,s), with a float and its string representation
         """
-        PD._xMin  = PD._xMinCalc() 
-        PD._xMax  = PD._xMaxCalc()
-        PD._yMin  = PD._yMinCalc()
-        PD._yMax  = PD._yMaxCalc()
-        PD._xAtYMin  = PD._xAtYMinCalc(PD._yMin[0])
-        PD._xAtYMax  = PD._xAtYMaxCalc(PD._yMax[0])
+        PD._range()
 
-
-    # --------------------------------------------------------------------------------}
-    # --- Stats functions that should only becalled once, could maybe use @attributes..
-    # --------------------------------------------------------------------------------{
-    def _yMinCalc(PD):
-        if PD.yIsString:
-            return PD.y[0],PD.y[0].strip()
-        elif PD.yIsDate:
-            return PD.y[0],'{}'.format(PD.y[0])
-        else:
-            v=np.nanmin(PD.y)
-            s=pretty_num(v)
-        return (v,s)
-
-    def _yMaxCalc(PD):
-        if PD.yIsString:
-            return PD.y[-1],PD.y[-1].strip()
-        elif PD.yIsDate:
-            return PD.y[-1],'{}'.format(PD.y[-1])
+    def _range(PD):
+        """ Range statistics of the current data, see _computeRange """
+        try:
+            return PD._cache['_range']
+        except KeyError:
+            pass
+        if PD.x is PD.x0 and PD.y is PD.y0 and PD._types0==(PD.xIsString, PD.xIsDate, PD.yIsString, PD.yIsDate):
+            # Data has not been modified, sharing stats with the original data
+            R = PD._range0()
         else:
-            v=np.nanmax(PD.y)
-            s=pretty_num(v)
-        return (v,s)
+            R = _computeRange(PD.x, PD.y, PD.xIsString, PD.xIsDate, PD.yIsString, PD.yIsDate, PD.xHasNaN, PD.yHasNaN)
+        PD._cache['_range'] = R
+        return R
 
-    def _xAtYMinCalc(PD, yMin):
-        if PD.xIsString:
-            return PD.x[0],PD.x[0].strip()
-        elif PD.xIsDate:
-            return PD.x[0],'{}'.format(PD.x[0])
-        else:
-            v = PD.x[np.where(PD.y == yMin)[0][0]]
-            s=pretty_num(v)
-        return (v,s)
+    def _range0(PD):
+        """ Range statistics of the original data, computed once and for all """
+        if PD._stats0 is None:
+            PD._stats0 = _computeRange(PD.x0, PD.y0, *(PD._types0+PD._hasNaN0))
+        return PD._stats0
 
-    def _xAtYMaxCalc(PD, yMax):
-        if PD.xIsString:
-            return PD.x[-1],PD.x[-1].strip()
-        elif PD.xIsDate:
-            return PD.x[-1],'{}'.format(PD.x[-1])
-        else:
-            v = PD.x[np.where(PD.y == yMax)[0][0]]
-            s=pretty_num(v)
-        return (v,s)
-
-    def _xMinCalc(PD):
-        if PD.xIsString:
-            return PD.x[0],PD.x[0].strip()
-        elif PD.xIsDate:
-            return PD.x[0],'{}'.format(PD.x[0])
-        else:
-            v=np.nanmin(PD.x)
-            s=pretty_num(v)
-        return (v,s)
-
-    def _xMaxCalc(PD):
-        if PD.xIsString:
-            return PD.x[-1],PD.x[-1].strip()
-        elif PD.xIsDate:
-            return PD.x[-1],'{}'.format(PD.x[-1])
-        else:
-            v=np.nanmax(PD.x)
-            s=pretty_num(v)
-        return (v,s)
+    # --------------------------------------------------------------------------------}
+    # --- Range statistics, computed lazily (see _range and _range0)
+    # --------------------------------------------------------------------------------{
+    _xMin     = _rangeProperty('xMin')
+    _xMax     = _rangeProperty('xMax')
+    _yMin     = _rangeProperty('yMin')
+    _yMax     = _rangeProperty('yMax')
+    _xAtYMin  = _rangeProperty('xAtYMin')
+    _xAtYMax  = _rangeProperty('xAtYMax')
+    _yMean    = _rangeProperty('yMean')
+    _yStd     = _rangeProperty('yStd')
+    _x0Min    = _rangeProperty('xMin'   , 'y0')
+    _x0Max    = _rangeProperty('xMax'   , 'y0')
+    _y0Min    = _rangeProperty('yMin'   , 'y0')
+    _y0Max    = _rangeProperty('yMax'   , 'y0')
+    _x0AtYMin = _rangeProperty('xAtYMin', 'y0')
+    _x0AtYMax = _rangeProperty('xAtYMax', 'y0')
+    _y0Mean   = _rangeProperty('yMean'  , 'y0')
+    _y0Std    = _rangeProperty('yStd'   , 'y0')
 
     def xMin(PD):
         return PD._xMin
@@ -372,28 +477,19 @@ class PlotData():
     # --- Stats functions
     # --------------------------------------------------------------------------------{
     def yMean(PD):
-        if PD.yIsString or  PD.yIsDate:
-            return None,'NA'
-        else:
-            v=np.nanmean(PD.y)
-            s=pretty_num(v)
-        return (v,s)
+        return PD._yMean
 
+    @_memoized
     def yMedian(PD):
         if PD.yIsString or  PD.yIsDate:
             return None,'NA'
         else:
-            v=np.nanmedian(PD.y)
+            v=np.median(PD.y) if PD.yHasNaN is False else np.nanmedian(PD.y)
             s=pretty_num(v)
         return (v,s)
 
     def yStd(PD):
-        if PD.yIsString or  PD.yIsDate:
-            return None,'NA'
-        else:
-            v=np.nanstd(PD.y)
-            s=pretty_num(v)
-        return (v,s)
+        return PD._yStd
 
     def yName(PD):
         return PD.sy, PD.sy
@@ -435,7 +531,7 @@ class PlotData():
             dtAll=getDt([PD.x[-1]-PD.x[0]])
             return '',pretty_time(dtAll)
         else:
-            v=np.nanmax(PD.y)-np.nanmin(PD.y)
+            v=PD._yMax[0]-PD._yMin[0]
             s=pretty_num(v)
         return v,s
 
@@ -455,11 +551,12 @@ class PlotData():
             dtAll=getDt([PD.x[-1]-PD.x[0]])
             return '',pretty_time(dtAll)
         else:
-            v=np.nanmax(PD.x)-np.nanmin(PD.x)
+            v=PD._xMax[0]-PD._xMin[0]
             s=pretty_num(v)
         return v,s
 
 
+    @_memoized
     def inty(PD):
         if PD.yIsString or PD.yIsDate or PD.xIsString or PD.xIsDate:
             return None,'NA'
@@ -468,6 +565,7 @@ class PlotData():
             s=pretty_num(v)
         return v,s
 
+    @_memoized
     def intyintdx(PD):
         if PD.yIsString or PD.yIsDate or PD.xIsString or PD.xIsDate:
             return None,'NA'
@@ -476,6 +574,7 @@ class PlotData():
             s=pretty_num(v)
         return v,s
 
+    @_memoized
     def intyx1(PD):
         if PD.yIsString or PD.yIsDate or PD.xIsString or PD.xIsDate:
             return None,'NA'
@@ -484,6 +583,7 @@ class PlotData():
             s=pretty_num(v)
         return v,s
 
+    @_memoized
     def intyx1_scaled(PD):
         if PD.yIsString or PD.yIsDate or PD.xIsString or PD.xIsDate:
             return None,'NA'
@@ -493,6 +593,7 @@ class PlotData():
             s=pretty_num(v)
         return v,s
 
+    @_memoized
     def intyx2(PD):
         if PD.yIsString or PD.yIsDate or PD.xIsString or PD.xIsDate:
             return None,'NA'
@@ -524,6 +625,9 @@ class PlotData():
     def yMeanMeas(PD):
         return PD._measCalc('mean')
 
+    def yStdMeas(PD):
+        return PD._measCalc('std')
+
     def yMinMeas(PD):
         return PD._measCalc('min')
 
@@ -556,30 +660,163 @@ class PlotData():
         if PD.xyMeas1 is None or PD.xyMeas2 is None:
             return 'NA', 'NA'
         try:
-            v = 'NA'
-            left_index = np.where(PD.x == PD.xyMeas1[0])[0][0]
-            right_index = np.where(PD.x == PD.xyMeas2[0])[0][0]
+            left_index  = PD._xIndex(PD.xyMeas1[0])
+            right_index = PD._xIndex(PD.xyMeas2[0])
             if left_index == right_index:
                 raise IndexError
             if left_index > right_index:
                 left_index, right_index = right_index, left_index
+            v, s = PD._windowCalc(mode, left_index, right_index)
+        except (IndexError, TypeError):
+            v = 'NA'
+            s = 'NA'
+        return v, s
+
+    def yMeanZoom(PD, xlim):
+        return PD._zoomCalc('mean', xlim)
+
+    def yStdZoom(PD, xlim):
+        return PD._zoomCalc('std', xlim)
+
+    def yMinZoom(PD, xlim):
+        return PD._zoomCalc('min', xlim)
+
+    def yMaxZoom(PD, xlim):
+        return PD._zoomCalc('max', xlim)
+
+    def _zoomCalc(PD, mode, xlim):
+        """ Statistics of the data within the x-limits `xlim` (e.g. of the current zoom) """
+        if xlim is None or PD.xIsString or PD.xIsDate:
+            return 'NA', 'NA'
+        xmin, xmax = min(xlim), max(xlim)
+        try:
+            if PD._xSampling()['sorted']:
+                i0, i1 = PD._xSlice(xmin, xmax)
+                v, s = PD._windowCalc(mode, i0, i1)
+            else:
+                I = np.flatnonzero((PD.x>=xmin) & (PD.x<=xmax))
+                v, s = PD._windowCalc(mode, I=I)
+        except (IndexError, TypeError, ValueError):
+            v = 'NA'
+            s = 'NA'
+        return v, s
+
+    def _xSlice(PD, xmin, xmax):
+        """ Indices i0, i1 such that x[i0:i1] are the values within [xmin, xmax], for sorted x.
+        Uses index arithmetic if x is uniform, binary search otherwise """
+        x = PD.x
+        S = PD._xSampling()
+        if not S['uniform']:
+            return np.searchsorted(x, xmin, side='left'), np.searchsorted(x, xmax, side='right')
+        n, x0, dx = len(x), x[0], S['dx']
+        i0 = min(max(int(np.ceil ((xmin-x0)/dx)), 0), n)
+        i1 = min(max(int(np.floor((xmax-x0)/dx))+1, 0), n)
+        # Correction for round-off
+        while i0>0 and x[i0-1]>=xmin: i0-=1
+        while i0<n and x[i0]<xmin   : i0+=1
+        while i1<n and x[i1]<=xmax  : i1+=1
+        while i1>0 and x[i1-1]>xmax : i1-=1
+        return i0, i1
+
+    def _xIndex(PD, xv):
+        """ Index of the first occurence of the value xv in x """
+        S = PD._xSampling()
+        if S['uniform']:
+            i = int(round((xv-PD.x[0])/S['dx']))
+            if i>=0 and i<len(PD.x) and PD.x[i]==xv:
+                return i
+        if S['sorted']:
+            i = np.searchsorted(PD.x, xv, side='left')
+            if i>=len(PD.x) or PD.x[i]!=xv:
+                raise IndexError
+            return i
+        else:
+            return np.where(PD.x == xv)[0][0]
+
+    def _windowCalc(PD, mode, left_index=None, right_index=None, I=None):
+        """ Statistics of y[left_index:right_index] using the range-query index, or of y[I] """
+        if PD.yIsString or PD.yIsDate:
+            return 'NA', 'NA'
+        if I is not None:
+            if len(I)==0:
+                raise IndexError
+            y = PD.y[I]
+            if PD.yHasNaN is False:
+                fMean, fStd, fMin, fMax, fArgMin, fArgMax = np.mean, np.std, np.min, np.max, np.argmin, np.argmax
+            else:
+                fMean, fStd, fMin, fMax, fArgMin, fArgMax = np.nanmean, np.nanstd, np.nanmin, np.nanmax, np.nanargmin, np.nanargmax
             if mode == 'mean':
-                v = np.nanmean(PD.y[left_index:right_index])
+                v = fMean(y)
+            elif mode == 'std':
+                v = fStd(y)
             elif mode == 'min':
-                v = np.nanmin(PD.y[left_index:right_index])
+                v = fMin(y)
             elif mode == 'max':
-                v = np.nanmax(PD.y[left_index:right_index])
+                v = fMax(y)
             elif mode == 'xmin':
-                v = PD.x[left_index + np.where(PD.y[left_index:right_index] == np.nanmin(PD.y[left_index:right_index]))[0][0]]
+                v = PD.x[I[fArgMin(y)]]
             elif mode == 'xmax':
-                v = PD.x[left_index + np.where(PD.y[left_index:right_index] == np.nanmax(PD.y[left_index:right_index]))[0][0]]
+                v = PD.x[I[fArgMax(y)]]
             else:
                 raise NotImplementedError('Error: Mode ' + mode + ' not implemented')
-            s = pretty_num(v)
-        except (IndexError, TypeError):
-            v = 'NA'
-            s = 'NA'
-        return v, s
+        else:
+            R = PD._rangeIndex()
+            if mode == 'mean':
+                v = R.mean(left_index, right_index)
+            elif mode == 'std':
+                v = R.std(left_index, right_index)
+            elif mode == 'min':
+                v = R.min(left_index, right_index)[0]
+            elif mode == 'max':
+                v = R.max(left_index, right_index)[0]
+            elif mode in ['xmin', 'xmax']:
+                _, i = R.min(left_index, right_index) if mode=='xmin' else R.max(left_index, right_index)
+                if i<0:
+                    raise IndexError
+                v = PD.x[i]
+            else:
+                raise NotImplementedError('Error: Mode ' + mode + ' not implemented')
+        return v, pretty_num(v)
+
+    @_memoized
+    def _rangeIndex(PD):
+        """ Range-query index of y, for the statistics of measurement and zoom windows """
+        from pydatview.tools.stats import RangeStatsIndex
+        return RangeStatsIndex(PD.y, hasNaN=PD.yHasNaN)
+
+    @_memoized
+    def _xSampling(PD):
+        """ Ordering and spacing properties of x (see signal.sampling_info), computed once """
+        from pydatview.tools.signal import sampling_info
+        if PD._xSampling0 is not None and PD.x is PD.x0:
+            return PD._xSampling0()
+        if PD.xIsString or PD.xIsDate:
+            return sampling_info(None)
+        return sampling_info(PD.x)
+
+    # --------------------------------------------------------------------------------}
+    # --- Ensemble statistics (see ensembleMultiplePD)
+    # --------------------------------------------------------------------------------{
+    def ensN(PD):
+        if PD.ensemble is None:
+            return 'NA','NA'
+        return PD.nEnsemble, '{:d}'.format(PD.nEnsemble)
+
+    def ensMin(PD):
+        return PD._ensCalc(lambda R: np.nanmin(R['min']))
+
+    def ensMax(PD):
+        return PD._ensCalc(lambda R: np.nanmax(R['max']))
+
+    def ensStdMean(PD):
+        """ Mean over x of the standard deviation between the signals """
+        return PD._ensCalc(lambda R: np.nanmean(R['std']))
+
+    def _ensCalc(PD, f):
+        if PD.ensemble is None:
+            return 'NA','NA'
+        v = f(PD.ensemble)
+        return v, pretty_num(v)
 
     def dx(PD):
         if len(PD.x)<=1:
@@ -594,32 +831,29 @@ class PlotData():
             s=pretty_num(v)
             return v,s
 
-    def xMax(PD):
-        if PD.xIsString:
-            return PD.x[-1],PD.x[-1]
-        elif  PD.xIsDate:
-            return PD.x[-1],'{}'.format(PD.x[-1])
-        else:
-            v=np.nanmax(PD.x)
-            s=pretty_num(v)
-            return v,s
-    def xMin(PD):
-        if PD.xIsString:
-            return PD.x[0],PD.x[0]
-        elif  PD.xIsDate:
-            return PD.x[0],'{}'.format(PD.x[0])
-        else:
-            v=np.nanmin(PD.x)
-            s=pretty_num(v)
-            return v,s
+    @_memoized
+    def _rainflowCycles(PD, no_bins=46):
+        """ Rainflow cycle histogram of the current data (see fatigue.cycle_matrix), counted once
+        and shared by the equivalent loads of all Wohler exponents. None if the signal cannot be counted """
+        from pydatview.tools.fatigue import cycle_matrix
+        try:
+            cycles, ampl_bin_mean, ampl_edges, mean_bin_mean, _ = cycle_matrix(PD.y, no_bins, 1)
+        except TypeError:
+            return None
+        return {'cycles':cycles.flatten(), 'ampl':ampl_bin_mean.flatten(), 'mean':mean_bin_mean.flatten(), 'ampl_edges':ampl_edges}
 
+    @_memoized
     def leq(PD,m):
-        from pydatview.tools.fatigue import eq_load
+        from pydatview.tools.fatigue import eq_load_from_cycles
         if PD.yIsString or  PD.yIsDate:
             return 'NA','NA'
         else:
             T,_=PD.xRange()
-            v=eq_load(PD.y, m=m, neq=T)[0][0]
+            R = PD._rainflowCycles()
+            if R is None:
+                v = np.nan
+            else:
+                v = eq_load_from_cycles(R['cycles'], R['ampl'], m=m, neq=T)[0][0]
             return v,pretty_num(v)
 
     def Info(PD,var):
@@ -631,11 +865,367 @@ class PlotData():
             return '','{:d}'.format(PD._Info.LOvlp)
         elif var=='nFFT':
             return '','{:d}'.format(PD._Info.nFFT)
+        elif var=='nDecim':
+            return '','{:d}'.format(getattr(PD._Info,'nDecim',1))
+        elif var=='nCycles':
+            v = np.sum(PD.image['z'])
+            return v,pretty_num(v)
+
+
+# --------------------------------------------------------------------------------}
+# --- Range statistics
+# --------------------------------------------------------------------------------{
+def _computeRange(x, y, xIsString, xIsDate, yIsString, yIsDate, xHasNaN=None, yHasNaN=None):
+    """
+    Compute min/max of x and y, x at min/max of y, mean and std of y.
+    The numerical data is scanned once, using the fused kernel `fused_stats`.
+    The NaN checks are skipped for data flagged without NaN (xHasNaN/yHasNaN False).
+    For strings and dates, the first and last values are used.
+    Returns a dictionary of tuples (v,s), with a float and its string representation
+    """
+    from pydatview.tools.stats import fused_stats
+    def firstLast(v, isString, i):
+        if isString:
+            return v[i], v[i].strip()
+        else:
+            return v[i], '{}'.format(v[i])
+    num = _num
+
+    xNum = not (xIsString or xIsDate)
+    yNum = not (yIsString or yIsDate)
+    if xNum and yNum:
+        return _rangeFromStats(x, fused_stats(x, moments=False, hasNaN=xHasNaN), fused_stats(y, hasNaN=yHasNaN))
+    R = {}
+    if xNum:
+        xStats = fused_stats(x, moments=False, hasNaN=xHasNaN)
+        R['xMin'] = num(xStats['min'])
+        R['xMax'] = num(xStats['max'])
+    else:
+        R['xMin'] = firstLast(x, xIsString, 0)
+        R['xMax'] = firstLast(x, xIsString,-1)
+    if yNum:
+        yStats = fused_stats(y, hasNaN=yHasNaN)
+        R['yMin']  = num(yStats['min'])
+        R['yMax']  = num(yStats['max'])
+        R['yMean'] = num(yStats['mean'])
+        R['yStd']  = num(yStats['std'])
+    else:
+        R['yMin']  = firstLast(y, yIsString, 0)
+        R['yMax']  = firstLast(y, yIsString,-1)
+        R['yMean'] = (None,'NA')
+        R['yStd']  = (None,'NA')
+    if not xNum:
+        R['xAtYMin'] = firstLast(x, xIsString, 0)
+        R['xAtYMax'] = firstLast(x, xIsString,-1)
+    else:
+        R['xAtYMin'] = num(x[np.where(y == R['yMin'][0])[0][0]])
+        R['xAtYMax'] = num(x[np.where(y == R['yMax'][0])[0][0]])
+    return R
+
+def _num(v):
+    return (v, pretty_num(v))
+
+def _rangeFromStats(x, xStats, yStats):
+    """ Range dictionary (see _computeRange) from the outputs of fused_stats for numerical x and y """
+    R = {}
+    R['xMin']    = _num(xStats['min'])
+    R['xMax']    = _num(xStats['max'])
+    R['yMin']    = _num(yStats['min'])
+    R['yMax']    = _num(yStats['max'])
+    R['yMean']   = _num(yStats['mean'])
+    R['yStd']    = _num(yStats['std'])
+    R['xAtYMin'] = _num(x[yStats['argmin']]) if yStats['argmin']>=0 else _num(np.nan)
+    R['xAtYMax'] = _num(x[yStats['argmax']]) if yStats['argmax']>=0 else _num(np.nan)
+    return R
+
+def _stackSeries(Y):
+    """ Stack 1d arrays of same length and dtype into a 2d array (one per row).
+    When the arrays are equally spaced in memory (e.g. consecutive columns of a dataframe
+    stored as one block), a strided view is returned, otherwise a copy is made. """
+    Y = [np.asarray(y) for y in Y]
+    y0 = Y[0]
+    if len(Y)>1 and all([y.dtype==y0.dtype and y.strides==y0.strides for y in Y]):
+        ptr  = np.array([y.__array_interface__['data'][0] for y in Y], dtype=np.int64)
+        step = np.diff(ptr)
+        if step[0]!=0 and np.all(step==step[0]):
+            return np.lib.stride_tricks.as_strided(y0, shape=(len(Y), len(y0)), strides=(int(step[0]), y0.strides[0]), writeable=False)
+    return np.vstack(Y)
+
+_BATCH_MAX_LEN = 4096 # Maximum signal length for which batched statistics are used
+
+def statsMultiplePD(PD):
+    """ 
+    Compute the range statistics (min, max, mean, std, etc.) of a list of PlotData at once. 
+    PlotData with numerical data of same length are stacked, and their statistics are 
+    computed with axis-wise reductions (see tools.stats.batch_stats), which is much faster 
+    than one series at a time when many channels are selected.
+    The results are stored in the cache of each PlotData, this function has no effect
+    for PlotData that already have their statistics computed.
+    """
+    from pydatview.tools.stats import fused_stats, batch_stats
+    # --- Grouping by length, original data, and current data when different
+    groups = {}
+    for pd in PD:
+        if pd._stats0 is None and pd.x0 is not None and not any(pd._types0):
+            groups.setdefault((len(pd.y0), 'y0'), []).append(pd)
+        types = (pd.xIsString, pd.xIsDate, pd.yIsString, pd.yIsDate)
+        if '_range' not in pd._cache and not any(types) and (pd.x is not pd.x0 or pd.y is not pd.y0):
+            groups.setdefault((len(pd.y), 'y'), []).append(pd)
+    for (n, data), PDs in groups.items():
+        if data=='y0':
+            X = [pd.x0 for pd in PDs]
+            Y = [pd.y0 for pd in PDs]
+            F = [pd._hasNaN0 for pd in PDs]
+        else:
+            X = [pd.x for pd in PDs]
+            Y = [pd.y for pd in PDs]
+            F = [(pd.xHasNaN, pd.yHasNaN) for pd in PDs]
+        if len(PDs)==1 or n>_BATCH_MAX_LEN:
+            # Long signals: the fused kernel is memory bound, no gain from batching
+            yStats = [fused_stats(y, hasNaN=f[1]) for y,f in zip(Y,F)]
+        else:
+            hasNaN = False if all([f[1] is False for f in F]) else None
+            B = batch_stats(_stackSeries(Y), hasNaN=hasNaN)
+            B = dict([(k, v.tolist()) for k,v in B.items() if k!='n'])
+            yStats = [dict([(k, v[i]) for k,v in B.items()]) for i in range(len(PDs))]
+        # x is often shared between the signals of a table
+        xStats = {}
+        for pd, x, ys, f in zip(PDs, X, yStats, F):
+            xKey = (x.__array_interface__['data'][0], x.strides) if isinstance(x, np.ndarray) else id(x)
+            if xKey not in xStats:
+                xStats[xKey] = fused_stats(x, moments=False, hasNaN=f[0])
+            R = _rangeFromStats(x, xStats[xKey], ys)
+            if data=='y0':
+                pd._stats0 = R
+            else:
+                pd._cache['_range'] = R
+
+
+# --------------------------------------------------------------------------------}
+# --- FFT
+# --------------------------------------------------------------------------------{
+def fftMultiplePD(PD, yType='Amplitude', xType='1/x', avgMethod='Welch', avgWindow='Hamming', bDetrend=True, nExp=8, fMax=None, nPerDecade=None, nMaxBlock=2**18):
+    """ 
+    Convert a list of PlotData to FFT (see PlotData.toFFT), inplace.
+    Signals sharing the same x (e.g. several channels of a table) and without NaN are stacked 
+    in 2D arrays (of at most nMaxBlock values) and their PSD are computed at once.
+    PSD already stored by the tables are reused.
+
+    return: Info of the last spectrum computed
+    """
+    from pydatview.tools.spectral import psd_wrap
+    Info   = None
+    Groups = {}
+    for pd in PD:
+        dt = pd._fftDt()
+        spectrum0 = pd._spectrumCache()
+        if spectrum0 is not None and spectrum0((avgMethod, avgWindow, bDetrend, nExp, dt, fMax)) is not None:
+            Info = pd.toFFT(yType=yType, xType=xType, avgMethod=avgMethod, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp, fMax=fMax, nPerDecade=nPerDecade)
+            continue
+        hasNaN = pd.yHasNaN if pd.yHasNaN is not None else bool(np.any(np.isnan(pd.y)))
+        if hasNaN:
+            Info = pd.toFFT(yType=yType, xType=xType, avgMethod=avgMethod, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp, fMax=fMax, nPerDecade=nPerDecade)
+            continue
+        Groups.setdefault((id(pd.x), len(pd.y), dt), []).append(pd)
+
+    for (_, n, dt), PDG in Groups.items():
+        nBlock = max(1, nMaxBlock//max(n,1))
+        for i0 in range(0, len(PDG), nBlock):
+            PDB = PDG[i0:i0+nBlock]
+            if len(PDB)==1:
+                Info = PDB[0].toFFT(yType=yType, xType=xType, avgMethod=avgMethod, avgWindow=avgWindow, bDetrend=bDetrend, nExp=nExp, fMax=fMax, nPerDecade=nPerDecade)
+                continue
+            frq, PSD, Info = psd_wrap(PDB[0].x, np.vstack([pd.y for pd in PDB]), dt=dt, averaging=avgMethod, averaging_window=avgWindow, detrend=bDetrend, nExp=nExp, hasNaN=False, fmax=fMax)
+            for pd, PSDi in zip(PDB, PSD):
+                spectrum0 = pd._spectrumCache()
+                if spectrum0 is not None:
+                    spectrum0((avgMethod, avgWindow, bDetrend, nExp, dt, fMax), lambda: (frq, PSDi, Info))
+                pd._fromPSD(frq, PSDi, Info, yType=yType, xType=xType, bDetrend=bDetrend, nPerDecade=nPerDecade)
+    return Info
+
+
+def crossMultiplePD(PD, yType='Coherence', avgWindow='Hamming', bDetrend=True, nExp=8):
+    """ 
+    Cross-spectra between the first PlotData (reference) and the others (responses).
+    The responses are interpolated on the x values of the reference if needed.
+    The segment FFTs of the reference are computed once for all responses (see spectral.cross_spectra).
+       yType: Coherence, |H1|, Phase H1, |CSD|
+
+    return:
+      PD_cross: new PlotData list, one per response, with x the frequency
+    """
+    from pydatview.tools.spectral import cross_spectra, cross_spectra_output
+    if len(PD)<2:
+        raise Exception('Warn: Select at least two signals for cross-spectra (the first one is the reference)')
+    pdRef = PD[0]
+    dt = pdRef._fftDt()
+    for pd in PD[1:]:
+        pd._fftDt()
+    Y = np.vstack(_interpManyOnRef([(pdRef, pd) for pd in PD[1:]]))
+    if np.any(np.isnan(pdRef.y)) or np.any(np.isnan(Y)):
+        raise Exception('Warn: Cannot compute cross-spectra of signals containing NaN')
+    n = len(pdRef.y)
+    if dt is None:
+        dt = (np.max(pdRef.x)-np.min(pdRef.x))/(n-1)
+    nPerSeg = min(2**nExp, 2**int(np.log2(max(n,2))))
+    f, Pxx, Pyy, Pxy, Info = cross_spectra(pdRef.y, Y, fs=1/dt, window=avgWindow, nperseg=nPerSeg, detrend=bDetrend)
+    Out = cross_spectra_output(Pxx, Pyy, Pxy, yType)
+    i0 = 1 if bDetrend else 0 # mean value removed
+    uRef = unit(pdRef.sy)
+    if any([c in uRef for c in '/.* ']):
+        uRef = '({})'.format(uRef)
+    PD_cross=[]
+    for pd, y in zip(PD[1:], Out):
+        u = unit(pd.sy)
+        if yType=='Coherence':
+            sy = 'Coherence [-]'
+        elif yType=='|H1|':
+            sy = '|H1| [{}/{}]'.format(u, uRef) if len(u+uRef)>0 else '|H1|'
+        elif yType=='Phase H1':
+            sy = 'Phase H1 [deg]'
+        else:
+            sy = '|CSD| [{}.{}/Hz]'.format(u, uRef) if len(u+uRef)>0 else '|CSD|'
+        pdc = PlotData(f[i0:], y[i0:], sx='Frequency [Hz]' if unit(pdRef.sx)=='s' or pdRef.xIsDate else '', sy=sy)
+        pdc.id, pdc.it, pdc.ix, pdc.iy = pd.id, pd.it, pd.ix, pd.iy
+        pdc.SameCol  = getattr(pd, 'SameCol', False)
+        pdc.st       = pd.st
+        pdc.filename = pd.filename
+        pdc.tabname  = pd.tabname
+        pdc.syl      = '{} / {}'.format(no_unit(pd.sy), no_unit(pdRef.sy))
+        pdc._Info    = Info
+        PD_cross.append(pdc)
+    return PD_cross
+
+
+# --------------------------------------------------------------------------------}
+# --- Ensemble
+# --------------------------------------------------------------------------------{
+def ensembleMultiplePD(PD, percentiles=[5,50,95], nGrid=None):
+    """ 
+    Ensemble statistics of PlotData with the same column (e.g. many tables with the same columns)
+    PD: list of PlotData
+    percentiles: percentiles computed at each point of the common x grid
+
+    return:
+      PD_ens: new PlotData list, one per column, where y is the ensemble mean. 
+              The ensemble statistics are stored in the attribute `ensemble` (see stats.ensemble_stats)
+    """
+    from pydatview.tools.stats import ensemble_stats
+    if any([pd.yIsString or pd.yIsDate or pd.xIsString or pd.xIsDate for pd in PD]):
+        raise Exception('Warn: Cannot compute ensemble statistics of dates or strings')
+    PD_ens=[]
+    for sy in unique([pd.sy for pd in PD]):
+        PD_SameCol=[pd for pd in PD if pd.sy==sy]
+        # NOTE: the signals are streamed, the data of the PlotData are views on the tables
+        R = ensemble_stats(lambda: ((pd.x, pd.y) for pd in PD_SameCol), percentiles=percentiles, nGrid=nGrid)
+        pd0 = PD_SameCol[0]
+        pd = PlotData(R['x'], R['mean'], sx=pd0.sx, sy=pd0.sy)
+        pd.id, pd.it, pd.ix, pd.iy = pd0.id, pd0.it, pd0.ix, pd0.iy
+        pd.SameCol  = getattr(pd0, 'SameCol', False)
+        pd.st       = pd0.st
+        pd.filename = pd0.filename
+        pd.tabname  = '{} tables'.format(len(PD_SameCol))
+        pd.syl      = '{} (mean, {} tables)'.format(no_unit(sy), len(PD_SameCol))
+        pd.ensemble = R
+        pd.nEnsemble= len(PD_SameCol)
+        PD_ens.append(pd)
+    return PD_ens
+
+
+# --------------------------------------------------------------------------------}
+# --- Markov
+# --------------------------------------------------------------------------------{
+def markovMultiplePD(PD, nAmpl=20, nMean=20, bMerge=False):
+    """ 
+    Markov (range-mean) cycle matrices of PlotData, using ASTM rainflow counting (see fatigue.cycle_matrices).
+    The matrices of all the signals are binned at once.
+    PD: list of PlotData
+    bMerge: if True, the matrices of the signals with the same column (e.g. a set of load cases)
+            use the same bins and are summed into one matrix
+
+    return:
+      PD_mkv: new PlotData list. The matrix is stored in the attribute `image` (x: cycle mean, y: range, z: cycles),
+              x and y are the mean bins and the largest range of each mean bin.
+    """
+    from pydatview.tools.fatigue import cycle_matrices, rainflow_astm
+    if any([pd.yIsString or pd.yIsDate for pd in PD]):
+        raise Exception('Warn: Cannot compute cycle matrices of dates or strings')
+    def _y(pd):
+        return pd.y[~np.isnan(pd.y)] if pd.yHasNaN is not False else pd.y
+    if bMerge:
+        Groups = [[pd for pd in PD if pd.sy==sy] for sy in unique([pd.sy for pd in PD])]
+        M = [cycle_matrices([_y(pd) for pd in G], nAmpl, nMean, rainflow_astm, common=True) for G in Groups]
+        M = [(np.sum(C, axis=0), Ea[0], Em[0]) for C, Ea, Em in M]
+    else:
+        Groups = [[pd] for pd in PD]
+        C, Ea, Em = cycle_matrices([_y(pd) for pd in PD], nAmpl, nMean, rainflow_astm)
+        M = zip(C, Ea, Em)
+    PD_mkv=[]
+    for G, (C, Ea, Em) in zip(Groups, M):
+        pd0  = G[0]
+        ampl = (Ea[:-1]+Ea[1:])/2
+        mean = (Em[:-1]+Em[1:])/2
+        iMax = nAmpl-1-np.argmax(C[::-1,:]>0, axis=0) # last range bin with cycles
+        u    = unit(pd0.sy)
+        pd = PlotData(mean, np.where(np.any(C>0, axis=0), ampl[iMax], 0), 
+                sx='Mean [{}]'.format(u) if len(u)>0 else 'Mean', sy='Range [{}]'.format(u) if len(u)>0 else 'Range')
+        pd.id, pd.it, pd.ix, pd.iy = pd0.id, pd0.it, pd0.ix, pd0.iy
+        pd.SameCol  = getattr(pd0, 'SameCol', False)
+        pd.st       = pd0.st
+        pd.filename = pd0.filename
+        pd.tabname  = pd0.tabname if len(G)==1 else '{} tables'.format(len(G))
+        pd.syl      = pd0.syl if len(G)==1 else '{} ({} tables)'.format(no_unit(pd0.sy), len(G))
+        pd.image    = {'x':mean, 'y':ampl, 'z':C, 'zScale':'log', 'zLabel':'Cycles [-]'}
+        PD_mkv.append(pd)
+    return PD_mkv
 
 
 # --------------------------------------------------------------------------------}
 # ---  
 # --------------------------------------------------------------------------------{
+def _sameGrid(pdRef, pd):
+    """ True if the x values of two PlotData are the same, using their sampling properties """
+    if pd.x is pdRef.x:
+        return True
+    if len(pd.x)!=len(pdRef.x) or len(pd.x)==0:
+        return False
+    S, SRef = pd._xSampling(), pdRef._xSampling()
+    if S['uniform'] and SRef['uniform']:
+        return pd.x[0]==pdRef.x[0] and abs(S['dx']-SRef['dx'])<=1e-12*abs(SRef['dx'])
+    return False
+
+def _interpManyOnRef(Pairs):
+    """ 
+    Values of pd.y at pdRef.x for a list of pairs (pdRef, pd).
+    The interpolation weights are computed once per pair of x arrays (e.g. for all columns of a table) 
+    and applied to all the signals sharing them at once.
+    """
+    from pydatview.tools.signal import interpWeights, interpApply
+    Y = [None]*len(Pairs)
+    Keys = [(id(pdRef.x), id(pd.x)) for pdRef,pd in Pairs]
+    for key in unique(Keys):
+        I = [i for i,k in enumerate(Keys) if k==key]
+        pdRef, pd = Pairs[I[0]]
+        if _sameGrid(pdRef, pd):
+            for i in I:
+                Y[i] = Pairs[i][1].y
+            continue
+        if len(I)==1 or not pd._xSampling()['increasing']:
+            for i in I:
+                Y[i] = np.interp(pdRef.x, Pairs[i][1].x, Pairs[i][1].y)
+            continue
+        w = interpWeights(pdRef.x, pd.x)
+        YI = interpApply(np.vstack([Pairs[i][1].y for i in I]), w)
+        for i,y in zip(I, YI):
+            Y[i] = y
+    return Y
+
+def _interpOnRef(pdRef, pd):
+    """ Values of pd.y at pdRef.x, interpolation is skipped if the grids are the same """
+    if _sameGrid(pdRef, pd):
+        return pd.y
+    return np.interp(pdRef.x, pd.x, pd.y)
+
 def compareMultiplePD(PD, mode, sComp):
     """ 
     PD: list of PlotData
@@ -718,7 +1308,7 @@ def compareMultiplePD(PD, mode, sComp):
         xRef = PD[0].x
         yRef = PD[0].y
         PD[1].syl=SS
-        y=np.interp(xRef,PD[1].x,PD[1].y)
+        y=_interpOnRef(PD[0], PD[1])
         if sComp=='Y-Y':
             PD[1].x=yRef
             PD[1].y=y
@@ -750,35 +1340,38 @@ def compareMultiplePD(PD, mode, sComp):
                 pd.x=xRef
                 pd.y=Error
         PD_comp=PD[1:]
-    elif mode =='nTabs_SameCols':
-        # --- Compare different tables, same column
-        #print('Several Tabs, same columns')
-        uiy=unique([pd.iy for pd in PD])
+    elif mode in ['nTabs_SameCols', 'nTabs_SimCols']:
+        # --- Compare different tables, same columns, or similar columns (matched by selection order)
         uit=unique([pd.it for pd in PD])
+        if mode=='nTabs_SameCols':
+            keys = [pd.iy for pd in PD]
+        else:
+            keys = [[p.it for p in PD[:i]].count(pd.it) for i,pd in enumerate(PD)] # position within its table
+        Groups = [[pd for pd,k in zip(PD,keys) if k==key] for key in unique(keys)]
+        # Interpolation on the reference x, one set of weights per pair of x
+        for G in Groups:
+            if any([pd.xIsString and len(G[0].x)!=len(pd.x) for pd in G[1:]]):
+                raise Exception('X values have different length and are strings, cannot interpolate string. Use `Index` for x instead.')
+        Pairs = [(G[0], pd) for G in Groups for pd in G[1:] if not pd.xIsString]
+        for (_,pd), y in zip(Pairs, _interpManyOnRef(Pairs)):
+            pd.y = y
         PD_comp=[]
-        for iy in uiy:
-            PD_SameCol=[pd for pd in PD if pd.iy==iy]
-            xRef = PD_SameCol[0].x
-            yRef = PD_SameCol[0].y
-            ylabelAll=getErrorLabel(PD_SameCol[0].sy)
+        for PD_SameCol in Groups:
+            pdRef= PD_SameCol[0]
+            xRef = pdRef.x
+            yRef = pdRef.y
+            ylabelAll=getErrorLabel(pdRef.sy)
             for pd in PD_SameCol[1:]:
-                if pd.xIsString:
-                    if len(xRef)==len(pd.x):
-                        pass # fine able to interpolate
-                    else:
-                        raise Exception('X values have different length and are strings, cannot interpolate string. Use `Index` for x instead.')
-                else:
-                    pd.y=np.interp(xRef,pd.x,pd.y)
                 if sComp=='Y-Y':
                     pd.x=yRef
-                    pd.sx=PD_SameCol[0].st+', '+PD_SameCol[0].sy
+                    pd.sx=pdRef.st+', '+pdRef.sy
                     if len(PD_SameCol)==1:
                         pd.sy =pd.st+', '+pd.sy
                     else:
                         pd.syl= pd.st
                 else:
                     if len(uit)<=2:
-                        pd.syl = pd.st+' wrt. '+PD_SameCol[0].st+', '+pd.sy
+                        pd.syl = pd.st+' wrt. '+pdRef.st+', '+pd.sy
                     else:
                         pd.syl = pd.st+'|'+pd.sy
                     pd.sx  = xlabelAll
@@ -787,10 +1380,6 @@ def compareMultiplePD(PD, mode, sComp):
                     pd.x=xRef
                     pd.y=Error
                 PD_comp.append(pd)
-    elif mode =='nTabs_SimCols':
-        # --- Compare different tables, similar columns
-        print('Several Tabs, similar columns, TODO')
-        PD_comp=[]
 
     return PD_comp
 
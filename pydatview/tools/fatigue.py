@@ -29,12 +29,18 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from __future__ import absolute_import
 from future import standard_library
+import os
 import warnings
 standard_library.install_aliases()
 import numpy as np
+try:
+    from numba import njit as _njit # optional, JIT-compilation of the rainflow kernels
+except ImportError:
+    _njit = None
 
 
 __all__  = ['rainflow_astm', 'rainflow_windap','eq_load','eq_load_and_cycles','cycle_matrix','cycle_matrix2']
+__all__ += ['turning_points', 'eq_load_from_cycles', 'eq_load_batch', 'RainflowCounter', 'rainflow_astm_streaming', 'cycle_matrices']
 
 
 def check_signal(signal):
@@ -52,7 +58,7 @@ def check_signal(signal):
         raise TypeError("Signal contains no variation")
 
 
-def rainflow_windap(signal, levels=255., thresshold=(255 / 50)):
+def rainflow_windap(signal, levels=255., thresshold=(255 / 50), fast=True):
     """Windap equivalent rainflow counting
 
 
@@ -74,6 +80,11 @@ def rainflow_windap(signal, levels=255., thresshold=(255 / 50)):
         Cycles smaller than this thresshold are ignored
         255/50 is equivalent to the implementation in Windap
 
+    fast : bool, optional
+        If True, the signal is reduced to its turning points before the peak-trough
+        extraction and the counting is done on preallocated arrays (see _rainflow_windap_fast).
+        If False, the reference python implementation is used. Both give the same results.
+
     Returns
     -------
     ampl : array-like
@@ -91,34 +102,36 @@ def rainflow_windap(signal, levels=255., thresshold=(255 / 50)):
     check_signal(signal)
     #type <double> is required by <find_extreme> and <rainflow>
     signal = signal.astype(np.double)
-    if np.all(np.isnan(signal)):
-        return None
-    offset = np.nanmin(signal)
+    # NOTE: min/max propagate NaN, the (slower) NaN-aware functions are used only when needed
+    offset, smax = np.min(signal), np.max(signal)
+    if np.isnan(offset):
+        if np.all(np.isnan(signal)):
+            return None
+        offset, smax = np.nanmin(signal), np.nanmax(signal)
     signal -= offset
-    if np.nanmax(signal) > 0:
-        gain = np.nanmax(signal) / levels
+    smax   -= offset
+    if smax > 0:
+        gain = smax / levels
         signal = signal / gain
-        signal = np.round(signal).astype(np.int)
-
-
-        # If possible the module is compiled using cython otherwise the python implementation is used
-
-
-        #Convert to list of local minima/maxima where difference > thresshold
-        sig_ext = peak_trough(signal, thresshold)
+        signal = np.round(signal).astype(int)
 
+        if fast:
+            ampl_mean = _rainflow_windap_fast(signal, thresshold)
+        else:
+            #Convert to list of local minima/maxima where difference > thresshold
+            sig_ext = peak_trough(signal, thresshold)
 
-        #rainflow count
-        ampl_mean = pair_range_amplitude_mean(sig_ext)
+            #rainflow count
+            ampl_mean = pair_range_amplitude_mean(sig_ext)
 
-        ampl_mean = np.array(ampl_mean)
+            ampl_mean = np.array(ampl_mean)
         ampl_mean = np.round(ampl_mean / thresshold) * gain * thresshold
         ampl_mean[:, 1] += offset
         return ampl_mean.T
 
 
 
-def rainflow_astm(signal):
+def rainflow_astm(signal, fast=True):
     """Matlab equivalent rainflow counting
 
     Calculate the amplitude and mean values of half cycles in signal
@@ -131,6 +144,10 @@ def rainflow_astm(signal):
     Signal : array-like
         The raw signal
 
+    fast : bool, optional
+        If True, vectorized turning points and counting on preallocated arrays (see _rainflow_astm_fast).
+        If False, the reference python implementation is used. Both give the same results.
+
     Returns
     -------
     ampl : array-like
@@ -151,6 +168,9 @@ def rainflow_astm(signal):
     # type <double> is reuqired by <find_extreme> and <rainflow>
     signal = signal.astype(np.double)
 
+    if fast:
+        return _rainflow_astm_fast(signal).T
+
     # Import find extremes and rainflow.
     # If possible the module is compiled using cython otherwise the python implementation is used
 
@@ -240,10 +260,41 @@ def eq_load_and_cycles(signals, no_bins=46, m=[3, 4, 6, 8, 10, 12], neq=[10 ** 6
     if 0:  #to be similar to windap
         ampl_bin_mean = (ampl_bin_edges[:-1] + ampl_bin_edges[1:]) / 2
     cycles, ampl_bin_mean = cycles.flatten(), ampl_bin_mean.flatten()
+    eq_loads = eq_load_from_cycles(cycles, ampl_bin_mean, m, neq)
+    return eq_loads, cycles, ampl_bin_mean, ampl_bin_edges
+
+
+def eq_load_from_cycles(cycles, ampl_bin_mean, m=[3, 4, 6, 8, 10, 12], neq=1):
+    """Equivalent loads from a rainflow cycle histogram (see eq_load_and_cycles)
+
+    The histogram is reduced for all the Wohler exponents and equivalent numbers at once,
+    such that a single rainflow count can be used for any set of exponents.
+
+    Parameters
+    ----------
+    cycles : array-like
+        Number of (full) cycles per amplitude bin
+    ampl_bin_mean : array-like
+        Mean amplitude of the bins
+    m : int, float or array-like, optional
+        Wohler exponent(s)
+    neq : int, float or array-like, optional
+        Equivalent number(s) of load cycles
+
+    Returns
+    -------
+    eq_loads : list of lists
+        Equivalent loads, eq_loads[i_neq][i_m]
+    """
+    m   = np.atleast_1d(m).astype(float)
+    neq = np.atleast_1d(neq).astype(float)
+    cycles, ampl_bin_mean = np.asarray(cycles).flatten(), np.asarray(ampl_bin_mean).flatten()
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
-        eq_loads = [[((np.nansum(cycles * ampl_bin_mean ** _m) / _neq) ** (1. / _m)) for _m in np.atleast_1d(m)]  for _neq in np.atleast_1d(neq)]
-    return eq_loads, cycles, ampl_bin_mean, ampl_bin_edges
+        with np.errstate(all='ignore'):
+            damage   = np.nansum(cycles[np.newaxis,:] * ampl_bin_mean[np.newaxis,:] ** m[:,np.newaxis], axis=1) # (nm)
+            eq_loads = (damage[np.newaxis,:] / neq[:,np.newaxis]) ** (1. / m[np.newaxis,:])
+    return eq_loads.tolist()
 
 
 def cycle_matrix(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_windap):
@@ -287,7 +338,10 @@ def cycle_matrix(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_win
     """
 
     if isinstance(signals[0], tuple):
-        weights, ampls, means = np.array([(np.zeros_like(ampl)+weight,ampl,mean) for weight, signal in signals for ampl,mean in rainflow_func(signal[:]).T], dtype=np.float64).T
+        AM = [np.asarray(rainflow_func(signal[:]), dtype=np.float64) for _, signal in signals]
+        ampls   = np.concatenate([am[0] for am in AM])
+        means   = np.concatenate([am[1] for am in AM])
+        weights = np.concatenate([np.full(am.shape[1], weight, dtype=np.float64) for (weight, _), am in zip(signals, AM)])
     else:
         ampls, means = rainflow_func(signals[:])
         weights = np.ones_like(ampls)
@@ -348,6 +402,277 @@ def cycle_matrix2(signal, nrb_amp, nrb_mean, rainflow_func=rainflow_windap):
 
     return cycles, ampl_edges, mean_edges
 
+def cycle_matrices(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_windap, weights=None, common=False):
+    """Markow (range-mean) load cycle matrices of several signals
+
+    The half cycles of all the signals are binned at once, with a single bincount on the 
+    flattened (signal, amplitude bin, mean bin) indices. The bins follow np.histogram2d.
+    Matrices with the same bin edges are additive: the matrix of a set of files (e.g. lifetime
+    of a set of load cases) is the weighted sum of the matrices of the files.
+
+    Parameters
+    ----------
+    signals : list of array-like or 2D array
+        Raw signals (list, or columns of a 2D array)
+    ampl_bins : int or array-like, optional
+        if int, Number of amplitude bins, from 0 to the maximum amplitude of the signal
+        if array-like, the bin edges for amplitude, for all the signals
+    mean_bins : int or array-like, optional
+        if int, Number of mean value bins, from the minimum to the maximum mean value of the signal
+        if array-like, the bin edges for mean, for all the signals
+    rainflow_func : {rainflow_windap, rainflow_astm}, optional
+        The rainflow counting function to use (default is rainflow_windap)
+    weights : array-like, optional
+        Weight of each signal
+    common : bool, optional
+        If True, the bins (if int) are computed from the cycles of all the signals, such that 
+        the matrices are additive
+
+    Returns
+    -------
+    cycles : ndarray, shape(n_signals, ampl_bins, mean_bins)
+        Load cycles (full cycles) of each signal, same as cycle_matrix
+    ampl_edges : ndarray, shape(n_signals, ampl_bins+1)
+        The amplitude bin edges
+    mean_edges : ndarray, shape(n_signals, mean_bins+1)
+        The mean bin edges
+    """
+    if isinstance(signals, np.ndarray) and signals.ndim==2:
+        signals = list(signals.T)
+    n = len(signals)
+    W = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    AM = []
+    for signal in signals:
+        try:
+            AM.append(np.asarray(rainflow_func(np.asarray(signal)), dtype=np.float64))
+        except TypeError:
+            AM.append(np.zeros((2,0))) # Signal contains no variation
+    nCyc  = [am.shape[1] for am in AM]
+    iSig  = np.repeat(np.arange(n), nCyc)
+    S     = [slice(i0, i1) for i0, i1 in zip(np.cumsum([0]+nCyc[:-1]), np.cumsum(nCyc))] # half cycles of each signal
+    ampls = np.concatenate([am[0] for am in AM])
+    means = np.concatenate([am[1] for am in AM])
+
+    def _edges(bins, values, iAmpl):
+        """ Bin edges of each signal """
+        if not isinstance(bins, (int, np.integer)):
+            return np.tile(np.asarray(bins, dtype=np.float64), (n, 1))
+        def _range(v):
+            if len(v)==0:
+                return 0, 1 # Same as np.histogram2d
+            lo, hi = (0, np.max(v)) if iAmpl else (np.min(v), np.max(v))
+            return (lo-0.5, hi+0.5) if lo==hi else (lo, hi)
+        if common:
+            R = [_range(values)]*n
+        else:
+            R = [_range(values[s]) for s in S]
+        return np.array([np.linspace(lo, hi, bins+1) for lo, hi in R])
+    ampl_edges = _edges(ampl_bins, ampls, True)
+    mean_edges = _edges(mean_bins, means, False)
+    nA, nM = ampl_edges.shape[1]-1, mean_edges.shape[1]-1
+
+    def _index(values, edges):
+        """ Bin index of each value in the edges of its signal, -1 if outside """
+        idx = np.empty(len(values), dtype=np.int64)
+        for i, s in enumerate(S):
+            idx[s] = np.searchsorted(edges[i], values[s], side='right') - 1
+            idx[s][values[s]==edges[i][-1]] = edges.shape[1]-2 # Last bin includes its right edge
+        idx[idx>=edges.shape[1]-1] = -1
+        return idx
+    ia = _index(ampls, ampl_edges)
+    im = _index(means, mean_edges)
+    b  = (ia>=0) & (im>=0)
+    flat = (iSig[b]*nA + ia[b])*nM + im[b]
+    cycles = np.bincount(flat, weights=W[iSig[b]], minlength=n*nA*nM).reshape(n, nA, nM)
+    cycles = cycles / 2  # to get full cycles
+    return cycles, ampl_edges, mean_edges
+
+# --------------------------------------------------------------------------------}
+# --- Batch equivalent loads
+# --------------------------------------------------------------------------------{
+def eq_load_batch(sources, channels, m=[3, 4, 6, 8, 10, 12], neq=1, weights=None, no_bins=46, rainflow_func=rainflow_windap,
+        reader=None, nProcesses=None, checkpoint=None, verbose=True):
+    """Equivalent loads of several channels for many files (e.g. load cases)
+
+    The rainflow counting of each file is done in a pool of processes, only the cycle histograms
+    (see eq_load_and_cycles) are sent back, and the equivalent loads of all the Wohler exponents
+    are obtained from them (see eq_load_from_cycles).
+
+    Parameters
+    ----------
+    sources : list or TableList
+        list of filenames, or of pandas DataFrames, or a TableList
+    channels : list of str
+        Column names of the signals
+    m : int, float or array-like, optional
+        Wohler exponent(s)
+    neq : int, float or array-like, optional
+        Equivalent number(s) of load cycles
+    weights : array-like, optional
+        Weight of each source (e.g. probability of the load case times lifetime over duration).
+        If provided, the weighted (lifetime) equivalent loads are returned with the source 'Lifetime'
+    reader : function, optional
+        Function returning a DataFrame from a filename. Default: first dataframe read with weio
+    nProcesses : int, optional
+        Number of processes, default is the number of cores. If 1, no pool is used.
+    checkpoint : str, optional
+        File where the histograms are stored (one line per source) as soon as they are computed.
+        If the file exists, the sources it contains are not processed again (resume after an interruption).
+        The file starts with the channels, no_bins and rainflow_func it was written with, an Exception
+        is raised if they differ. DataFrames are identified by a hash of their channels.
+        Sources that could not be read are not stored.
+    verbose : bool, optional
+        Report the progress and throughput
+
+    Returns
+    -------
+    df : pandas DataFrame
+        One row per source, channel, Wohler exponent and equivalent number.
+        Columns: iSource, source, channel, weight, m, neq, DEL
+    """
+    import json
+    import time
+    import pandas as pd
+    if hasattr(sources, 'getTabs'):
+        # TableList, only the needed columns are sent to the processes
+        sources = [dict([(c, t.data[c].values) for c in channels if c in t.data.columns]) for t in sources.getTabs()]
+    keys = [s if isinstance(s, str) else 'Source {:d}'.format(i) for i, s in enumerate(sources)]
+    if checkpoint is not None:
+        ids = [s if isinstance(s, str) else _source_id(i, s, channels) for i, s in enumerate(sources)]
+        header = {'channels':list(channels), 'no_bins':no_bins, 'rainflow_func':getattr(rainflow_func, '__name__', str(rainflow_func))}
+    if weights is None:
+        W = np.ones(len(sources))
+    else:
+        W = np.asarray(weights, dtype=float)
+        if len(W)!=len(sources):
+            raise Exception('The number of weights ({}) is different from the number of sources ({})'.format(len(W), len(sources)))
+    # --- Histograms already computed
+    Hists = {}
+    newFile = checkpoint is not None and (not os.path.exists(checkpoint) or os.path.getsize(checkpoint)==0)
+    if checkpoint is not None and not newFile:
+        with open(checkpoint, 'r') as fid:
+            lines = (line for line in fid if len(line.strip())>0)
+            try:
+                d = json.loads(next(lines))
+            except (StopIteration, ValueError):
+                d = {}
+            if d.get('header', None)!=header:
+                raise Exception('The checkpoint file {} was not written with the same parameters ({}), use another file'.format(checkpoint, header))
+            for line in lines:
+                try:
+                    d = json.loads(line)
+                except ValueError:
+                    continue # line interrupted while written
+                if d['iSource']<len(ids) and ids[d['iSource']]==d['source'] and all([ch in d['hists'] for ch in channels]):
+                    Hists[d['iSource']] = d['hists']
+        if verbose and len(Hists)>0:
+            print('[INFO] Fatigue: {} sources read from checkpoint file {}'.format(len(Hists), checkpoint))
+    # --- Rainflow counting
+    tasks = [(i, s, channels, no_bins, rainflow_func, reader) for i, s in enumerate(sources) if i not in Hists]
+    t0 = time.time()
+    fid = open(checkpoint, 'a') if checkpoint is not None else None
+    if newFile:
+        fid.write(json.dumps({'header':header})+'\n')
+        fid.flush()
+    def _store(res, nDone):
+        i, hists, warn = res
+        if len(warn)>0:
+            print('[WARN] {}: {}'.format(keys[i], warn))
+        if hists is None:
+            # Source not read, not stored in the checkpoint such that it is read again when resuming
+            hists = {}
+        elif fid is not None:
+            fid.write('\n'+json.dumps({'iSource':i, 'source':ids[i], 'hists':hists})+'\n')
+            fid.flush()
+        Hists[i] = hists
+        if verbose and (nDone % max(1, len(tasks)//20)==0 or nDone==len(tasks)):
+            dt = max(time.time()-t0, 1e-9)
+            print('[INFO] Fatigue: {}/{} sources - {:.1f} sources/s - {:.1f} channels/s'.format(nDone, len(tasks), nDone/dt, nDone*len(channels)/dt))
+    try:
+        if nProcesses==1 or len(tasks)<=1:
+            for nDone, task in enumerate(tasks):
+                _store(_eq_load_batch_worker(task), nDone+1)
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(nProcesses)
+            try:
+                for nDone, res in enumerate(pool.imap_unordered(_eq_load_batch_worker, tasks)):
+                    _store(res, nDone+1)
+            finally:
+                pool.terminate()
+    finally:
+        if fid is not None:
+            fid.close()
+    # --- Equivalent loads
+    m, neq = np.atleast_1d(m), np.atleast_1d(neq)
+    nan  = [[np.nan]*len(m)]*len(neq)
+    rows = []
+    def _rows(i, key, weight, ch, eq):
+        for ineq, _neq in enumerate(neq):
+            for im, _m in enumerate(m):
+                rows.append((i, key, ch, weight, _m, _neq, eq[ineq][im]))
+    for ch in channels:
+        for i in range(len(sources)):
+            h = Hists[i].get(ch, None)
+            _rows(i, keys[i], W[i], ch, nan if h is None else eq_load_from_cycles(h[0], h[1], m, neq))
+        if weights is not None:
+            # Lifetime: weighted histograms of all the sources
+            H = [(W[i]*np.asarray(Hists[i][ch][0], dtype=float), np.asarray(Hists[i][ch][1], dtype=float)) for i in range(len(sources)) if Hists[i].get(ch, None) is not None]
+            if len(H)==0:
+                _rows(-1, 'Lifetime', np.sum(W), ch, nan)
+            else:
+                _rows(-1, 'Lifetime', np.sum(W), ch, eq_load_from_cycles(np.concatenate([h[0] for h in H]), np.concatenate([h[1] for h in H]), m, neq))
+    return pd.DataFrame(rows, columns=['iSource', 'source', 'channel', 'weight', 'm', 'neq', 'DEL'])
+
+
+def _eq_load_batch_worker(task):
+    """ Cycle histograms of the channels of one source, see eq_load_batch.
+    Returns the source index, a dictionary channel: [cycles, ampl_bin_mean] (None if no variation),
+    or None if the source could not be read, and a warning """
+    i, source, channels, no_bins, rainflow_func, reader = task
+    warn = ''
+    if isinstance(source, str):
+        try:
+            source = (reader or _read_dataframe)(source)
+        except Exception as e:
+            return i, None, 'Cannot read file ({})'.format(e)
+    hists = {}
+    missing = []
+    for ch in channels:
+        if ch not in source:
+            missing.append(ch)
+            continue
+        try:
+            cycles, ampl_bin_mean, _, _, _ = cycle_matrix(np.asarray(source[ch], dtype=float), no_bins, 1, rainflow_func)
+            hists[ch] = [cycles.flatten().tolist(), ampl_bin_mean.flatten().tolist()]
+        except TypeError:
+            hists[ch] = None
+    if len(missing)>0:
+        warn = 'Channels missing: {}'.format(', '.join(missing))
+    return i, hists, warn
+
+
+def _source_id(i, source, channels):
+    """ Identifier of a DataFrame (or dictionary of arrays) in a checkpoint file of eq_load_batch:
+    index and hash of the channels """
+    import hashlib
+    h = hashlib.sha1()
+    for ch in channels:
+        if ch in source:
+            h.update(str(ch).encode('utf-8'))
+            h.update(np.ascontiguousarray(source[ch], dtype=float).tobytes())
+    return 'Source {:d} ({})'.format(i, h.hexdigest())
+
+
+def _read_dataframe(filename):
+    """ Default reader of eq_load_batch: first dataframe of a file read with weio """
+    import weio
+    dfs = weio.read(filename).toDataFrame()
+    if isinstance(dfs, dict):
+        dfs = dfs[list(dfs.keys())[0]]
+    return dfs
+
+
 # --------------------------------------------------------------------------------}
 # --- Rainflowcount_astm.py
 # --------------------------------------------------------------------------------{
@@ -468,7 +793,7 @@ def peak_trough(x, R):  #cpdef np.ndarray[long,ndim=1] peak_trough(np.ndarray[lo
     MINZO = 1
     MAXZO = 2
     ENDZO = 3
-    S = np.zeros(x.shape[0] + 1, dtype=np.int)
+    S = np.zeros(x.shape[0] + 1, dtype=int)
 
     L = x.shape[0]
     goto = BEGIN
@@ -747,6 +1072,404 @@ def pair_range_amplitude_mean(x):  # cpdef pair_range(np.ndarray[long,ndim=1]  x
 
 
 
+# --------------------------------------------------------------------------------}
+# --- Fast rainflow engine 
+# --------------------------------------------------------------------------------{
+# The functions above are kept as reference. The kernels below are the same algorithms
+# written on preallocated buffers, JIT-compiled with numba when it is installed. 
+# Without numba, the same kernels are run on python lists (faster than numpy scalars).
+def turning_points(signal):
+    """
+    Vectorized version of find_extremes: local minima and maxima of signal, plus its first 
+    and last values. Plateaus take the direction of the preceding slope.
+    """
+    signal = np.asarray(signal)
+    if len(signal)<2:
+        return signal.copy()
+    sign_grad = np.sign(np.diff(signal)).astype(np.int8)
+    nz, = np.nonzero(sign_grad)
+    if len(nz)==0:
+        # All values are equal
+        return signal[:1]
+    # First element set to the first slope, then plateaus forward-filled with the preceding slope
+    sign_grad[0] = sign_grad[nz[0]]
+    idx = np.where(sign_grad!=0, np.arange(len(sign_grad)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    sign_grad = sign_grad[idx]
+    keep = np.ones(len(signal), dtype=bool)
+    keep[1:-1] = sign_grad[1:]*sign_grad[:-1] < 0
+    return signal[keep]
+
+
+def _rainflow_astm_kernel(sig, a, ampl, mean):
+    """ Same as rainflowcount, with a preallocated stack `a` and outputs (length of sig). 
+    Returns the number of half cycles written in ampl and mean """
+    na = 0
+    k  = 0
+    for i in range(len(sig)):
+        a[na] = sig[i]
+        na += 1
+        while na > 2 and abs(a[na-3] - a[na-2]) <= abs(a[na-2] - a[na-1]):
+            r = abs(a[na-3] - a[na-2])
+            m = (a[na-3] + a[na-2]) / 2
+            if na == 3:
+                a[0] = a[1]
+                a[1] = a[2]
+                na = 2
+                if r > 0:
+                    ampl[k] = r
+                    mean[k] = m
+                    k += 1
+            else:
+                a[na-3] = a[na-1]
+                na -= 2
+                if r > 0:
+                    ampl[k]   = r
+                    mean[k]   = m
+                    ampl[k+1] = r
+                    mean[k+1] = m
+                    k += 2
+    for j in range(na - 1):
+        r = abs(a[j] - a[j+1])
+        m = (a[j] + a[j+1]) / 2
+        if r > 0:
+            ampl[k] = r
+            mean[k] = m
+            k += 1
+    return k
+
+
+def _peak_trough_kernel(x, R, S):
+    """ Same as peak_trough, with a preallocated output S (length of x + 1). 
+    Returns n, the values are S[1:n+1] """
+    L      = len(x)
+    trough = x[0]
+    peak   = x[0]
+    i = 0
+    p = 1
+    f = 0
+    # BEGIN
+    while True:
+        i += 1
+        if i == L:
+            break
+        if x[i] > peak:
+            peak = x[i]
+            if peak - trough >= R:
+                S[p] = trough
+                f = 1
+                break
+        elif x[i] < trough:
+            trough = x[i]
+            if peak - trough >= R:
+                S[p] = peak
+                f = -1
+                break
+    # MINZO (f=-1) / MAXZO (f=1)
+    while i < L and f != 0:
+        i += 1
+        if i == L:
+            break
+        if f == -1:
+            if x[i] < trough:
+                trough = x[i]
+            elif x[i] - trough >= R:
+                p += 1
+                S[p] = trough
+                peak = x[i]
+                f = 1
+        else:
+            if x[i] > peak:
+                peak = x[i]
+            elif peak - x[i] >= R:
+                p += 1
+                S[p] = peak
+                trough = x[i]
+                f = -1
+    # ENDZO
+    n = p + 1
+    if f == 1:
+        S[n] = peak
+    elif f == -1:
+        S[n] = trough
+    else:
+        S[n] = int((trough + peak) / 2) # S is an integer array in peak_trough
+    return n
+
+
+def _pair_range_kernel(x, S, ampl, mean):
+    """ Same as pair_range_amplitude_mean, with a preallocated stack S (length of x + 1) and 
+    outputs (length of x). Returns the number of half cycles written in ampl and mean """
+    n = len(x)
+    S[1] = x[0]
+    ptr = 1
+    p = 1
+    q = 1
+    k = 0
+    # phase 1
+    while True:
+        p += 1
+        q += 1
+        S[p] = x[ptr]
+        ptr += 1
+        while p >= 4:
+            if (S[p - 2] > S[p - 3] and S[p - 1] >= S[p - 3] and S[p] >= S[p - 2]) or \
+               (S[p - 2] < S[p - 3] and S[p - 1] <= S[p - 3] and S[p] <= S[p - 2]):
+                r = abs(S[p - 2] - S[p - 1])
+                m = (S[p - 2] + S[p - 1]) / 2
+                ampl[k]   = r
+                mean[k]   = m
+                ampl[k+1] = r
+                mean[k+1] = m
+                k += 2
+                S[p - 2] = S[p]
+                p -= 2
+            else:
+                break
+        if q == n:
+            break
+    # phase 2
+    for q in range(1, p):
+        ampl[k] = abs(S[q + 1] - S[q])
+        mean[k] = (S[q + 1] + S[q]) / 2
+        k += 1
+    return k
+
+
+if _njit is not None:
+    _rainflow_astm_kernel = _njit(nogil=True, cache=True)(_rainflow_astm_kernel)
+    _peak_trough_kernel   = _njit(nogil=True, cache=True)(_peak_trough_kernel)
+    _pair_range_kernel    = _njit(nogil=True, cache=True)(_pair_range_kernel)
+
+
+def _buffers(n, dtype=np.float64):
+    """ Zero buffer of length n: numpy array for the JIT kernels, python list otherwise """
+    if _njit is not None:
+        return np.zeros(n, dtype=dtype)
+    return [dtype(0).item()]*n
+
+
+def _kernel_input(x):
+    return x if _njit is not None else x.tolist()
+
+
+def _rainflow_astm_fast(signal):
+    """ Same as np.array(rainflowcount(find_extremes(signal))), returns an array (n x 2) of amplitudes and means """
+    sig = turning_points(signal)
+    n = len(sig)
+    ampl, mean = _buffers(n), _buffers(n)
+    k = _rainflow_astm_kernel(_kernel_input(sig), _buffers(n), ampl, mean)
+    return np.column_stack((np.asarray(ampl[:k], dtype=float), np.asarray(mean[:k], dtype=float)))
+
+
+def _rainflow_windap_fast(signal, R):
+    """ Same as np.array(pair_range_amplitude_mean(peak_trough(signal, R))) for an integer signal.
+    For R>0, the peak-trough extraction only depends on the turning points of the signal (the values
+    in between are never extrema), the signal is reduced to them first (vectorized). """
+    if R > 0:
+        signal = turning_points(signal)
+    S = _buffers(len(signal)+1, np.int64)
+    n = _peak_trough_kernel(_kernel_input(signal), R, S)
+    x = np.asarray(S[1:n+1], dtype=np.int64)
+    x = x - np.min(x)
+    ampl, mean = _buffers(n), _buffers(n)
+    k = _pair_range_kernel(_kernel_input(x), _buffers(n+1), ampl, mean)
+    return np.column_stack((np.asarray(ampl[:k], dtype=float), np.asarray(mean[:k], dtype=float)))
+
+
+
+# --------------------------------------------------------------------------------}
+# --- Streaming rainflow
+# --------------------------------------------------------------------------------{
+def _rainflow_stack_kernel(sig, a, na, continuation, ampl, mean):
+    """ Same as _rainflow_astm_kernel, on a stack `a` already containing na values (residue of the 
+    previous chunks), without counting the residue. 
+    If continuation, the bottom of the stack is the first sample of a part of a signal, and not 
+    necessarily a turning point: the start of the stack is never dropped, and a range is only closed
+    if it is enclosed by the preceding range (four-point rule, implicit in the ASTM stack otherwise).
+    Returns the number of values in the stack and the number of half cycles written in ampl and mean """
+    k = 0
+    for i in range(len(sig)):
+        a[na] = sig[i]
+        na += 1
+        while na > 2 and abs(a[na-3] - a[na-2]) <= abs(a[na-2] - a[na-1]):
+            r = abs(a[na-3] - a[na-2])
+            m = (a[na-3] + a[na-2]) / 2
+            if na == 3:
+                if continuation:
+                    break
+                a[0] = a[1]
+                a[1] = a[2]
+                na = 2
+                if r > 0:
+                    ampl[k] = r
+                    mean[k] = m
+                    k += 1
+            else:
+                if continuation and abs(a[na-4] - a[na-3]) < r:
+                    break
+                a[na-3] = a[na-1]
+                na -= 2
+                if r > 0:
+                    ampl[k]   = r
+                    mean[k]   = m
+                    ampl[k+1] = r
+                    mean[k+1] = m
+                    k += 2
+    return na, k
+
+
+if _njit is not None:
+    _rainflow_stack_kernel = _njit(nogil=True, cache=True)(_rainflow_stack_kernel)
+
+
+class RainflowCounter(object):
+    """
+    Incremental ASTM rainflow counting (see rainflow_astm), for signals that are read in chunks 
+    (large or memory-mapped files, live data).
+
+    Only the residue (the turning points of the cycles not closed yet) and the last sample are kept
+    between chunks, such that the memory is bounded by the chunk size plus the residue.
+    The half cycles are the same, and in the same order, as rainflow_astm on the concatenated signal.
+
+    Parts of a signal may be counted independently (e.g. consecutive files, in different processes)
+    with `continuation=True` for all the parts but the first, and combined with `merge`, in order.
+    The half cycles are then the same as for the concatenated signal, in a different order.
+
+    Examples
+    --------
+    >>> rf = RainflowCounter()
+    >>> for chunk in chunks:
+    >>>     ampl, mean = rf.add(chunk) # half cycles closed by the chunk
+    >>> ampl, mean = rf.cycles()       # all the half cycles, same as rainflow_astm(signal)
+    """
+    def __init__(self, continuation=False, keep=True):
+        """
+        continuation : bool, optional
+            If True, the signal is the continuation of another one, see merge
+        keep : bool, optional
+            If True, the closed half cycles are stored (see cycles), otherwise they are only
+            returned by add and merge (e.g. to accumulate histograms in bounded memory)
+        """
+        self.continuation = continuation
+        self.keep         = keep
+        self.n            = 0   # Number of samples counted
+        self._a           = np.zeros(0) # Stack of turning points
+        self._last        = None        # Last sample, pending
+        self._dir         = 0           # Sign of the last non-zero slope
+        self._ampl        = []
+        self._mean        = []
+
+    @property
+    def residue(self):
+        """ Turning points not part of a closed cycle yet (including the last sample) """
+        if self._last is None:
+            return self._a.copy()
+        return np.concatenate((self._a, [self._last]))
+
+    def add(self, signal):
+        """ Count the next chunk of the signal. Returns the half cycles closed by the chunk (ampl, mean)"""
+        x = np.asarray(signal, dtype=np.double).ravel()
+        self.n += len(x)
+        if len(x)==0:
+            return np.zeros((2,0))
+        if self._last is None:
+            # The first sample is always a turning point
+            self._push(x[:1])
+            self._last = x[0]
+        # Turning points of the chunk, the slope preceding the chunk is used for its first value
+        x = np.concatenate(([self._last], x))
+        sign_grad = np.zeros(len(x), dtype=np.int8)
+        sign_grad[0]  = self._dir
+        sign_grad[1:] = np.sign(np.diff(x))
+        nz, = np.nonzero(sign_grad)
+        self._last = x[-1]
+        if len(nz)==0:
+            return np.zeros((2,0))
+        sign_grad[0] = sign_grad[nz[0]]
+        idx = np.where(sign_grad!=0, np.arange(len(sign_grad)), 0)
+        np.maximum.accumulate(idx, out=idx)
+        sign_grad = sign_grad[idx]
+        self._dir = sign_grad[-1]
+        return self._push(x[:-1][sign_grad[:-1]*sign_grad[1:] < 0])
+
+    def _push(self, sig, update=True):
+        """ Push turning points on the stack, returns the half cycles closed.
+        If not update, the counter is not modified and the new stack is also returned """
+        n  = len(self._a) + len(sig)
+        a  = _buffers(n)
+        a[:len(self._a)] = _kernel_input(self._a)
+        ampl, mean = _buffers(n), _buffers(n)
+        na, k = _rainflow_stack_kernel(_kernel_input(sig), a, len(self._a), self.continuation, ampl, mean)
+        ampl, mean = np.asarray(ampl[:k], dtype=float), np.asarray(mean[:k], dtype=float)
+        if update:
+            self._a = np.asarray(a[:na], dtype=float)
+            if self.keep and k>0:
+                self._ampl.append(ampl)
+                self._mean.append(mean)
+            return np.array([ampl, mean])
+        return np.array([ampl, mean]), np.asarray(a[:na], dtype=float)
+
+    def merge(self, other):
+        """ Merge the count of the continuation of the signal (a counter with continuation=True).
+        Returns the half cycles closed by the merge (ampl, mean) """
+        if not other.continuation:
+            raise Exception('Only a counter with `continuation=True` can be merged')
+        if self.continuation and self._last is None:
+            raise Exception('The first part of the signal cannot be a continuation')
+        n = self.n + other.n
+        if other.keep:
+            self._ampl += other._ampl
+            self._mean += other._mean
+        closed = self.add(other.residue)
+        if other._dir!=0:
+            self._dir = other._dir
+        self.n = n
+        return closed
+
+    def cycles(self):
+        """ All the half cycles (ampl, mean), as if the signal ended with the last chunk, in the 
+        same order as rainflow_astm. The counter is not modified, such that chunks can still be added
+        (e.g. live data). If keep is False, only the half cycles of the residue are returned. """
+        if self._last is None:
+            return np.zeros((2,0))
+        closed, a = self._push(np.array([self._last]), update=False)
+        r = np.abs(a[1:] - a[:-1])
+        m = (a[1:] + a[:-1]) / 2
+        ampl = np.concatenate(self._ampl + [closed[0], r[r>0]])
+        mean = np.concatenate(self._mean + [closed[1], m[r>0]])
+        return np.array([ampl, mean])
+
+
+def rainflow_astm_streaming(signal, chunk_size=10**6):
+    """Same as rainflow_astm, with the signal read by chunks (see RainflowCounter)
+
+    Parameters
+    ----------
+    signal : array-like or iterable
+        - if array-like (e.g. numpy memmap), the raw signal, read by chunks of chunk_size samples\n
+        - if iterable (e.g. generator), the successive chunks of the signal
+    chunk_size : int, optional
+        Number of samples per chunk, if signal is array-like
+
+    Returns
+    -------
+    ampl : array-like
+        peak to peak amplitudes of the half cycles
+    mean : array-like
+        Mean values of the half cycles
+    """
+    if hasattr(signal, '__getitem__') and hasattr(signal, '__len__'):
+        chunks = (signal[i:i+chunk_size] for i in range(0, len(signal), chunk_size))
+    else:
+        chunks = signal
+    rf = RainflowCounter()
+    for chunk in chunks:
+        rf.add(chunk)
+    if rf._dir == 0:
+        raise TypeError("Signal contains no variation")
+    return rf.cycles()
+
 
 # --------------------------------------------------------------------------------}
 # --- Unittests
@@ -828,6 +1551,109 @@ class TestFatigue(unittest.TestCase):
                                                                                        [ 0., 0., 0., 0.],
                                                                                        [ 0., 0., 2., 1.]]))
 
+    def test_rainflow_fast(self):
+        # Fast engine gives the same half cycles as the reference implementations
+        np.random.seed(0)
+        signals = [np.random.normal(0,1,2000), np.round(np.random.normal(0,3,2000)), np.cumsum(np.random.normal(0,1,2000)),
+                   np.repeat(np.random.randint(0,4,300), 3).astype(float)]
+        for signal in signals:
+            np.testing.assert_array_equal(turning_points(signal), find_extremes(signal))
+            np.testing.assert_array_equal(rainflow_astm(signal), rainflow_astm(signal, fast=False))
+            for levels, thresshold in [(255., 255/50), (18, 2), (50, 0.5)]:
+                np.testing.assert_array_equal(rainflow_windap(signal, levels, thresshold), rainflow_windap(signal, levels, thresshold, fast=False))
+
+    def test_rainflow_streaming(self):
+        # Signal counted by chunks, or by parts merged, gives the same half cycles as a single pass
+        import tempfile
+        np.random.seed(0)
+        signals = [np.random.normal(0,1,2000), np.round(np.random.normal(0,3,2000)), np.cumsum(np.random.normal(0,1,2000)),
+                   np.repeat(np.random.randint(0,4,300), 3).astype(float)]
+        for signal in signals:
+            ref = rainflow_astm(signal)
+            for nChunks in [1, 7, 100]:
+                rf = RainflowCounter()
+                closed = [rf.add(chunk) for chunk in np.array_split(signal, nChunks)]
+                np.testing.assert_array_equal(rf.cycles(), ref)
+                np.testing.assert_array_equal(np.concatenate(closed+[rf.cycles()[:,np.sum([c.shape[1] for c in closed]):]], axis=1), ref)
+                # Parts counted independently
+                parts = [RainflowCounter(continuation=i>0, keep=True) for i in range(nChunks)]
+                for rfp, part in zip(parts, np.array_split(signal, nChunks)):
+                    rfp.add(part)
+                for rfp in parts[1:]:
+                    parts[0].merge(rfp)
+                cycles = parts[0].cycles()
+                np.testing.assert_array_equal(cycles[:, np.lexsort(cycles)], ref[:, np.lexsort(ref)])
+                self.assertEqual(parts[0].n, len(signal))
+        # Memory-mapped file
+        fname = os.path.join(tempfile.mkdtemp(), 'signal.dat')
+        signals[2].tofile(fname)
+        mm = np.memmap(fname, dtype=np.float64, mode='r')
+        np.testing.assert_array_equal(rainflow_astm_streaming(mm, chunk_size=123), rainflow_astm(signals[2]))
+        del mm
+        os.remove(fname)
+        self.assertRaises(TypeError, rainflow_astm_streaming, np.ones(10))
+
+    def test_cycle_matrices(self):
+        # Matrices of several signals at once, same as cycle_matrix, and additive with common bins
+        np.random.seed(0)
+        signals = [np.random.normal(0,1,3000)*(i+1)+i for i in range(3)] + [np.ones(10)]
+        for rainflow_func in [rainflow_windap, rainflow_astm]:
+            cycles, ampl_edges, mean_edges = cycle_matrices(signals, 12, 7, rainflow_func)
+            for i, signal in enumerate(signals[:3]):
+                c, _, ae, _, me = cycle_matrix(signal, 12, 7, rainflow_func)
+                np.testing.assert_array_equal(cycles[i], c)
+                np.testing.assert_allclose(ampl_edges[i], ae)
+                np.testing.assert_allclose(mean_edges[i], me)
+            self.assertEqual(np.sum(cycles[3]), 0)
+            cycles, ampl_edges, mean_edges = cycle_matrices(np.column_stack(signals[:3]), 12, 7, rainflow_func, weights=[1,2,3], common=True)
+            c = cycle_matrix([(1,signals[0]), (2,signals[1]), (3,signals[2])], ampl_edges[0], mean_edges[0], rainflow_func)[0]
+            np.testing.assert_allclose(np.sum(cycles, axis=0), c)
+
+    def test_eq_load_batch(self):
+        # Batch of sources, with a pool, a checkpoint file and weights
+        import tempfile
+        import pandas as pd
+        np.random.seed(0)
+        t   = np.linspace(0, 100, 2001)
+        dfs = [pd.DataFrame({'a': np.sin(t)*(i+1) + np.random.normal(0,0.1,len(t)), 'b': np.cos(2*t)+i}) for i in range(3)]
+        df1 = eq_load_batch(dfs, ['a','b'], m=[3,10], neq=[1,100], nProcesses=1, verbose=False)
+        self.assertEqual(len(df1), 3*2*2*2)
+        for i, df in enumerate(dfs):
+            v = df1[(df1['iSource']==i) & (df1['channel']=='a')]['DEL'].values.reshape(2,2)
+            np.testing.assert_allclose(v, eq_load(df['a'].values, m=[3,10], neq=[1,100]))
+        # Interrupted after two sources, resumed with a pool
+        fname = os.path.join(tempfile.mkdtemp(), 'checkpoint.txt')
+        eq_load_batch(dfs[:2], ['a','b'], checkpoint=fname, nProcesses=1, verbose=False)
+        with open(fname, 'a') as fid:
+            fid.write('{"iSource": 2, "sou') # line interrupted while written
+        df2 = eq_load_batch(dfs, ['a','b'], m=[3,10], neq=[1,100], weights=[1,1,2], checkpoint=fname, nProcesses=2, verbose=False)
+        with open(fname, 'r') as fid:
+            self.assertEqual(len([l for l in fid.read().split('\n') if l.startswith('{"iSource": 2, "source"')]), 1)
+        np.testing.assert_allclose(df2[df2['iSource']>=0]['DEL'].values, df1['DEL'].values)
+        # Resumed with other channels or bins: rejected. Other DataFrames: processed again
+        self.assertRaises(Exception, eq_load_batch, dfs, ['a','b','c'], checkpoint=fname, nProcesses=1, verbose=False)
+        self.assertRaises(Exception, eq_load_batch, dfs, ['a','b'], no_bins=10, checkpoint=fname, nProcesses=1, verbose=False)
+        df2 = eq_load_batch(dfs[::-1], ['a','b'], m=[3,10], neq=[1,100], checkpoint=fname, nProcesses=1, verbose=False)
+        np.testing.assert_allclose(df2['DEL'].values.reshape(2,3,4)[:,::-1,:], df1['DEL'].values.reshape(2,3,4))
+        os.remove(fname)
+        # Missing channel: NaN. Source not read: not stored, read when resuming
+        failed = []
+        def reader(filename):
+            if filename=='f1' and len(failed)==0:
+                failed.append(filename)
+                raise IOError('Transient error')
+            return dfs[int(filename[1])]
+        df2 = eq_load_batch(['f0','f1'], ['a','c'], checkpoint=fname, reader=reader, nProcesses=1, verbose=False)
+        self.assertTrue(np.all(np.isnan(df2[df2['channel']=='c']['DEL'])))
+        self.assertTrue(np.all(np.isnan(df2[df2['iSource']==1]['DEL'])))
+        df2 = eq_load_batch(['f0','f1'], ['a','c'], checkpoint=fname, reader=reader, nProcesses=1, verbose=False)
+        v = df2[(df2['iSource']==1) & (df2['channel']=='a')]['DEL'].values
+        np.testing.assert_allclose(v, np.ravel(eq_load(dfs[1]['a'].values, m=[3, 4, 6, 8, 10, 12], neq=1)))
+        os.remove(fname)
+        # Lifetime, from the weighted histograms
+        df3 = eq_load_batch([dfs[0]]*3, ['a'], m=4, neq=1, weights=[1,1,2], nProcesses=1, verbose=False)
+        np.testing.assert_allclose(df3['DEL'].values[-1], df3['DEL'].values[0]*4**(1/4))
+
     def test_eq_load_basic(self):
         import numpy.testing
         signal1 = np.array([-2.0, 0.0, 1.0, 0.0, -3.0, 0.0, 5.0, 0.0, -1.0, 0.0, 3.0, 0.0, -4.0, 0.0, 4.0, 0.0, -2.0])
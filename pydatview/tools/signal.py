@@ -9,6 +9,13 @@ FILTERS=[
     {'name':'Moving average','param':100,'paramName':'Window Size','paramRange':[0,100000],'increment':1},
     {'name':'Low pass 1st order','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1},
     {'name':'High pass 1st order','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1},
+    # Butterworth filters (see butter_filter), band pass of one octave around the center frequency
+    {'name':'Low pass Butterworth','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'low','order':4,'zeroPhase':False},
+    {'name':'High pass Butterworth','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'high','order':4,'zeroPhase':False},
+    {'name':'Band pass Butterworth','param':1.0,'paramName':'Center Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'band','order':4,'zeroPhase':False},
+    {'name':'Low pass zero-phase','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'low','order':4,'zeroPhase':True},
+    {'name':'High pass zero-phase','param':1.0,'paramName':'Cutoff Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'high','order':4,'zeroPhase':True},
+    {'name':'Band pass zero-phase','param':1.0,'paramName':'Center Freq.','paramRange':[0.0001,100000],'increment':0.1,'btype':'band','order':4,'zeroPhase':True},
 ]
 
 SAMPLERS=[
@@ -52,15 +59,24 @@ def reject_outliers(y, x=None, m = 2., replaceNaN=True):
 # --------------------------------------------------------------------------------}
 # --- Resampling 
 # --------------------------------------------------------------------------------{
-def multiInterp(x, xp, fp, extrap='bounded'):
+def interpWeights(x, xp, extrap='bounded'):
+    """ 
+    Indices and weights to linearly interpolate values defined at the (increasing) points xp onto x.
+    The weights can be reused for any values defined at xp (see interpApply), such that the 
+    binary search is done only once.
+    extrap: 'bounded': first and last values used beyond xp, 'nan': NaN beyond xp
+    """
+    xp  = np.asarray(xp)
+    x   = np.asarray(x)
     j   = np.searchsorted(xp, x) - 1
     dd  = np.zeros(len(x))
     bOK = np.logical_and(j>=0, j< len(xp)-1)
     bLower =j<0
     bUpper =j>=len(xp)-1
     jOK = j[bOK]
-    #import pdb; pdb.set_trace()
-    dd[bOK] = (x[bOK] - xp[jOK]) / (xp[jOK + 1] - xp[jOK])
+    dxp = xp[jOK + 1] - xp[jOK]
+    dxp[dxp==0] = np.inf # repeated points, value on the left
+    dd[bOK] = (x[bOK] - xp[jOK]) / dxp
     jBef=j 
     jAft=j+1
     # 
@@ -76,8 +92,16 @@ def multiInterp(x, xp, fp, extrap='bounded'):
         dd[~bOK] = np.nan
     else:
         raise NotImplementedError()
+    return jBef, jAft, dd
 
-    return (1 - dd) * fp[:,jBef] + fp[:,jAft] * dd
+def interpApply(fp, weights):
+    """ Interpolate fp (1D, or 2D with one signal per row) using the weights returned by interpWeights """
+    jBef, jAft, dd = weights
+    fp = np.asarray(fp)
+    return (1 - dd) * fp[...,jBef] + fp[...,jAft] * dd
+
+def multiInterp(x, xp, fp, extrap='bounded'):
+    return interpApply(fp, interpWeights(x, xp, extrap=extrap))
 
 def resample_interp(x_old, x_new, y_old=None, df_old=None):
     #x_new=np.sort(x_new)
@@ -189,45 +213,107 @@ def applySampler(x_old, y_old, sampDict, df_old=None):
 def moving_average(a, n=3) :
     """ 
     perform moving average, return a vector of same length as input
+    If a is a 2D array, the average is done along axis 0 (columns)
 
     NOTE: also in kalman.filters
     """
-    a   = a.ravel()
-    a   = np.concatenate(([a[0]]*(n-1),a)) # repeating first values
-    ret = np.cumsum(a, dtype = float)
+    a   = np.asarray(a)
+    if a.ndim<=1:
+        a   = a.ravel()
+    a   = np.concatenate((np.repeat(a[:1],n-1,axis=0),a)) # repeating first values
+    ret = np.cumsum(a, axis=0, dtype = float)
     ret[n:] = ret[n:] - ret[:-n]
     ret=ret[n - 1:] / n
     return ret
 
+def recursion1(u, a, y0=0, blockSize=None):
+    """ 
+    First order linear recurrence:  y[i] = a*y[i-1] + u[i],  with y[-1]=y0
+    If u is a 2D array, the recurrence is along axis 0 (y0 is a scalar or one value per column).
+    Uses scipy.signal.lfilter if available, otherwise a blocked numpy scan. Within a block,
+       y[k] = a^k * (a*y_prev + cumsum(u[j]/a^j)), 
+    the block size is such that a^-k remains small (accuracy of the cumulative sum).
+    If blockSize is provided, the numpy scan is used with this block size.
+    """
+    u = np.asarray(u, dtype=float)
+    try:
+        from scipy.signal import lfilter
+    except ImportError:
+        lfilter = None
+    if lfilter is not None and blockSize is None:
+        # lfilter is much faster along the last axis (the transpose of a Fortran array is contiguous)
+        zi = a*np.broadcast_to(y0, u.shape[1:]).T.reshape(u.shape[:0:-1]+(1,))
+        return lfilter([1.], [1., -a], u.T, axis=-1, zi=zi)[0].T
+    y = np.empty(u.shape)
+    if a==0:
+        y[:] = u
+        return y
+    if blockSize is None:
+        blockSize = int(min(max(np.log(1e4)/-np.log(abs(a)), 1) if abs(a)<1 else 1024, 2**16))
+    p = (a**np.arange(min(blockSize, len(u)))).reshape((-1,)+(1,)*(u.ndim-1))
+    y_prev = y0
+    for i0 in range(0, len(u), blockSize):
+        i1 = min(i0+blockSize, len(u))
+        pk = p[:i1-i0]
+        y[i0:i1] = pk * (a*y_prev + np.cumsum(u[i0:i1]/pk, axis=0))
+        y_prev = y[i1-1]
+    return y
+
 def lowpass1(y, dt, fc=3) :
     """ 
-    1st order low pass filter
+    1st order low pass filter (along axis 0 for a 2D array)
+       y_filt[i] = alpha*y[i] + (1-alpha)*y_filt[i-1]
     """
     tau=1/(2*np.pi*fc)
     alpha=dt/(tau+dt)
     y_filt=np.zeros(y.shape)
+    if len(y)==0:
+        return y_filt
     y_filt[0]=y[0]
-    for i in np.arange(1,len(y)):
-        y_filt[i]=alpha*y[i] + (1-alpha)*y_filt[i-1]
+    y_filt[1:]=recursion1(alpha*y[1:], 1-alpha, y0=y[0])
     return y_filt
 
 def highpass1(y, dt, fc=3) :
     """ 
-    1st order high pass filter
+    1st order high pass filter (along axis 0 for a 2D array)
+       y_filt[i] = alpha*y_filt[i-1] + alpha*(y[i]-y[i-1])
     """
     tau=1/(2*np.pi*fc)
     alpha=tau/(tau+dt)
     y_filt=np.zeros(y.shape)
+    if len(y)==0:
+        return y_filt
     y_filt[0]=0
-    for i in np.arange(1,len(y)):
-        y_filt[i]=alpha*y_filt[i-1] + alpha*(y[i]-y[i-1])
-    m0=np.mean(y)
-    m1=np.mean(y_filt)
+    y_filt[1:]=recursion1(alpha*np.diff(y, axis=0), alpha, y0=0)
+    m0=np.mean(y, axis=0)
+    m1=np.mean(y_filt, axis=0)
     y_filt+=m0-m1
     return y_filt
 
+def butter_filter(y, dt, fc, btype='low', order=4, zeroPhase=False):
+    """ 
+    Butterworth filter (scipy.signal.butter, second-order sections), along axis 0 for a 2D array
+      fc       : cutoff frequency, or [f1, f2] for a band pass
+      btype    : 'low', 'high' or 'band'
+      zeroPhase: if True, the filter is applied forward and backward (no phase shift, squared 
+                 magnitude response), otherwise the filter starts in the steady state of the first value
+    """
+    from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+    fNyq = 0.5/dt
+    if np.any(np.asarray(fc)<=0) or np.any(np.asarray(fc)>=fNyq):
+        raise Exception('Warn: Filter frequency {} should be between 0 and the Nyquist frequency ({:g})'.format(fc, fNyq))
+    sos = butter(order, fc, btype=btype, output='sos', fs=1/dt)
+    y = np.asarray(y, dtype=float)
+    if len(y)==0:
+        return y.copy()
+    if zeroPhase:
+        return sosfiltfilt(sos, y, axis=0, padlen=min(3*(2*len(sos)+1), len(y)-1))
+    zi = sosfilt_zi(sos).reshape((len(sos),2)+(1,)*(y.ndim-1))*y[0]
+    return sosfilt(sos, y, axis=0, zi=zi)[0]
+
 
 def applyFilter(x, y,filtDict):
+    """ Apply a filter (see FILTERS) to y, along axis 0 if y is a 2D array (one signal per column) """
     if filtDict['name']=='Moving average':
         return moving_average(y, n=np.round(filtDict['param']).astype(int))
     elif filtDict['name']=='Low pass 1st order':
@@ -236,13 +322,106 @@ def applyFilter(x, y,filtDict):
     elif filtDict['name']=='High pass 1st order':
         dt = x[1]-x[0]
         return highpass1(y, dt=dt, fc=filtDict['param'])
+    elif 'btype' in filtDict.keys():
+        dt = x[1]-x[0]
+        fc = filtDict['param']
+        if filtDict['btype']=='band':
+            fc = [fc/np.sqrt(2), fc*np.sqrt(2)] # one octave
+        return butter_filter(y, dt=dt, fc=fc, btype=filtDict['btype'], order=filtDict['order'], zeroPhase=filtDict['zeroPhase'])
     else:
         raise NotImplementedError('{}'.format(filtDict))
 
+def applyFilterDF(df_old, x_col, filtDict, blockBytes=2**26, nThreads=1):
+    """ 
+    Apply a filter (see FILTERS) to all the numeric columns of a dataframe, except x_col.
+    The columns are filtered by blocks (2D arrays of about blockBytes bytes, filtered along axis 0)
+    and written into the new dataframe, so that besides the new dataframe, only the blocks 
+    being processed are allocated. The other columns are copied unchanged.
+      x_col   : column of x values (used for the time step), if None, the index is used (dt=1)
+      nThreads: number of threads processing the blocks (the scipy filters release the GIL)
+    """
+    nRows = len(df_old)
+    if nRows<2:
+        raise Exception('Error: At least two rows are required to filter a table')
+    if x_col is None:
+        x = np.arange(nRows)
+    else:
+        x = df_old[x_col].values
+    isNum = lambda dtype: pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    IFilt = [j for j,(c,dtype) in enumerate(zip(df_old.columns,df_old.dtypes)) if c!=x_col and isNum(dtype)]
+    # Fortran order: each block of columns is contiguous, and is not copied when the dataframe is created
+    data = np.empty((nRows, len(IFilt)), order='F')
+    nCols = max(int(blockBytes//(8*nRows)), 1)
+    blocks = [(i0, min(i0+nCols, len(IFilt))) for i0 in range(0, len(IFilt), nCols)]
+    def _filtBlock(block):
+        i0, i1 = block
+        u = np.empty((nRows, i1-i0), order='F')
+        for k, j in enumerate(IFilt[i0:i1]):
+            u[:,k] = df_old.iloc[:,j].values
+        data[:,i0:i1] = applyFilter(x, u, filtDict)
+    if nThreads is not None and nThreads>1 and len(blocks)>1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(nThreads)
+        try:
+            pool.map(_filtBlock, blocks)
+        finally:
+            pool.close()
+    else:
+        for block in blocks:
+            _filtBlock(block)
+    df_new = pd.DataFrame(data, index=df_old.index, columns=df_old.columns[IFilt])
+    sFilt = set(IFilt)
+    for j, c in enumerate(df_old.columns):
+        if j not in sFilt:
+            df_new.insert(j, c, df_old.iloc[:,j].values, allow_duplicates=True)
+    return df_new
+
+# --------------------------------------------------------------------------------}
+# --- Sampling properties
+# --------------------------------------------------------------------------------{
+def sampling_info(x, rtol=1e-5, chunksize=2**16):
+    """ 
+    Ordering and spacing properties of a vector x, computed in one pass
+    returns a dictionary with keys:
+       sorted    : True if x is non-decreasing
+       increasing: True if x is strictly increasing
+       uniform   : True if x is strictly increasing with a constant spacing (within rtol)
+       dx        : the constant spacing if uniform, None otherwise
+    Only numerical values are supported, x=None returns False for all properties
+    """
+    info = {'sorted':False, 'increasing':False, 'uniform':False, 'dx':None}
+    if x is None:
+        return info
+    x = np.asarray(x)
+    if x.dtype.kind not in 'biuf':
+        return info
+    n = len(x)
+    if n<2:
+        info.update({'sorted':True, 'increasing':True})
+        return info
+    dx = (float(x[-1])-float(x[0]))/(n-1)
+    bSorted, bIncr, bUnif = True, True, dx>0
+    tol = rtol*abs(dx)
+    for i0 in range(0, n-1, chunksize):
+        d = np.diff(x[i0:i0+chunksize+1])
+        if bUnif:
+            bUnif = bool(np.all(np.abs(d-dx)<=tol))
+        if not bUnif:
+            bSorted = bSorted and bool(np.all(d>=0))
+            bIncr   = bIncr   and bool(np.all(d>0))
+            if not bSorted:
+                break
+    info['sorted']     = bSorted
+    info['increasing'] = bIncr
+    info['uniform']    = bUnif
+    info['dx']         = dx if bUnif else None
+    return info
+
+
 # --------------------------------------------------------------------------------}
 # ---  
 # --------------------------------------------------------------------------------{
-def zero_crossings(y,x=None,direction=None):
+def zero_crossings(y,x=None,direction=None,bIncreasing=False):
     """
       Find zero-crossing points in a discrete vector, using linear interpolation.
 
@@ -254,11 +433,14 @@ def zero_crossings(y,x=None,direction=None):
 
       if direction is not provided, also returns:
               sign, equal to 1 for up crossing
+
+      bIncreasing: if True, x is known to be strictly increasing (see sampling_info) and is not checked
     """
     if x is None:
         x=np.arange(len(y))
+        bIncreasing=True
 
-    if np.any((x[1:] - x[0:-1]) <= 0.0):
+    if not bIncreasing and np.any((x[1:] - x[0:-1]) <= 0.0):
         raise Exception('x values need to be in ascending order')
 
     # Indices before zero-crossing
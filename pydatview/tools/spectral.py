@@ -23,35 +23,110 @@ import numpy as np
 from six import string_types
 
 __all__  = ['fft_wrap','welch', 'psd', 'fft_amplitude']
-__all__ += ['pwelch', 'csd', 'coherence']
-__all__ += ['fnextpow2']
+__all__ += ['pwelch', 'csd', 'coherence', 'spectrogram', 'cross_spectra']
+__all__ += ['fnextpow2', 'next_fast_len', 'set_fft_backend', 'decimate_to_band', 'log_bins']
 __all__ += ['hann','hamming','boxcar','general_hamming','get_window']
 __all__ += ['TestSpectral']
 
+try:
+    import scipy.fft as _scipy_fft # scipy>=1.4, multi-threaded
+except ImportError:
+    _scipy_fft = None
+
+# --------------------------------------------------------------------------------}
+# --- FFT backend
+# --------------------------------------------------------------------------------{
+_FFT_BACKEND = {'name': 'numpy' if _scipy_fft is None else 'scipy', 'workers': -1}
+
+def set_fft_backend(name=None, workers=None):
+    """ 
+    Select the FFT backend used by the functions of this module.
+       name   : 'scipy' (multi-threaded, fast for any length) or 'numpy'
+       workers: number of threads used by scipy, -1 for all the cores
+    Returns the previous settings, as a dictionary, such that they can be restored.
+    """
+    prev = dict(_FFT_BACKEND)
+    if name is not None:
+        name = name.lower()
+        if name not in ['scipy','numpy']:
+            raise Exception('FFT backend unknown {}'.format(name))
+        if name=='scipy' and _scipy_fft is None:
+            raise Exception('FFT backend scipy requires scipy>=1.4')
+        _FFT_BACKEND['name'] = name
+    if workers is not None:
+        _FFT_BACKEND['workers'] = workers
+    return prev
+
+def _rfft(x, n=None, axis=-1):
+    """ Real FFT along axis, using the current backend (see set_fft_backend) """
+    if _FFT_BACKEND['name']=='scipy':
+        return _scipy_fft.rfft(x, n=n, axis=axis, workers=_FFT_BACKEND['workers'])
+    return np.fft.rfft(x, n=n, axis=axis)
+
+def next_fast_len(n):
+    """ Smallest length >= n for which the real FFT is fast (product of small primes) """
+    if _scipy_fft is not None:
+        return _scipy_fft.next_fast_len(int(n), real=True)
+    # 5-smooth numbers
+    m = int(n)
+    while True:
+        k = m
+        for p in [2,3,5]:
+            while k%p==0 and k>1:
+                k//=p
+        if k<=1:
+            return m
+        m+=1
+
 
 # --------------------------------------------------------------------------------}
 # --- FFT wrap
 # --------------------------------------------------------------------------------{
-def fft_wrap(t,y,dt=None, output_type='amplitude',averaging='None',averaging_window='hamming',detrend=False,nExp=None):
+def fft_wrap(t,y,dt=None, output_type='amplitude',averaging='None',averaging_window='hamming',detrend=False,nExp=None, hasNaN=None, fast_len=False, fmax=None, nPerDecade=None):
     """ 
     Wrapper to compute FFT amplitude or power spectra, with averaging.
     INPUTS:
        output_type      : amplitude, PSD, f x PSD
        averaging_method : None, Welch
        averaging_window : Hamming, Hann, Rectangular
+       hasNaN           : if False, y is known to have no NaN and is not filtered
+       fast_len         : if True, and without averaging, the signal is zero-padded to a fast FFT length
+       fmax             : if provided, "zoom" spectrum, only computed up to fmax (see psd_wrap)
+       nPerDecade       : if provided, the output is averaged in logarithmically spaced frequency bins (see log_bins)
     OUTPUTS:
        frq: vector of frequencies
        Y  : Amplitude spectrum, PSD, or f * PSD
        Info: a dictionary of info values
     """
+    frq, PSD, Info = psd_wrap(t, y, dt=dt, averaging=averaging, averaging_window=averaging_window, detrend=detrend, nExp=nExp, hasNaN=hasNaN, fast_len=fast_len, fmax=fmax)
+    frq, Y = psd_to_output(frq, PSD, output_type=output_type, detrend=detrend)
+    if nPerDecade is not None:
+        frq, Y = log_bins(frq, Y, nPerDecade=nPerDecade)
+    return frq, Y, Info
 
+
+def psd_wrap(t,y,dt=None,averaging='None',averaging_window='hamming',detrend=False,nExp=None, hasNaN=None, fast_len=False, fmax=None):
+    """ 
+    One-sided PSD, with averaging, see fft_wrap.
+    The output type (amplitude, PSD, f x PSD) is a rescaling of the PSD, see psd_to_output, 
+    such that the PSD can be stored and reused when only the output type changes.
+    y can be a 2D array (channels x samples) sharing the same time vector, in which case the PSD
+    of all channels are computed at once (along the last axis). NaN are only removed for 1D signals.
+    If fmax is provided, the signal is low-pass filtered and decimated such that its Nyquist frequency
+    is just above fmax (see decimate_to_band), and the spectrum is returned for frequencies up to fmax:
+    for the same 2^nExp, the frequency resolution is finer in the band of interest, and the FFTs are 
+    performed on the decimated signal.
+    """
     # Formatting inputs
-    output_type      = output_type.lower()
     averaging        = averaging.lower()
     averaging_window = averaging_window.lower()
     y = np.asarray(y)
-    y = y[~np.isnan(y)]
-    n = len(y) 
+    if hasNaN is not False:
+        if y.ndim==1:
+            y = y[~np.isnan(y)]
+        elif np.any(np.isnan(y)):
+            raise Exception('Cannot compute the PSD of multiple channels containing NaN')
+    n = y.shape[-1]
 
     if dt is None:
         dtDelta0 = t[1]-t[0]
@@ -60,8 +135,13 @@ def fft_wrap(t,y,dt=None, output_type='amplitude',averaging='None',averaging_win
         if dtDelta0 !=dt:
             print('[WARN] dt from tmax-tmin different from dt from t2-t1' )
     Fs = 1/dt
+    nDecim = 1
+    if fmax is not None:
+        y, nDecim = decimate_to_band(y, Fs, fmax)
+        Fs = Fs/nDecim
+        n  = y.shape[-1]
     if averaging=='none':
-        frq, PSD, Info = psd(y, fs=Fs, detrend=detrend, return_onesided=True)
+        frq, PSD, Info = psd(y, fs=Fs, detrend=detrend, return_onesided=True, fast_len=fast_len)
     elif averaging=='welch':
         # --- Welch - PSD
         #overlap_frac=0.5
@@ -74,20 +154,50 @@ def fft_wrap(t,y,dt=None, output_type='amplitude',averaging='None',averaging_win
             print('[WARN] Power of 2 value was too high and was reduced. Disable averaging to use the full spectrum.');
             nExp=int(np.log(nFFTAll)/np.log(2))-1
             nPerSeg=2**nExp
-        if averaging_window=='hamming':
-           window = hamming(nPerSeg, True)# True=Symmetric, like matlab
-        elif averaging_window=='hann':
-           window = hann(nPerSeg, True)
-        elif averaging_window=='rectangular':
-           window = boxcar(nPerSeg)
-        else:
-            raise Exception('Averaging window unknown {}'.format(averaging_window))
+        window = _averaging_window(averaging_window, nPerSeg)
         frq, PSD, Info = pwelch(y, fs=Fs, window=window, detrend=detrend)
         Info.nExp = nExp
     else:
         raise Exception('Averaging method unknown {}'.format(averaging))
+    Info.nDecim = nDecim
+    if fmax is not None:
+        nf = max(np.searchsorted(frq, fmax, side='right'), 2)
+        frq, PSD = frq[:nf], PSD[...,:nf]
+        Info.fMax  = frq[-1]
+        Info.LFreq = len(frq)
+    return frq, PSD, Info
 
-    # --- Formatting output
+
+def decimate_to_band(y, fs, fmax, margin=1.25):
+    """ 
+    Low-pass filter and decimate y (along the last axis) by the largest integer factor q such that 
+    the new Nyquist frequency is above margin*fmax (polyphase FIR filter, scipy.signal.resample_poly).
+    Returns the decimated signal and q (q=1 and y unchanged if no decimation is possible)
+    """
+    q = int(np.floor(fs/(2*margin*fmax)))
+    if q<2 or y.shape[-1]<4*q:
+        return y, 1
+    from scipy.signal import resample_poly
+    return resample_poly(y, 1, q, axis=-1, padtype='line'), q
+
+
+def _averaging_window(averaging_window, nPerSeg):
+    """ Window array from its name: hamming, hann, rectangular """
+    averaging_window = averaging_window.lower()
+    if averaging_window=='hamming':
+       window = hamming(nPerSeg, True)# True=Symmetric, like matlab
+    elif averaging_window=='hann':
+       window = hann(nPerSeg, True)
+    elif averaging_window=='rectangular':
+       window = boxcar(nPerSeg)
+    else:
+        raise Exception('Averaging window unknown {}'.format(averaging_window))
+    return window
+
+
+def psd_to_output(frq, PSD, output_type='amplitude', detrend=False):
+    """ Rescale a one-sided PSD to the output type of fft_wrap: amplitude, PSD, f x PSD """
+    output_type = output_type.lower()
     if output_type=='amplitude':
         deltaf = frq[1]-frq[0]
         Y = np.sqrt(PSD*2*deltaf)
@@ -100,10 +210,34 @@ def fft_wrap(t,y,dt=None, output_type='amplitude',averaging='None',averaging_win
         raise NotImplementedError('Contact developer')
     if detrend:
         frq= frq[1:]
-        Y  = Y[1:]
-    return frq, Y, Info
+        Y  = Y[...,1:]
+    return frq, Y
 
 
+def log_bins(frq, Y, nPerDecade=20):
+    """ 
+    Average of Y (along the last axis) in logarithmically spaced frequency bins, nPerDecade bins per decade,
+    starting at the first non-zero frequency. The frequencies are averaged within the same bins.
+    Bins containing no frequency are dropped, such that the low frequencies are kept as they are 
+    until the bins are wider than the frequency resolution. A zero frequency, if present, is kept.
+    frq is assumed sorted in increasing order.
+    """
+    frq = np.asarray(frq)
+    Y   = np.asarray(Y)
+    i0  = 1 if (len(frq)>0 and frq[0]<=0) else 0
+    f   = frq[i0:]
+    if len(f)<2:
+        return frq, Y
+    iBin = np.floor(np.log10(f/f[0])*nPerDecade + 1e-9).astype(int)
+    I  = np.concatenate(([0], np.nonzero(np.diff(iBin))[0]+1)) # first index of each bin
+    n  = np.diff(np.append(I, len(f)))
+    fb = np.add.reduceat(f, I)/n
+    Yb = np.add.reduceat(Y[...,i0:], I, axis=-1)/n
+    if i0>0:
+        fb = np.concatenate((frq[:1], fb))
+        Yb = np.concatenate((Y[...,:1], Yb), axis=-1)
+    return fb, Yb
+
 
 # --------------------------------------------------------------------------------}
 # --- Spectral simple (averaging below) 
@@ -115,39 +249,47 @@ def fft_amplitude(y, fs=1.0, detrend ='constant', return_onesided=True):
     Y = np.sqrt(PSD*2*deltaf)
     return frq, Y, Info
 
-def psd(y, fs=1.0, detrend ='constant', return_onesided=True):
-    """ Perform PSD without averaging """
+def psd(y, fs=1.0, detrend ='constant', return_onesided=True, fast_len=False):
+    """ Perform PSD without averaging, along the last axis of y 
+    If fast_len is True, y is zero-padded to a length for which the FFT is fast (see next_fast_len), 
+    the frequency resolution is then slightly finer and the integral of the PSD is unchanged.
+    """
     if not return_onesided:
         raise NotImplementedError('Double sided todo')
 
     if detrend is None:
         detrend=False
 
+    y = np.asarray(y)
     if detrend=='constant' or detrend==True:
-        m=np.mean(y);
+        m=np.mean(y, axis=-1, keepdims=True);
     else:
         m=0;
 
-    n = len(y) 
-    if n%2==0:
-        nhalf = int(n/2+1)
+    n = y.shape[-1]
+    nfft = next_fast_len(n) if fast_len else n
+    if nfft%2==0:
+        nhalf = int(nfft/2+1)
     else:
-        nhalf = int((n+1)/2)
+        nhalf = int((nfft+1)/2)
 
-    frq = np.arange(nhalf)*fs/n;
-    Y   = np.fft.rfft(y-m) #Y = np.fft.fft(y) 
-    PSD = abs(Y[range(nhalf)])**2 /(n*fs) # PSD
-    PSD[1:-1] = PSD[1:-1]*2;
+    frq = np.arange(nhalf)*fs/nfft;
+    Y   = _rfft(y-m, n=nfft) #Y = np.fft.fft(y) 
+    PSD = abs(Y[...,:nhalf])**2 /(n*fs) # PSD
+    if nfft%2==0:
+        PSD[...,1:-1] = PSD[...,1:-1]*2;
+    else:
+        PSD[...,1:] = PSD[...,1:]*2;
     class InfoClass():
         pass
     Info = InfoClass();
     Info.df    = frq[1]-frq[0]
     Info.fMax  = frq[-1]
     Info.LFreq = len(frq)
-    Info.LSeg  = len(Y)
-    Info.LWin  = len(Y)
+    Info.LSeg  = Y.shape[-1]
+    Info.LWin  = Y.shape[-1]
     Info.LOvlp = 0
-    Info.nFFT  = len(Y)
+    Info.nFFT  = Y.shape[-1]
     Info.nseg  = 1
     return frq, PSD, Info
 
@@ -475,7 +617,7 @@ def welch(x, fs=1.0, window='hann', nperseg=None, noverlap=None, nfft=None,
     if detrend==True:
         detrend='constant'
 
-    freqs, Pxx = csd(x, x, fs, window, nperseg, noverlap, nfft, detrend, return_onesided, scaling, axis)
+    freqs, Pxx, _ = csd(x, x, fs, window, nperseg, noverlap, nfft, detrend, return_onesided, scaling, axis)
     return freqs, Pxx.real
 
 #>>>>
@@ -613,7 +755,7 @@ def csd(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None, nfft=None,
 
     freqs, _, Pxy, Info = _spectral_helper(x, y, fs, window, nperseg, noverlap, nfft,
                                      detrend, return_onesided, scaling, axis,
-                                     mode='psd')
+                                     mode='psd', average=True)
 
     # Average over windows.
     if len(Pxy.shape) >= 2 and Pxy.size > 0:
@@ -637,20 +779,23 @@ def coherence(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None,
     spectral density estimate of X and Y.
     """
 
-    freqs, Pxx, Infoxx = welch(x, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
-    _, Pyy, Infoyy     = welch(y, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
-    _, Pxy, Infoxy     = csd(x, y, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
+    freqs, Pxx     = welch(x, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
+    _, Pyy         = welch(y, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
+    _, Pxy, Infoxy = csd(x, y, fs, window, nperseg, noverlap, nfft, detrend, axis=axis)
 
     Cxy = np.abs(Pxy)**2 / Pxx / Pyy
 
-    return freqs, Cxy, Infoxx
+    return freqs, Cxy, Infoxy
 
 
 def _spectral_helper(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None,
                      nfft=None, detrend='constant', return_onesided=True,
                      scaling='spectrum', axis=-1, mode='psd', boundary=None,
-                     padded=False):
-    """ Calculate various forms of windowed FFTs for PSD, CSD, etc.  """
+                     padded=False, average=False, nMaxBlock=2**20):
+    """ Calculate various forms of windowed FFTs for PSD, CSD, etc.  
+    If average is True (psd mode), the segments are averaged, the result has a segment axis of length 1
+    and the segments are processed in blocks of at most nMaxBlock values (see _fft_mean_helper)
+    """
     if mode not in ['psd', 'stft']:
         raise ValueError("Unknown value for mode %s, must be one of: "
                          "{'psd', 'stft'}" % mode)
@@ -785,8 +930,9 @@ def _spectral_helper(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None,
     else:
         detrend_func = detrend
 
-    if np.result_type(win,np.complex64) != outdtype:
+    if np.iscomplexobj(x) or (not same_data and np.iscomplexobj(y)):
         win = win.astype(outdtype)
+    # NOTE: for real data the window is kept real, the windowed segments are real before the rfft
 
     if scaling == 'density':
         scale = 1.0 / (fs * (win*win).sum())
@@ -818,15 +964,19 @@ def _spectral_helper(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None,
         freqs = np.fft.rfftfreq(nfft, 1/fs)
 
     # Perform the windowed FFTs
-    result = _fft_helper(x, win, detrend_func, nperseg, noverlap, nfft, sides)
+    if average and mode == 'psd':
+        # Periodograms averaged over blocks of segments, memory bounded by the block size
+        result = _fft_mean_helper(x, None if same_data else y, win, detrend_func, nperseg, noverlap, nfft, sides, nMaxBlock=nMaxBlock)
+    else:
+        result = _fft_helper(x, win, detrend_func, nperseg, noverlap, nfft, sides)
 
-    if not same_data:
-        # All the same operations on the y data
-        result_y = _fft_helper(y, win, detrend_func, nperseg, noverlap, nfft,
-                               sides)
-        result = np.conjugate(result) * result_y
-    elif mode == 'psd':
-        result = np.conjugate(result) * result
+        if not same_data:
+            # All the same operations on the y data
+            result_y = _fft_helper(y, win, detrend_func, nperseg, noverlap, nfft,
+                                   sides)
+            result = np.conjugate(result) * result_y
+        elif mode == 'psd':
+            result = result.real**2 + result.imag**2 # |X|^2, real, same as conj(X)*X
 
     result *= scale
     if sides == 'onesided' and mode == 'psd':
@@ -841,11 +991,11 @@ def _spectral_helper(x, y, fs=1.0, window='hann', nperseg=None, noverlap=None,
     if boundary is not None:
         time -= (nperseg/2) / fs
 
-    result = result.astype(outdtype)
-
     # All imaginary parts are zero anyways
     if same_data and mode != 'stft':
         result = result.real
+    else:
+        result = result.astype(outdtype, copy=False)
 
     # Output is going to have new last axis for time/window index, so a
     # negative axis index shifts down one
@@ -896,11 +1046,34 @@ def _fft_helper(x, win, detrend_func, nperseg, noverlap, nfft, sides):
         #func = fftpack.fft
     else:
         result = result.real
-        func = np.fft.rfft
+        func = _rfft
     result = func(result, n=nfft)
 
     return result
 
+def _fft_mean_helper(x, y, win, detrend_func, nperseg, noverlap, nfft, sides, nMaxBlock=2**20):
+    """ Mean over segments of conj(X)*Y (or |X|^2 if y is None), where X and Y are the windowed FFTs
+    of the segments (see _fft_helper). The segments are processed in blocks of at most nMaxBlock values, 
+    so that the memory used does not depend on the signal length (x may be a memory-mapped array).
+    Returns an array with a segment axis of length 1 """
+    step   = nperseg - noverlap
+    nseg   = (x.shape[-1]-noverlap)//step
+    nOuter = int(np.prod(x.shape[:-1]))
+    nSegBlock = max(1, nMaxBlock//(nperseg*max(nOuter,1)))
+    result = 0
+    for i0 in range(0, nseg, nSegBlock):
+        i1 = min(i0+nSegBlock, nseg)
+        # Only the samples of this block of segments are read
+        xb = np.asarray(x[..., i0*step:(i1-1)*step+nperseg])
+        X  = _fft_helper(xb, win, detrend_func, nperseg, noverlap, nfft, sides)
+        if y is None:
+            P = X.real**2 + X.imag**2 # |X|^2, real, same as conj(X)*X
+        else:
+            yb = np.asarray(y[..., i0*step:(i1-1)*step+nperseg])
+            P  = np.conjugate(X) * _fft_helper(yb, win, detrend_func, nperseg, noverlap, nfft, sides)
+        result = result + P.sum(axis=-2)
+    return (result/nseg)[..., np.newaxis, :]
+
 def _triage_segments(window, nperseg,input_length):
     """
     Parses window and nperseg arguments for spectrogram and _spectral_helper.
@@ -938,6 +1111,171 @@ def _triage_segments(window, nperseg,input_length):
 
 
 
+# --------------------------------------------------------------------------------}
+# --- Spectrogram
+# --------------------------------------------------------------------------------{
+def spectrogram(y, fs=1.0, window='hamming', nperseg=256, noverlap=None, detrend=False, nTimeMax=2000, nFreqMax=1000, nMaxBlock=2**20):
+    """ 
+    Time-frequency map: one-sided PSD of each (windowed) segment of y.
+    The segments are processed in blocks of at most nMaxBlock values, and consecutive segments 
+    (resp. frequencies) are averaged so that the map has at most nTimeMax (resp. nFreqMax) points.
+    The memory used depends on the size of the map, not on the signal length (y may be memory-mapped).
+
+    INPUTS:
+       window  : name of the window (hamming, hann, rectangular), or array of length nperseg
+       noverlap: number of points shared by two segments, default nperseg//2
+       detrend : False, True/'constant' or 'linear', applied to each segment
+    OUTPUTS:
+       f   : frequencies, (nf)
+       t   : times of the center of the segments, relative to the first sample, (nt)
+       S   : PSD, (nf x nt)
+       Info: a dictionary of info values
+    """
+    if isinstance(window, string_types):
+        window = _averaging_window(window, nperseg)
+    win     = np.asarray(window, dtype=float)
+    nperseg = len(win)
+    if noverlap is None:
+        noverlap = nperseg//2
+    step = nperseg - noverlap
+    nseg = (len(y)-noverlap)//step
+    if nseg<1:
+        raise Exception('Signal shorter than the window length ({})'.format(nperseg))
+    detrend_func = _segment_detrend_func(detrend)
+    scale  = 1.0 / (fs * (win*win).sum())
+    nAvgT  = int(np.ceil(nseg/nTimeMax))
+    nFreq  = nperseg//2+1
+    nAvgF  = int(np.ceil(nFreq/nFreqMax))
+    nSegBlock = max(1, nMaxBlock//nperseg//nAvgT)*nAvgT # multiple of nAvgT
+    S = []
+    for i0 in range(0, nseg, nSegBlock):
+        i1 = min(i0+nSegBlock, nseg)
+        # Only the samples of this block of segments are read
+        yb = np.asarray(y[i0*step:(i1-1)*step+nperseg], dtype=float)
+        X  = _fft_helper(yb, win, detrend_func, nperseg, noverlap, nperseg, 'onesided')
+        P  = X.real**2 + X.imag**2
+        # Average of groups of consecutive segments
+        I = np.arange(0, len(P), nAvgT)
+        S.append(np.add.reduceat(P, I, axis=0)/np.diff(np.append(I, len(P)))[:,np.newaxis])
+    S  = np.concatenate(S, axis=0)*scale
+    if nperseg % 2:
+        S[:, 1:] *= 2
+    else:
+        S[:, 1:-1] *= 2 # Last point is unpaired Nyquist freq point, don't double
+    tc = (np.arange(nseg)*step + nperseg/2)/fs
+    I  = np.arange(0, nseg, nAvgT)
+    t  = np.add.reduceat(tc, I)/np.diff(np.append(I, nseg))
+    f  = np.fft.rfftfreq(nperseg, 1/fs)
+    if nAvgF>1:
+        I = np.arange(0, nFreq, nAvgF)
+        n = np.diff(np.append(I, nFreq))
+        f = np.add.reduceat(f, I)/n
+        S = np.add.reduceat(S, I, axis=1)/n
+    class InfoClass():
+        pass
+    Info = InfoClass();
+    Info.df    = f[1]-f[0] if len(f)>1 else 0
+    Info.fMax  = f[-1]
+    Info.LFreq = len(f)
+    Info.LSeg  = nperseg
+    Info.LWin  = nperseg
+    Info.LOvlp = noverlap
+    Info.nFFT  = nperseg
+    Info.nseg  = nseg
+    Info.nAvgT = nAvgT
+    return f, t, S.T, Info
+
+
+def _segment_detrend_func(detrend):
+    """ Function detrending each segment (last axis): False, True/'constant' or 'linear' """
+    if detrend==True:
+        detrend='constant'
+    if not detrend:
+        return lambda d: d
+    return lambda d: signaltools_detrend(d, type=detrend, axis=-1)
+
+
+# --------------------------------------------------------------------------------}
+# --- Cross-spectra
+# --------------------------------------------------------------------------------{
+def cross_spectra(x, Y, fs=1.0, window='hamming', nperseg=256, noverlap=None, detrend=False, nMaxBlock=2**20):
+    """ 
+    Auto and cross spectral densities (Welch) between a reference signal x and several responses Y.
+    The segment FFTs of the reference are computed once and used for all the responses.
+    The segments are processed in blocks of at most nMaxBlock values.
+
+    INPUTS:
+       x      : reference signal, (n)
+       Y      : responses, (n) or (nY x n)
+       window : name of the window (hamming, hann, rectangular), or array of length nperseg
+    OUTPUTS:
+       f   : frequencies, (nf)
+       Pxx : one-sided PSD of x, (nf)
+       Pyy : one-sided PSD of the responses, (nY x nf)
+       Pxy : one-sided CSD, conj(X).Y, (nY x nf)
+       Info: a dictionary of info values
+    The coherence is |Pxy|^2/(Pxx Pyy), the H1 transfer function estimate is Pxy/Pxx (see cross_spectra_output)
+    """
+    Y = np.atleast_2d(Y)
+    if Y.shape[-1]!=len(x):
+        raise Exception('Reference and responses must have the same length')
+    if isinstance(window, string_types):
+        window = _averaging_window(window, nperseg)
+    win     = np.asarray(window, dtype=float)
+    nperseg = len(win)
+    if noverlap is None:
+        noverlap = nperseg//2
+    step = nperseg - noverlap
+    nseg = (len(x)-noverlap)//step
+    if nseg<1:
+        raise Exception('Signal shorter than the window length ({})'.format(nperseg))
+    detrend_func = _segment_detrend_func(detrend)
+    nSegBlock = max(1, nMaxBlock//(nperseg*(Y.shape[0]+1)))
+    Pxx, Pyy, Pxy = 0, 0, 0
+    for i0 in range(0, nseg, nSegBlock):
+        i1 = min(i0+nSegBlock, nseg)
+        i  = slice(i0*step, (i1-1)*step+nperseg)
+        X  = _fft_helper(np.asarray(x[i], dtype=float)   , win, detrend_func, nperseg, noverlap, nperseg, 'onesided')
+        FY = _fft_helper(np.asarray(Y[:,i], dtype=float) , win, detrend_func, nperseg, noverlap, nperseg, 'onesided')
+        Pxx = Pxx + (X.real**2 + X.imag**2).sum(axis=0)
+        Pyy = Pyy + (FY.real**2 + FY.imag**2).sum(axis=-2)
+        Pxy = Pxy + (np.conjugate(X) * FY).sum(axis=-2)
+    scale = 1.0 / (fs * (win*win).sum()) / nseg
+    P = [Pxx*scale, Pyy*scale, Pxy*scale]
+    for p in P:
+        if nperseg % 2:
+            p[..., 1:] *= 2
+        else:
+            p[..., 1:-1] *= 2 # Last point is unpaired Nyquist freq point, don't double
+    f = np.fft.rfftfreq(nperseg, 1/fs)
+    class InfoClass():
+        pass
+    Info = InfoClass();
+    Info.df    = f[1]-f[0]
+    Info.fMax  = f[-1]
+    Info.LFreq = len(f)
+    Info.LSeg  = nperseg
+    Info.LWin  = nperseg
+    Info.LOvlp = noverlap
+    Info.nFFT  = nperseg
+    Info.nseg  = nseg
+    return f, P[0], P[1], P[2], Info
+
+def cross_spectra_output(Pxx, Pyy, Pxy, output_type='coherence'):
+    """ Quantity derived from the spectra returned by cross_spectra: coherence, |H1|, phase H1 [deg], |CSD| """
+    output_type = output_type.lower()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if output_type=='coherence':
+            return np.abs(Pxy)**2 / (Pxx*Pyy)
+        elif output_type=='|h1|':
+            return np.abs(Pxy/Pxx)
+        elif output_type=='phase h1':
+            return np.angle(Pxy, deg=True) # phase of H1=Pxy/Pxx, Pxx real
+        elif output_type=='|csd|':
+            return np.abs(Pxy)
+    raise NotImplementedError('Cross-spectra output type {}'.format(output_type))
+
+
 # --------------------------------------------------------------------------------}
 # --- Unittests
 # --------------------------------------------------------------------------------{
@@ -955,6 +1293,108 @@ class TestSpectral(unittest.TestCase):
         i=np.argmax(Y)
         self.assertAlmostEqual(Y[i],A)
         self.assertAlmostEqual(f[i],f0)
+
+    def test_fft_backend(self):
+        # Same PSD with both backends, and with zero-padding to a fast length
+        y = np.random.normal(0,1,10007)
+        prev = set_fft_backend('numpy')
+        f1, P1, _ = psd(y, fs=10)
+        if _scipy_fft is not None:
+            set_fft_backend('scipy', workers=2)
+            f2, P2, _ = psd(y, fs=10)
+            np.testing.assert_allclose(P1, P2, rtol=1e-8, atol=1e-12)
+        set_fft_backend(**prev)
+        n = next_fast_len(10007)
+        self.assertTrue(n>=10007 and n<10007*1.1)
+        f3, P3, Info = psd(y, fs=10, fast_len=True)
+        self.assertEqual(len(f3), n//2+1)
+        np.testing.assert_allclose(np.sum(P3)*(f3[1]-f3[0]), np.sum(P1)*(f1[1]-f1[0]), rtol=1e-2)
+
+    def test_zoom(self):
+        # Spectrum in a band, on the decimated signal: same peaks and levels as the full spectrum
+        fs = 1000
+        t  = np.arange(0,200,1/fs)
+        y  = 2*np.sin(2*np.pi*1*t) + np.sin(2*np.pi*3.5*t) + np.sin(2*np.pi*200*t) + np.random.normal(0,0.1,len(t))
+        f1, P1, I1 = psd_wrap(t, y, dt=1/fs, averaging='Welch', nExp=10)
+        f2, P2, I2 = psd_wrap(t, y, dt=1/fs, averaging='Welch', nExp=10, fmax=5)
+        self.assertEqual(I2.nDecim, 80)
+        self.assertTrue(f2[-1]<=5 and f2[-1]>4.9)
+        self.assertTrue(f2[1]<f1[1]/50) # finer resolution
+        for f0 in [1, 3.5]:
+            self.assertAlmostEqual(f2[np.argmax(P2*(np.abs(f2-f0)<0.5))], f0, 1)
+        # Power of the sines in the band (2^2/2+1/2), the 200Hz sine is filtered before decimation
+        b2 = (f2>0.5) & (f2<4.5)
+        np.testing.assert_allclose(np.sum(P2[b2])*f2[1], 2.5, rtol=0.02)
+        f, Y, _ = fft_wrap(t, y, dt=1/fs, averaging='None', fmax=5, output_type='Amplitude')
+        self.assertAlmostEqual(np.max(Y), 2, 1)
+
+    def test_log_bins(self):
+        # Averaging in log bins, fewer points, same mean level and integral for a flat spectrum
+        fs = 100
+        y  = np.random.normal(0,1,2**18)
+        f, P, _ = psd(y, fs=fs)
+        fb, Pb = log_bins(f, P, nPerDecade=20)
+        self.assertTrue(len(fb)<len(f)/100)
+        self.assertEqual(fb[0], 0)
+        self.assertTrue(np.all(np.diff(fb)>0))
+        np.testing.assert_allclose(fb[1:3], f[1:3]) # low frequencies kept
+        np.testing.assert_allclose(np.mean(Pb[-20:]), 2/fs, rtol=0.1)
+        np.testing.assert_allclose(np.trapz(Pb, fb), np.trapz(P, f), rtol=0.02)
+        # 2D, same as 1D
+        _, Pb2 = log_bins(f, np.vstack((P, 2*P)), nPerDecade=20)
+        np.testing.assert_allclose(Pb2[1], 2*Pb)
+        # Combined with Welch
+        f, Y, _ = fft_wrap(np.arange(len(y))/fs, y, output_type='PSD', averaging='Welch', nExp=12, nPerDecade=10)
+        self.assertTrue(len(f)<50)
+
+    def test_spectrogram(self):
+        # Map of a signal with a frequency change, segments averaged as in pwelch
+        fs = 100
+        t  = np.arange(0,100,1/fs)
+        y  = np.where(t<50, np.sin(2*np.pi*5*t), np.sin(2*np.pi*20*t))
+        f, ts, S, Info = spectrogram(y, fs=fs, nperseg=256, detrend=True)
+        self.assertEqual(S.shape, (len(f), len(ts)))
+        self.assertAlmostEqual(f[np.argmax(S[:,0])], 5, 0)
+        self.assertAlmostEqual(f[np.argmax(S[:,-1])], 20, 0)
+        np.testing.assert_allclose(S.mean(axis=1), pwelch(y, window=hamming(256,True), fs=fs, detrend=True)[1], rtol=1e-10)
+        # Downsampled map, bounded size
+        f2, t2, S2, _ = spectrogram(y, fs=fs, nperseg=256, nTimeMax=10, nFreqMax=20, nMaxBlock=1000)
+        self.assertTrue(len(t2)<=10 and len(f2)<=20)
+        np.testing.assert_allclose(np.mean(S2), np.mean(spectrogram(y, fs=fs, nperseg=256)[2]), rtol=0.05)
+
+    def test_cross_spectra(self):
+        # Reference computed once, same as csd/pwelch for each response
+        fs = 10
+        x  = np.random.normal(0,1,5000)
+        Y  = np.array([np.convolve(x, [1,0.5,0.2], 'same'), np.roll(x,3)+np.random.normal(0,0.1,5000)])
+        win= hamming(128, True)
+        f, Pxx, Pyy, Pxy, _ = cross_spectra(x, Y, fs=fs, window=win, detrend=True, nMaxBlock=1000)
+        np.testing.assert_allclose(Pxx, pwelch(x, window=win, fs=fs, detrend=True)[1], rtol=1e-10)
+        for i in range(2):
+            np.testing.assert_allclose(Pyy[i], pwelch(Y[i], window=win, fs=fs, detrend=True)[1], rtol=1e-10)
+            np.testing.assert_allclose(Pxy[i], csd(x, Y[i], fs=fs, window=win, detrend='constant')[1], rtol=1e-10)
+        C = cross_spectra_output(Pxx, Pyy, Pxy, 'coherence')
+        self.assertTrue(np.all(C<=1+1e-10))
+        self.assertTrue(np.mean(C[0])>0.99)
+
+    def test_pwelch_blocks(self):
+        # Segments averaged by blocks, same as averaging all the segments at once
+        import tempfile, os
+        y = np.random.normal(0,1,10000)
+        f, _, P, _ = _spectral_helper(y, y, 10, hamming(256, True), detrend='constant', scaling='density')
+        P = P.mean(axis=-1)
+        for nMaxBlock in [256, 3000, 2**20]:
+            _, _, Pb, _ = _spectral_helper(y, y, 10, hamming(256, True), detrend='constant', scaling='density', average=True, nMaxBlock=nMaxBlock)
+            np.testing.assert_allclose(Pb[:,0], P.real, rtol=1e-12)
+        # Memory-mapped input
+        fname = os.path.join(tempfile.mkdtemp(), 'y.dat')
+        ym = np.memmap(fname, dtype=float, mode='w+', shape=y.shape)
+        ym[:] = y
+        f1, P1, _ = pwelch(y , window=256, fs=10)
+        f2, P2, _ = pwelch(ym, window=256, fs=10)
+        np.testing.assert_allclose(P1, P2, rtol=1e-12)
+        del ym
+        os.remove(fname)
     
 if __name__ == '__main__':
     unittest.main()
@@ -53,6 +53,457 @@ def rsquare(y,f, c = True):
     rmse = np.sqrt(np.mean((y - f) ** 2))
     return r2,rmse
 
+def fused_stats(y, moments=True, chunksize=2**16, hasNaN=None):
+    """
+    Compute min, max, argmin, argmax, mean, variance and number of NaN of a signal
+    in one pass over the data.
+    The signal is processed by chunks small enough to stay in cache, the chunk moments
+    are combined with the parallel form of Welford's algorithm (Chan et al.)
+
+    NaN values are ignored, argmin/argmax are the indices of the first occurence
+    (consistent with np.nanargmin/np.nanargmax).
+
+    INPUTS:
+      - y        : 1d array
+      - moments  : if False, mean and variance are not computed (faster when only the range is needed)
+      - chunksize: number of values processed at once
+      - hasNaN   : if False, the signal is known to have no NaN and the NaN checks are skipped
+                   if None, NaN are detected
+    OUTPUTS:
+      - dictionary with keys: 'n', 'nNaN', 'min', 'max', 'argmin', 'argmax', 'mean', 'var', 'std'
+        For a signal that contains only NaN, min, max, mean, var and std are NaN and argmin=argmax=-1
+    """
+    y = np.asarray(y)
+    if y.dtype.kind not in 'biuf':
+        y = y.astype(float)
+    canNaN = y.dtype.kind=='f' and hasNaN is not False
+    n      = len(y)
+    vMin, vMax = np.nan, np.nan
+    iMin, iMax = -1, -1
+    nNaN  = 0
+    count = 0
+    mean  = 0.
+    M2    = 0.
+    for i0 in range(0, n, chunksize):
+        c = y[i0:i0+chunksize]
+        I = None
+        if canNaN:
+            bNaN = np.isnan(c)
+            nc   = int(np.count_nonzero(bNaN))
+            if nc>0:
+                nNaN += nc
+                I = np.flatnonzero(~bNaN)
+                c = c[I]
+        nc = len(c)
+        if nc==0:
+            continue
+        j = c.argmin()
+        if iMin<0 or c[j]<vMin:
+            vMin = c[j]
+            iMin = i0 + (j if I is None else I[j])
+        j = c.argmax()
+        if iMax<0 or c[j]>vMax:
+            vMax = c[j]
+            iMax = i0 + (j if I is None else I[j])
+        if moments:
+            cMean = c.mean()
+            d     = c-cMean
+            cM2   = np.dot(d,d)
+            delta = cMean-mean
+            nTot  = count+nc
+            mean += delta*nc/nTot
+            M2   += cM2 + delta**2*count*nc/nTot
+        count += nc
+    if count==0 or not moments:
+        mean, var = np.nan, np.nan
+    else:
+        var = M2/count
+    return {'n':n, 'nNaN':nNaN, 'min':vMin, 'max':vMax, 'argmin':iMin, 'argmax':iMax, 'mean':mean, 'var':var, 'std':np.sqrt(var)}
+
+def batch_stats(Y, moments=True, chunksize=2**15, hasNaN=None):
+    """
+    Same as `fused_stats` for several signals of same length at once, using axis-wise reductions.
+    The 2d array is processed by tiles (a few signals x a few thousand values) small enough 
+    to stay in cache.
+
+    INPUTS:
+      - Y        : 2d array, one signal per row (can be a strided view)
+      - moments  : if False, mean and variance are not computed
+      - chunksize: approximate number of values in a tile
+      - hasNaN   : if False, none of the signals have NaN and the NaN checks are skipped
+    OUTPUTS:
+      - dictionary with the same keys as `fused_stats`, with one value per signal (arrays)
+    """
+    Y = np.asarray(Y)
+    if Y.dtype.kind not in 'biuf':
+        Y = Y.astype(float)
+    canNaN = Y.dtype.kind=='f' and hasNaN is not False
+    nS, n  = Y.shape
+    vMin   = np.full(nS, np.nan)
+    vMax   = np.full(nS, np.nan)
+    iMin   = np.full(nS, -1, dtype=int)
+    iMax   = np.full(nS, -1, dtype=int)
+    nNaN   = np.zeros(nS, dtype=int)
+    count  = np.zeros(nS, dtype=int)
+    mean   = np.zeros(nS)
+    M2     = np.zeros(nS)
+    m = max(min(n, 2**14), 1)      # values per tile
+    k = max(chunksize//m, 1)       # signals per tile
+    for r0 in range(0, nS, k):
+        r1 = min(r0+k, nS)
+        R  = np.arange(r1-r0)
+        for i0 in range(0, n, m):
+            C = Y[r0:r1, i0:i0+m]
+            nc = np.full(r1-r0, C.shape[1])
+            bNaN = None
+            if canNaN:
+                bNaN = np.isnan(C)
+                if bNaN.any():
+                    cNaN = bNaN.sum(axis=1)
+                    nNaN[r0:r1] += cNaN
+                    nc = nc - cNaN
+                else:
+                    bNaN = None
+            if bNaN is None:
+                CMin, CMax = C, C
+            else:
+                CMin = np.where(bNaN,  np.inf, C)
+                CMax = np.where(bNaN, -np.inf, C)
+            valid = nc>0
+            # Min and max, first occurence kept
+            j = CMin.argmin(axis=1)
+            c = CMin[R, j]
+            b = valid & ((iMin[r0:r1]<0) | (c<vMin[r0:r1]))
+            vMin[r0:r1][b] = c[b]
+            iMin[r0:r1][b] = i0 + j[b]
+            j = CMax.argmax(axis=1)
+            c = CMax[R, j]
+            b = valid & ((iMax[r0:r1]<0) | (c>vMax[r0:r1]))
+            vMax[r0:r1][b] = c[b]
+            iMax[r0:r1][b] = i0 + j[b]
+            # Moments, combined with parallel Welford's algorithm
+            if moments:
+                ncs = np.where(valid, nc, 1)
+                if bNaN is None:
+                    cMean = C.mean(axis=1)
+                    D     = C - cMean[:,None]
+                else:
+                    cMean = np.where(bNaN, 0, C).sum(axis=1)/ncs
+                    D     = np.where(bNaN, 0, C - cMean[:,None])
+                cM2   = np.einsum('ij,ij->i', D, D)
+                cnt   = count[r0:r1]
+                delta = cMean-mean[r0:r1]
+                nTot  = np.where(valid, cnt+nc, 1)
+                mean[r0:r1] = np.where(valid, mean[r0:r1] + delta*nc/nTot, mean[r0:r1])
+                M2  [r0:r1] = np.where(valid, M2[r0:r1] + cM2 + delta**2*cnt*nc/nTot, M2[r0:r1])
+            count[r0:r1] += nc
+    if moments:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.where(count>0, M2/count, np.nan)
+        mean[count==0] = np.nan
+    else:
+        mean = np.full(nS, np.nan)
+        var  = np.full(nS, np.nan)
+    return {'n':n, 'nNaN':nNaN, 'min':vMin, 'max':vMax, 'argmin':iMin, 'argmax':iMax, 'mean':mean, 'var':var, 'std':np.sqrt(var)}
+
+class RangeStatsIndex(object):
+    """ 
+    Range-query structure to compute statistics of y[i0:i1] for any window [i0,i1)
+      - mean, std: count, mean and M2 of the blocks in a segment tree, merged with parallel Welford's
+                  algorithm, O(log(n/blockSize)) on the blocks + O(blockSize) for the partial blocks at the edges.
+      - min, max (and their index): block min/max, with a sparse table on the blocks,
+                  O(1) on the blocks + O(blockSize) for the partial blocks at the edges.
+    NaN values are ignored.
+
+    Example:
+       I = RangeStatsIndex(y)
+       I.mean(10, 1000)
+       vmin, imin = I.min(10, 1000)
+    """
+    def __init__(self, y, blockSize=256, hasNaN=None):
+        y = np.asarray(y, dtype=float)
+        self.n    = len(y)
+        self.B    = blockSize
+        if hasNaN is False:
+            bNaN = None
+            self.hasNaN = False
+        else:
+            bNaN = np.isnan(y)
+            self.hasNaN = np.any(bNaN)
+        self._y   = y
+        # Moments of each block (count, mean, M2)
+        nb = self.n//self.B
+        Y  = y[:nb*self.B].reshape(nb, self.B)
+        if self.hasNaN:
+            bN = bNaN[:nb*self.B].reshape(nb, self.B)
+            c  = (self.B - bN.sum(axis=1)).astype(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                m = np.where(c>0, np.where(bN, 0, Y).sum(axis=1)/c, 0)
+            D = np.where(bN, 0, Y - m[:,None])
+        else:
+            c = np.full(nb, float(self.B))
+            m = Y.mean(axis=1)
+            D = Y - m[:,None]
+        M2 = np.einsum('ij,ij->i', D, D)
+        del D
+        # Segment tree, level k contains the moments of the blocks i*2^k..(i+1)*2^k-1, 
+        # obtained from the pairs of level k-1 with parallel Welford's algorithm
+        self._tMom = [(c, m, M2)]
+        while len(c)>=2:
+            nh = len(c)//2
+            cA, mA, M2A = c[0:2*nh:2], m[0:2*nh:2], M2[0:2*nh:2]
+            cB, mB, M2B = c[1:2*nh:2], m[1:2*nh:2], M2[1:2*nh:2]
+            c     = cA+cB
+            delta = mB-mA
+            cS    = np.where(c>0, c, 1)
+            m     = mA + delta*cB/cS
+            M2    = M2A + M2B + delta**2*cA*cB/cS
+            self._tMom.append((c, m, M2))
+        # Signals with NaN replaced by +/- inf, such that argmin/argmax ignore them
+        if self.hasNaN:
+            self._yMin = np.where(bNaN,  np.inf, y)
+            self._yMax = np.where(bNaN, -np.inf, y)
+        else:
+            self._yMin = y
+            self._yMax = y
+        self._tMin = self._sparseTable(self._yMin, np.less   )
+        self._tMax = self._sparseTable(self._yMax, np.greater)
+
+    def _sparseTable(self, y, better):
+        """ Sparse table on blocks: T[k][i] is the index (in y) of the extremum of blocks i..i+2^k-1 """
+        nb = self.n//self.B
+        if nb==0:
+            return []
+        Y = y[:nb*self.B].reshape(nb, self.B)
+        if better is np.less:
+            I = np.argmin(Y, axis=1)
+        else:
+            I = np.argmax(Y, axis=1)
+        T = [I + np.arange(nb)*self.B]
+        k = 1
+        while 2**k <= nb:
+            Ip = T[-1]
+            I1 = Ip[:nb-2**k+1]
+            I2 = Ip[2**(k-1):2**(k-1)+nb-2**k+1]
+            T.append(np.where(better(y[I2], y[I1]), I2, I1)) # first index wins ties
+            k += 1
+        return T
+
+    def _bounds(self, i0, i1):
+        i0 = max(int(i0), 0)
+        i1 = min(int(i1), self.n)
+        return i0, i1
+
+    def _direct(self, y):
+        """ Count, mean and M2 of a (small) part of the signal """
+        if self.hasNaN:
+            y = y[~np.isnan(y)]
+        if len(y)==0:
+            return 0, 0., 0.
+        m = np.mean(y)
+        return len(y), m, np.sum((y-m)**2)
+
+    @staticmethod
+    def _merge(nA, mA, M2A, nB, mB, M2B):
+        """ Count, mean and M2 of two sets (parallel Welford's algorithm) """
+        if nB<=0:
+            return nA, mA, M2A
+        n     = nA+nB
+        delta = mB-mA
+        return n, mA + delta*nB/n, M2A + M2B + delta**2*nA*nB/n
+
+    def _moments(self, i0, i1):
+        """ Count, mean and M2 of y[i0:i1]: edges and nodes of the segment tree covering the full blocks,
+        merged with parallel Welford's algorithm. Accurate for any offset of the window mean """
+        B  = self.B
+        b0 = -(-i0//B)  # first full block
+        b1 = i1//B      # last full block (excluded)
+        if i1-i0<=2*B or b1-b0<1:
+            return self._direct(self._y[i0:i1])
+        n, m, M2 = self._direct(self._y[i0:b0*B])
+        l, r, k = b0, b1, 0
+        while l<r:
+            c, mu, M2k = self._tMom[k]
+            if l & 1:
+                n, m, M2 = self._merge(n, m, M2, c[l], mu[l], M2k[l])
+                l += 1
+            if r & 1:
+                r -= 1
+                n, m, M2 = self._merge(n, m, M2, c[r], mu[r], M2k[r])
+            l >>= 1
+            r >>= 1
+            k  += 1
+        return self._merge(n, m, M2, *self._direct(self._y[b1*B:i1]))
+
+    def mean(self, i0, i1):
+        i0, i1 = self._bounds(i0, i1)
+        n, m, _ = self._moments(i0, i1)
+        if n<=0:
+            return np.nan
+        return m
+
+    def std(self, i0, i1):
+        i0, i1 = self._bounds(i0, i1)
+        n, _, M2 = self._moments(i0, i1)
+        if n<=0:
+            return np.nan
+        return np.sqrt(M2/n)
+
+    def _extremum(self, i0, i1, y, T, argf, better):
+        i0, i1 = self._bounds(i0, i1)
+        if i1<=i0:
+            return np.nan, -1
+        B = self.B
+        b0 = -(-i0//B)  # first full block
+        b1 = i1//B      # last full block (excluded)
+        if b1-b0<1:
+            i = i0 + argf(y[i0:i1])
+        else:
+            cand = []
+            if i0<b0*B:
+                cand.append(i0 + argf(y[i0:b0*B]))
+            k  = int(np.log2(b1-b0))
+            i1_,i2_ = T[k][b0], T[k][b1-2**k]
+            cand.append(i2_ if better(y[i2_], y[i1_]) else i1_)
+            if b1*B<i1:
+                cand.append(b1*B + argf(y[b1*B:i1]))
+            i = cand[0]
+            for j in cand[1:]:
+                if better(y[j], y[i]):
+                    i = j
+        if not np.isfinite(y[i]):
+            return np.nan, -1
+        return y[i], i
+
+    def min(self, i0, i1):
+        """ returns min of y[i0:i1] and its index """
+        return self._extremum(i0, i1, self._yMin, self._tMin, np.argmin, np.less)
+
+    def max(self, i0, i1):
+        """ returns max of y[i0:i1] and its index """
+        return self._extremum(i0, i1, self._yMax, self._tMax, np.argmax, np.greater)
+
+
+# --------------------------------------------------------------------------------}
+# --- Ensemble statistics
+# --------------------------------------------------------------------------------{
+def ensemble_stats(XY, x=None, nGrid=None, percentiles=[5,50,95], nBins=256):
+    """
+    Statistics of an ensemble of signals (e.g. turbulence seeds), at each point of a common x grid:
+    min, max, mean, std and percentiles.
+
+    The signals are streamed, only one signal interpolated on the grid is in memory at a time:
+      - pass 1: min, max, mean and variance (Welford's algorithm) 
+      - pass 2 (only if percentiles are requested): histogram of the values at each grid point, 
+                between the min and max of pass 1. Percentiles are interpolated within the bins,
+                their accuracy is therefore (max-min)/nBins.
+    Memory is nGrid x nBins bytes (2 or 4 bytes above 255 or 65535 signals), independent of the number 
+    of signals, e.g. 50MB for 2e5 points and 256 bins. Use x, nGrid or nBins to reduce it.
+
+    INPUTS:
+      - XY: list of (x,y) tuples, or a function returning an iterator over (x,y) tuples (called once per pass)
+      - x : common grid. If None, the x values of the signals are used if they are all the same, 
+            otherwise, a linear grid of nGrid points spanning all the x values.
+      - nGrid: number of points of the grid when x is None (default: length of the longest signal)
+      - percentiles: list of percentiles (between 0 and 100)
+      - nBins: number of bins of the histograms used for the percentiles
+    OUTPUTS:
+      - dictionary with keys: 'x', 'n' (number of signals defined at each point), 'min', 'max',
+        'mean', 'std', and 'percentiles' (dictionary with one array per percentile)
+    """
+    def series():
+        return XY() if callable(XY) else iter(XY)
+
+    def onGrid(xs, ys):
+        xs, ys = np.asarray(xs), np.asarray(ys, dtype=float)
+        if xs is x or (len(xs)==len(x) and np.array_equal(xs, x)):
+            return ys
+        return np.interp(x, xs, ys, left=np.nan, right=np.nan)
+
+    # --- Common grid
+    if x is None:
+        xMin, xMax, nMax, x0, bSame = np.inf, -np.inf, 0, None, True
+        for xs, _ in series():
+            xs = np.asarray(xs)
+            if len(xs)==0:
+                continue
+            xMin, xMax, nMax = min(xMin, np.min(xs)), max(xMax, np.max(xs)), max(nMax, len(xs))
+            if x0 is None:
+                x0 = xs
+            elif bSame:
+                bSame = xs is x0 or (len(xs)==len(x0) and np.array_equal(xs, x0))
+        if x0 is None:
+            raise Exception('No signal provided for the ensemble statistics')
+        if bSame and nGrid is None:
+            x = x0
+        else:
+            x = np.linspace(xMin, xMax, nMax if nGrid is None else nGrid)
+    x = np.asarray(x)
+    nx = len(x)
+    # --- Pass 1: count, min, max, mean and variance
+    count = np.zeros(nx, dtype=int)
+    vMin  = np.full(nx,  np.inf)
+    vMax  = np.full(nx, -np.inf)
+    mean  = np.zeros(nx)
+    M2    = np.zeros(nx)
+    for xs, ys in series():
+        y = onGrid(xs, ys)
+        b = ~np.isnan(y)
+        count += b
+        np.fmin(vMin, y, out=vMin)
+        np.fmax(vMax, y, out=vMax)
+        delta = np.where(b, y-mean, 0)
+        mean += np.where(b, delta/np.maximum(count,1), 0)
+        M2   += np.where(b, delta*(y-mean), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bEmpty = count==0
+        vMin[bEmpty] = np.nan
+        vMax[bEmpty] = np.nan
+        mean[bEmpty] = np.nan
+        std = np.sqrt(M2/count)
+    R = {'x':x, 'n':count, 'min':vMin, 'max':vMax, 'mean':mean, 'std':std, 'percentiles':{}}
+    if len(percentiles)==0:
+        return R
+    # --- Pass 2: histograms at each grid point
+    width = (vMax-vMin)/nBins
+    width[~(width>0)] = 1 # constant signal or empty
+    nMax  = np.max(count)
+    dtype = np.uint8 if nMax<2**8 else (np.uint16 if nMax<2**16 else np.uint32)
+    H = np.zeros(nx*nBins, dtype=dtype)
+    offset = np.arange(nx)*nBins
+    for xs, ys in series():
+        y = onGrid(xs, ys)
+        b = ~np.isnan(y)
+        j = np.clip(((y[b]-vMin[b])/width[b]).astype(int), 0, nBins-1)
+        H[offset[b]+j] += 1 # one value per grid point, the indices are unique
+    H = H.reshape(nx, nBins)
+    for p in percentiles:
+        R['percentiles'][p] = np.empty(nx)
+    # Percentiles by chunks of grid points, to limit the size of the cumulative histograms
+    nChunk = max(2**20//nBins, 1)
+    for i0 in range(0, nx, nChunk):
+        i1  = min(i0+nChunk, nx)
+        Hc  = H[i0:i1]
+        cum = np.cumsum(Hc, axis=1, dtype=np.int64)
+        I   = np.arange(i1-i0)
+        # The rows of cum are sorted, shifted by row such that the flattened array is sorted
+        shift = I*(nMax+1)
+        key   = (cum + shift[:,None]).ravel()
+        for p in percentiles:
+            t = p/100.*count[i0:i1]
+            j = np.searchsorted(key, np.ceil(t).astype(np.int64)+shift, side='left') - I*nBins # bin where the percentile is
+            j = np.minimum(j, nBins-1)
+            cLow = np.where(j>0, cum[I, np.maximum(j-1,0)], 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                frac = np.clip(np.where(Hc[I,j]>0, (t-cLow)/Hc[I,j], 0), 0, 1)
+            v = vMin[i0:i1] + (j+frac)*width[i0:i1]
+            v = np.minimum(v, vMax[i0:i1])
+            bCst = vMax[i0:i1]==vMin[i0:i1]
+            v[bCst] = vMin[i0:i1][bCst]
+            R['percentiles'][p][i0:i1] = v
+    return R
+
+
 def mean_rel_err(t1, y1, t2, y2, method='mean'):
     """ 
     Methods: 
@@ -84,8 +535,12 @@ def mean_rel_err(t1, y1, t2, y2, method='mean'):
 # --------------------------------------------------------------------------------}
 # --- PDF 
 # --------------------------------------------------------------------------------{
-def pdf_histogram(y,nBins=50, norm=True, count=False):
-    yh, xh = np.histogram(y[~np.isnan(y)], bins=nBins)
+def pdf_histogram(y,nBins=50, norm=True, count=False, hasNaN=None):
+    """ hasNaN: if False, y is known to have no NaN and is used as is """
+    y = np.asarray(y)
+    if hasNaN is not False:
+        y = y[~np.isnan(y)]
+    yh, xh = np.histogram(y, bins=nBins)
     dx   = xh[1] - xh[0]
     xh  = xh[:-1] + dx/2
     if count:
@@ -96,7 +551,7 @@ def pdf_histogram(y,nBins=50, norm=True, count=False):
         yh=yh/np.trapz(yh,xh)
     return xh,yh
 
-def pdf_gaussian_kde(data, bw='scott', nOut=100, cut=3, clip=(-np.inf,np.inf)):
+def pdf_gaussian_kde(data, bw='scott', nOut=100, cut=3, clip=(-np.inf,np.inf), hasNaN=None):
     """ 
     Returns a smooth probability density function (univariate kernel density estimate - kde) 
     Inspired from `_univariate_kdeplot` from `seaborn.distributions`
@@ -105,6 +560,7 @@ def pdf_gaussian_kde(data, bw='scott', nOut=100, cut=3, clip=(-np.inf,np.inf)):
         bw:  float defining bandwidth or method (string) to find it (more or less sigma)   
         cut: number of bandwidth kept for x axis (e.g. 3 sigmas)
         clip: (xmin, xmax) values
+        hasNaN: if False, data is known to have no NaN and is used as is
     OUTPUTS:
         x, y: where y(x) = pdf(data)
     """
@@ -112,7 +568,8 @@ def pdf_gaussian_kde(data, bw='scott', nOut=100, cut=3, clip=(-np.inf,np.inf)):
     from six import string_types
 
     data = np.asarray(data)
-    data = data[~np.isnan(data)]
+    if hasNaN is not False:
+        data = data[~np.isnan(data)]
     # Gaussian kde
     kde  = stats.gaussian_kde(data, bw_method = bw)
     # Finding a relevant support (i.e. x values)
@@ -0,0 +1,123 @@
+from __future__ import absolute_import
+import numpy as np
+
+
+def prof_rainflow(nRows=[30000, 10**6]):
+    """ Rainflow counting, reference python implementation vs fast engine (numba if installed) """
+    from pydatview.perfmon import Timer
+    from pydatview.tools import fatigue
+    from pydatview.tools.fatigue import rainflow_astm, rainflow_windap
+    print('numba: {}'.format(fatigue._njit is not None))
+    rainflow_astm(np.random.normal(0,1,100)) # JIT compilation
+    rainflow_windap(np.random.normal(0,1,100))
+    for nRow in nRows:
+        # 50Hz signal, wind-like: slow variations and turbulence
+        t = np.arange(nRow)/50
+        y = np.sin(2*np.pi*0.1*t) + 0.5*np.sin(2*np.pi*1.2*t) + np.random.normal(0,0.2,nRow)
+        with Timer('ASTM   ref  - {}'.format(nRow)):
+            a1 = rainflow_astm(y, fast=False)
+        with Timer('ASTM   fast - {}'.format(nRow)):
+            a2 = rainflow_astm(y)
+        with Timer('Windap ref  - {}'.format(nRow)):
+            w1 = rainflow_windap(y, fast=False)
+        with Timer('Windap fast - {}'.format(nRow)):
+            w2 = rainflow_windap(y)
+        np.testing.assert_array_equal(a1, a2)
+        np.testing.assert_array_equal(w1, w2)
+
+
+def prof_leq(nRow=30000, m=[3,4,5,7,8,9,10,12]):
+    """ Equivalent loads of the InfoPanel (eight Wohler exponents), one count per exponent vs shared count """
+    from pydatview.perfmon import Timer
+    from pydatview.plotdata import PlotData
+    from pydatview.tools.fatigue import eq_load
+    t = np.arange(nRow)/50
+    y = np.sin(2*np.pi*0.1*t) + 0.5*np.sin(2*np.pi*1.2*t) + np.random.normal(0,0.2,nRow)
+    with Timer('One count per m - {}'.format(len(m))):
+        for mi in m:
+            eq_load(y, m=mi, neq=t[-1])
+    PD = PlotData(t, y)
+    with Timer('Shared count    - {}'.format(len(m))):
+        for mi in m:
+            PD.leq(m=mi)
+
+
+def prof_batch(nSources=20, nChannels=10, nRow=30000):
+    """ Batch equivalent loads of many channels and sources, serial vs process pool """
+    import multiprocessing
+    import pandas as pd
+    from pydatview.perfmon import Timer
+    from pydatview.tools.fatigue import eq_load_batch
+    t = np.arange(nRow)/50
+    channels = ['c{}'.format(j) for j in range(nChannels)]
+    dfs = [pd.DataFrame(dict([(c, np.sin(2*np.pi*0.1*t) + np.random.normal(0,0.2,nRow)) for c in channels])) for i in range(nSources)]
+    print('Cores: {}'.format(multiprocessing.cpu_count()))
+    with Timer('Serial - {}x{}'.format(nSources, nChannels)):
+        eq_load_batch(dfs, channels, weights=np.ones(nSources), nProcesses=1, verbose=False)
+    with Timer('Pool   - {}x{}'.format(nSources, nChannels)):
+        eq_load_batch(dfs, channels, weights=np.ones(nSources), verbose=True)
+
+
+def prof_streaming(nRow=10**7, chunk_size=10**6):
+    """ Rainflow counting of a long memory-mapped signal, single pass vs streaming by chunks (peak memory) """
+    import os
+    import tempfile
+    import tracemalloc
+    from pydatview.perfmon import Timer
+    from pydatview.tools.fatigue import rainflow_astm, RainflowCounter
+    t = np.arange(nRow)/50
+    fname = os.path.join(tempfile.mkdtemp(), 'signal.dat')
+    (np.sin(2*np.pi*0.1*t) + 0.5*np.sin(2*np.pi*1.2*t) + np.random.normal(0,0.2,nRow)).tofile(fname)
+    del t
+    mm = np.memmap(fname, dtype=np.float64, mode='r')
+    rainflow_astm(np.random.normal(0,1,100)) # JIT compilation
+    RainflowCounter().add(np.random.normal(0,1,100))
+    with Timer('Single pass - {}'.format(nRow)):
+        ampl, mean = rainflow_astm(np.asarray(mm))
+    # Histogram accumulated by chunks, the cycles are not kept
+    bins = np.linspace(0, np.max(ampl), 47)
+    with Timer('Streaming   - {}'.format(nRow)):
+        rf = RainflowCounter(keep=False)
+        hist = np.zeros(len(bins)-1)
+        for i in range(0, nRow, chunk_size):
+            hist += np.histogram(rf.add(mm[i:i+chunk_size])[0], bins)[0]
+        hist += np.histogram(rf.cycles()[0], bins)[0]
+    np.testing.assert_array_equal(hist, np.histogram(ampl, bins)[0])
+    # Peak memory
+    tracemalloc.start()
+    rainflow_astm(np.asarray(mm))
+    print('Single pass - peak memory: {:.0f}MB'.format(tracemalloc.get_traced_memory()[1]/1e6))
+    tracemalloc.stop()
+    tracemalloc.start()
+    rf = RainflowCounter(keep=False)
+    for i in range(0, nRow, chunk_size):
+        rf.add(mm[i:i+chunk_size])
+    print('Streaming   - peak memory: {:.0f}MB - residue: {}'.format(tracemalloc.get_traced_memory()[1]/1e6, len(rf.residue)))
+    tracemalloc.stop()
+    del mm
+    os.remove(fname)
+
+
+def prof_markov(nChannels=50, nRow=30000, nBins=20):
+    """ Cycle matrices of many channels, one cycle_matrix per channel vs cycle_matrices """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.fatigue import cycle_matrix, cycle_matrices, rainflow_astm
+    t = np.arange(nRow)/50
+    Y = [np.sin(2*np.pi*0.1*t) + 0.5*np.sin(2*np.pi*1.2*t) + np.random.normal(0,0.2,nRow) for i in range(nChannels)]
+    rainflow_astm(Y[0]) # JIT compilation
+    with Timer('cycle_matrix   - {}'.format(nChannels)):
+        C1 = [cycle_matrix(y, nBins, nBins, rainflow_astm)[0] for y in Y]
+    with Timer('cycle_matrices - {}'.format(nChannels)):
+        C2 = cycle_matrices(Y, nBins, nBins, rainflow_astm)[0]
+    np.testing.assert_array_equal(np.array(C1), C2)
+
+
+if __name__ == '__main__':
+    import sys
+    import os
+    sys.path.append(os.getcwd())
+    prof_rainflow()
+    prof_leq()
+    prof_batch()
+    prof_streaming()
+    prof_markov()
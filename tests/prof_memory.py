@@ -0,0 +1,37 @@
+from __future__ import absolute_import
+import numpy as np
+
+
+def prof_plotdata_memory(nRow=10**6, nCols=20):
+    """ Peak memory used to create the PlotData of all the channels of a table,
+    with and without mask, as function of the index column (shared x) """
+    import tracemalloc
+    import pandas as pd
+    from pydatview.Tables import Table
+    from pydatview.plotdata import PlotData
+    d = dict([('col{}'.format(i), np.random.normal(0,1,nRow)) for i in range(nCols)])
+    tab = Table(data=pd.DataFrame(data=d))
+    del d
+    MB = nRow*8/1024**2
+    print('Size of one channel: {:.1f}MB'.format(MB))
+    for maskString in ['', '{col0}>0']:
+        tab.clearMask()
+        if len(maskString)>0:
+            tab.applyMaskString(maskString, bAdd=False)
+        tracemalloc.start()
+        PDs = []
+        for iy in range(1, nCols+1):
+            PD = PlotData()
+            PD.fromIDs([tab], iy-1, (0, 0, iy, 'Index', 'col{}'.format(iy-1), ''), SameCol=False)
+            PDs.append(PD)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del PDs
+        print('Mask: {:10s} - {} series - peak memory {:7.1f}MB ({:.2f} per series, in channel size)'.format(maskString, nCols, peak/1024**2, peak/1024**2/nCols/MB))
+
+
+if __name__ == '__main__':
+    import sys
+    import os
+    sys.path.append(os.getcwd())
+    prof_plotdata_memory()
@@ -0,0 +1,69 @@
+from __future__ import absolute_import
+import numpy as np
+
+
+def prof_filters(nRow=10**7, nRowLoop=10**5):
+    """ Filters of the Filter tool, sample by sample recursion (python loop) vs vectorized """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.signal import lowpass1, highpass1, recursion1, applyFilter, FILTERS
+    dt = 0.01
+    y = np.cumsum(np.random.normal(0,1,nRow))
+    tau = 1/(2*np.pi*1.0)
+    alpha = dt/(tau+dt)
+    import time
+    t0 = time.time()
+    y_filt=np.zeros(nRowLoop)
+    y_filt[0]=y[0]
+    for i in np.arange(1,nRowLoop):
+        y_filt[i]=alpha*y[i] + (1-alpha)*y_filt[i-1]
+    print('Loop (previous implementation) - {} - Estimated: {:.2f}s'.format(nRow, (time.time()-t0)*nRow/nRowLoop))
+    with Timer('Low pass  - {}'.format(nRow)):
+        y1 = lowpass1(y, dt, fc=1.0)
+    np.testing.assert_allclose(y1[:nRowLoop], y_filt)
+    with Timer('Numpy scan - {}'.format(nRow)):
+        recursion1(alpha*y, 1-alpha, blockSize=int(np.log(1e4)/alpha))
+    with Timer('High pass - {}'.format(nRow)):
+        highpass1(y, dt, fc=1.0)
+    x = np.arange(nRow)*dt
+    for filt in FILTERS[3:]:
+        with Timer(filt['name']):
+            applyFilter(x, y, filt)
+
+
+def prof_filter_table(nRow=10**5, nCol=500):
+    """ Filtered copy of a table, column by column vs by blocks of columns (and threads) """
+    import pandas as pd
+    import tracemalloc
+    import multiprocessing
+    from pydatview.perfmon import Timer
+    from pydatview.tools.signal import applyFilter, applyFilterDF, FILTERS
+    dt = 0.01
+    df = pd.DataFrame(np.cumsum(np.random.normal(0,1,(nRow,nCol)),axis=0), columns=['y{}'.format(i) for i in range(nCol)])
+    df.insert(0, 'Time', np.arange(nRow)*dt)
+    print('Table size: {:.0f}MB'.format(df.memory_usage().sum()/1024**2))
+    x = df['Time'].values
+    nThreads = multiprocessing.cpu_count()
+    for filt in [FILTERS[1], FILTERS[3]]:
+        with Timer('{} - columns'.format(filt['name'][:10])):
+            df1 = pd.DataFrame(dict([(c, applyFilter(x, df[c].values, filt)) for c in df.columns[1:]]))
+        with Timer('{} - blocks'.format(filt['name'][:10])):
+            df2 = applyFilterDF(df, 'Time', filt, nThreads=1)
+        with Timer('{} - {} threads'.format(filt['name'][:10], nThreads)):
+            df3 = applyFilterDF(df, 'Time', filt, nThreads=nThreads)
+        np.testing.assert_allclose(df2[df.columns[1:]].values, df1.values)
+        np.testing.assert_allclose(df3.values, df2.values)
+    # Memory used in addition to the new table
+    for blockBytes in [2**26, 2**40]:
+        tracemalloc.start()
+        applyFilterDF(df, 'Time', FILTERS[3], blockBytes=blockBytes, nThreads=1)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('Block of {:.0f}MB - memory peak: {:.0f}MB'.format(min(blockBytes, 8*nRow*nCol)/1024**2, peak/1024**2))
+
+
+if __name__ == '__main__':
+    import sys
+    import os
+    sys.path.append(os.getcwd())
+    prof_filters()
+    prof_filter_table()
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+import numpy as np
+
+
+def prof_fft_batch(nRows=[10**3,10**5], nChannels=[1,10,100]):
+    """ FFT of many channels of a table, one series at a time vs batched """
+    from pydatview.perfmon import Timer
+    from pydatview.plotdata import PlotData, fftMultiplePD
+    for nRow in nRows:
+        x  = np.linspace(0,1000,nRow)
+        for nCols in nChannels:
+            Y = np.random.normal(0,1,(nCols,nRow))
+            PDs = [PlotData(x, y) for y in Y]
+            with Timer('One by one - {}x{}'.format(nCols, nRow)):
+                for p in PDs:
+                    p.toFFT(yType='PSD', avgMethod='Welch', nExp=7)
+            PDs = [PlotData(x, y) for y in Y]
+            with Timer('Batched    - {}x{}'.format(nCols, nRow)):
+                fftMultiplePD(PDs, yType='PSD', avgMethod='Welch', nExp=7)
+
+
+def prof_welch_memory(nRow=10**7, nperseg=2**12):
+    """ Peak memory of Welch, all segments materialized vs averaged by blocks """
+    import tracemalloc
+    from pydatview.perfmon import Timer
+    from pydatview.tools.spectral import _spectral_helper, hamming
+    y = np.random.normal(0,1,nRow)
+    win = hamming(nperseg, True)
+    for label, average in [('All segments', False), ('Blocks      ', True)]:
+        tracemalloc.start()
+        with Timer(label):
+            _spectral_helper(y, y, 1, win, detrend='constant', scaling='density', mode='psd', average=average)
+        print('Peak memory: {:.1f}MB'.format(tracemalloc.get_traced_memory()[1]/1e6))
+        tracemalloc.stop()
+
+
+def prof_cross(nRow=10**5, nResponses=[1,10,100], nperseg=2**10):
+    """ Cross-spectra of N responses against one reference, pairwise csd vs shared reference FFTs """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.spectral import csd, cross_spectra
+    x = np.random.normal(0,1,nRow)
+    for n in nResponses:
+        Y = np.random.normal(0,1,(n,nRow)) + x
+        with Timer('Pairwise csd - {}'.format(n)):
+            csd(x, x, nperseg=nperseg)
+            for y in Y:
+                csd(y, y, nperseg=nperseg)
+                csd(x, y, nperseg=nperseg)
+        with Timer('Shared ref   - {}'.format(n)):
+            cross_spectra(x, Y, nperseg=nperseg)
+
+
+def prof_fft_backend(nRows=[2**20, 10**6, 1000003]):
+    """ PSD without averaging for each FFT backend, power of 2, composite and prime lengths """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.spectral import psd, set_fft_backend, _scipy_fft
+    backends = [('numpy', 1, False), ('numpy', 1, True)]
+    if _scipy_fft is not None:
+        backends += [('scipy', 1, False), ('scipy', -1, False), ('scipy', -1, True)]
+    prev = set_fft_backend()
+    for nRow in nRows:
+        y = np.random.normal(0,1,nRow)
+        for name, workers, fast_len in backends:
+            set_fft_backend(name, workers=workers)
+            with Timer('{} w={:2d} {} {}'.format(name, workers, 'pad' if fast_len else '   ', nRow)):
+                psd(y, fs=1, fast_len=fast_len)
+    set_fft_backend(**prev)
+
+
+def prof_zoom(nRow=10**7, fs=1000, fmax=5, nExp=12):
+    """ Welch PSD up to fmax, full spectrum clipped vs zoom (decimated) spectrum """
+    import tracemalloc
+    from pydatview.perfmon import Timer
+    from pydatview.tools.spectral import psd_wrap
+    t = np.arange(nRow)/fs
+    y = np.sin(2*np.pi*1*t) + np.random.normal(0,1,nRow)
+    for label, f in [('Full', None), ('Zoom', fmax)]*2: # second pass without import time
+        tracemalloc.start()
+        with Timer(label):
+            frq, PSD, Info = psd_wrap(t, y, dt=1/fs, averaging='Welch', nExp=nExp, fmax=f)
+        print('Peak memory: {:.1f}MB - bins below {}Hz: {}'.format(tracemalloc.get_traced_memory()[1]/1e6, fmax, np.sum(frq<=fmax)))
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    import sys
+    import os
+    sys.path.append(os.getcwd())
+    prof_fft_batch()
+    prof_welch_memory()
+    prof_cross()
+    prof_fft_backend()
+    prof_zoom()
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+import numpy as np
+
+
+def prof_fused_stats(nRow=10**7):
+    """ Compare the multi-pass statistics of PlotData with the fused kernel """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.stats import fused_stats
+    x = np.linspace(0,1,nRow)
+    y = np.random.normal(0,1,nRow)
+    y[::1000] = np.nan
+    for i in range(2):
+        with Timer('Multi-pass'):
+            xMin = np.nanmin(x)
+            xMax = np.nanmax(x)
+            yMin = np.nanmin(y)
+            yMax = np.nanmax(y)
+            xAtYMin = x[np.where(y == yMin)[0][0]]
+            xAtYMax = x[np.where(y == yMax)[0][0]]
+            yStd  = np.nanstd(y)
+            yMean = np.nanmean(y)
+        with Timer('Fused'):
+            xStats = fused_stats(x, moments=False)
+            yStats = fused_stats(y)
+    np.testing.assert_almost_equal(yStats['mean'], yMean)
+    np.testing.assert_almost_equal(yStats['std'] , yStd)
+    np.testing.assert_equal(x[yStats['argmin']], xAtYMin)
+    np.testing.assert_equal(x[yStats['argmax']], xAtYMax)
+
+
+def prof_batch_stats(nRow=10**3, nChannels=[10,100,1000]):
+    """ Statistics of many channels of a table, one series at a time vs batched """
+    import pandas as pd
+    from pydatview.perfmon import Timer
+    from pydatview.plotdata import PlotData, statsMultiplePD
+    x  = np.linspace(0,1,nRow)
+    for nCols in nChannels:
+        df = pd.DataFrame(data=dict([('col{}'.format(i), np.random.normal(0,1,nRow)) for i in range(nCols)]))
+        PDs = [PlotData(x, df.iloc[:,i].values) for i in range(nCols)]
+        with Timer('One by one  - {} channels'.format(nCols)):
+            for p in PDs:
+                p._range0()
+        PDs = [PlotData(x, df.iloc[:,i].values) for i in range(nCols)]
+        with Timer('Batched     - {} channels'.format(nCols)):
+            statsMultiplePD(PDs)
+
+
+def prof_hasNaN(nRow=10**7):
+    """ NaN-aware vs fast paths, for a signal with and without NaN """
+    from pydatview.perfmon import Timer
+    from pydatview.tools.stats import fused_stats, pdf_histogram
+    from pydatview.tools.spectral import fft_wrap
+    from pydatview.tools.fatigue import eq_load
+    t = np.linspace(0,1000,nRow)
+    y = np.random.normal(0,1,nRow)
+    yNaN = y.copy()
+    yNaN[::1000] = np.nan
+    for label, v, flag in [('NaN    ', yNaN, None), ('No NaN ', y, None), ('Flagged', y, False)]:
+        with Timer('{} - stats'.format(label)):
+            fused_stats(v, hasNaN=flag)
+        with Timer('{} - PDF  '.format(label)):
+            pdf_histogram(v, nBins=50, hasNaN=flag)
+        with Timer('{} - FFT  '.format(label)):
+            fft_wrap(t, v, dt=t[1]-t[0], output_type='PSD', averaging='Welch', hasNaN=flag)
+    # NOTE: rainflow counting does not support NaN, the NaN-aware functions are only used when needed
+    with Timer('No NaN  - Leq  '):
+        eq_load(y[:nRow//10], m=10, neq=1)
+
+
+def prof_ensemble(nRow=10**4, nTables=[10,100,1000]):
+    """ Ensemble statistics of many tables, stacked arrays vs streamed """
+    import tracemalloc
+    from pydatview.perfmon import Timer
+    from pydatview.tools.stats import ensemble_stats
+    x = np.linspace(0,1,nRow)
+    for n in nTables:
+        gen = lambda: ((x, np.sin(x+i)+np.random.normal(0,0.1,nRow)) for i in range(n))
+        tracemalloc.start()
+        with Timer('Stacked  - {} tables'.format(n)):
+            Y = np.array([y for _,y in gen()])
+            np.mean(Y,axis=0); np.std(Y,axis=0); np.percentile(Y,[5,50,95],axis=0)
+        del Y
+        print('Peak memory: {:.1f}MB'.format(tracemalloc.get_traced_memory()[1]/1e6))
+        tracemalloc.stop()
+        tracemalloc.start()
+        with Timer('Streamed - {} tables'.format(n)):
+            ensemble_stats(gen, percentiles=[5,50,95])
+        print('Peak memory: {:.1f}MB'.format(tracemalloc.get_traced_memory()[1]/1e6))
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    import sys
+    import os
+    sys.path.append(os.getcwd())
+    prof_fused_stats()
+    prof_batch_stats()
+    prof_hasNaN()
+    prof_ensemble()
@@ -42,5 +42,73 @@ class TestTable(unittest.TestCase):
         #      self.tabList.from_dataframes(dataframes=dfs, names=names, bAdd=bAdd)
         #
 
+    def test_table_hasNaN(self):
+        # --- NaN flags are computed at load and updated when columns are modified
+        df = self.df1.copy()
+        df.iloc[3,1] = np.nan
+        t=Table(data=df)
+        self.assertEqual([t.hasNaN(i) for i in range(3)], [False, False, True])
+        t.addColumn('ColC', np.full(100, np.nan), i=0)
+        self.assertEqual([t.hasNaN(i) for i in range(4)], [False, True, False, True])
+        t.setColumn('ColC', np.zeros(100), 1)
+        t.deleteColumns([2])
+        self.assertEqual([t.hasNaN(i) for i in range(3)], [False, False, False])
+
+    def test_table_getColumn(self):
+        # --- Columns are views or shared arrays, the mask is applied once
+        t=Table(data=self.df1.copy())
+        x1,_,_,_ = t.getColumn(0)
+        x2,_,_,_ = t.getColumn(0)
+        self.assertTrue(x1 is x2)
+        np.testing.assert_equal(x1, np.arange(100))
+        t.applyMaskString('{ColA}>1.5', bAdd=False)
+        I = np.flatnonzero(self.df1['ColA'].values>1.5)
+        x1,_,_,_ = t.getColumn(0)
+        y1,_,_,c = t.getColumn(2)
+        y2,_,_,_ = t.getColumn(2)
+        np.testing.assert_equal(x1, I)
+        np.testing.assert_equal(y1, self.df1['ColB'].values[I])
+        np.testing.assert_equal(c.values, y1)
+        self.assertTrue(y1 is y2)
+        t.clearMask()
+        y1,_,_,_ = t.getColumn(2)
+        self.assertEqual(len(y1), 100)
+
+    def test_table_spectrum(self):
+        # --- Spectrum stored by the table, reused when only the output type changes
+        from pydatview.plotdata import PlotData
+        from pydatview.tools.spectral import fft_wrap
+        t=Table(data=self.df1.copy())
+        PDs=[]
+        for yType, xType in [('PSD','1/x'), ('Amplitude','x'), ('f x PSD','1/x')]:
+            PD=PlotData()
+            PD.fromIDs([t], 0, [0, 1, 2, 'ColA', 'ColB', 'tab'], True)
+            PD.toFFT(yType=yType, xType=xType, avgMethod='Welch', nExp=5)
+            f, Y, _ = fft_wrap(self.df1['ColA'].values, self.df1['ColB'].values, output_type=yType, averaging='Welch', averaging_window='Hamming', detrend=True, nExp=5)
+            np.testing.assert_almost_equal(PD.y, Y)
+            PDs.append(PD)
+        self.assertEqual(len(t._spectra), 1)
+        self.assertTrue(np.shares_memory(PDs[0].y, t._spectra[(1,2)][1][1])) # view on the stored PSD
+        # Transform options and data changes trigger a new computation
+        PD.fromIDs([t], 0, [0, 1, 2, 'ColA', 'ColB', 'tab'], True)
+        PD.toFFT(yType='PSD', avgMethod='Welch', nExp=4)
+        self.assertEqual(t._spectra[(1,2)][0][3], 4)
+        t.applyMaskString('{ColA}>1.5', bAdd=False)
+        self.assertEqual(len(t._spectra), 0)
+
+    def test_table_filter(self):
+        # --- Filtered copy of the whole table, x column unchanged
+        from pydatview.Tables import TableList
+        from pydatview.tools.signal import applyFilter, FILTERS
+        tabs=TableList([Table(data=self.df1.copy()), Table(data=self.df2.copy())])
+        filt=FILTERS[0].copy()
+        filt['param']=5
+        dfs, names, errors = tabs.applyFiltering(1, filt, bAdd=True)
+        self.assertEqual(len(dfs), 2)
+        self.assertEqual(len(errors), 0)
+        self.assertTrue(names[0].endswith('_filtered'))
+        np.testing.assert_equal(dfs[1]['ColA'].values, self.df2['ColA'].values)
+        np.testing.assert_almost_equal(dfs[1]['ColB'].values, applyFilter(None, self.df2['ColB'].values, filt))
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,7 @@ import matplotlib.pyplot as plt
 
 
 from pydatview.plotdata import PlotData
+from pydatview.common import pretty_num
 
 class TestPlotData(unittest.TestCase):
 
@@ -26,6 +27,83 @@ class TestPlotData(unittest.TestCase):
         self.assertAlmostEqual(Y[i],A)
         self.assertAlmostEqual(f[i],f0)
 
+    def test_FFT_batch(self):
+        # --- FFT of several channels sharing x, computed at once, same as one by one
+        from pydatview.plotdata import fftMultiplePD
+        t = np.arange(0,100,0.1)
+        Y = [np.sin(2*np.pi*f*t) + np.random.normal(0,0.1,len(t)) for f in [0.5, 1, 2]]
+        Y[2][10] = np.nan
+        for avgMethod, fMax in [('None',None), ('Welch',None), ('Welch',1)]:
+            PD1 = [PlotData(t, y) for y in Y]
+            PD2 = [PlotData(t, y) for y in Y]
+            for pd in PD1:
+                pd.toFFT(yType='PSD', avgMethod=avgMethod, nExp=6, fMax=fMax)
+            fftMultiplePD(PD2, yType='PSD', avgMethod=avgMethod, nExp=6, fMax=fMax)
+            if fMax is not None:
+                self.assertTrue(PD2[0].x[-1]<=fMax)
+            for pd1,pd2 in zip(PD1,PD2):
+                np.testing.assert_almost_equal(pd1.x, pd2.x)
+                np.testing.assert_almost_equal(pd1.y, pd2.y)
+                self.assertEqual(pd1.sy, pd2.sy)
+
+    def test_FFT_logbins(self):
+        # --- Spectrum averaged in log-spaced bins, same integral, reused spectrum
+        t = np.arange(0,1000,0.01)
+        y = np.sin(2*np.pi*1*t) + np.random.normal(0,1,len(t))
+        PD1 = PlotData(t, y, sx='Time [s]', sy='F [N]')
+        PD2 = PlotData(t, y, sx='Time [s]', sy='F [N]')
+        PD1.toFFT(yType='PSD', avgMethod='Welch', nExp=14)
+        PD2.toFFT(yType='PSD', avgMethod='Welch', nExp=14, nPerDecade=20)
+        self.assertTrue(PD2.ylen()[0]<PD1.ylen()[0]/20)
+        np.testing.assert_allclose(PD2.inty()[0], PD1.inty()[0], rtol=0.05)
+        self.assertEqual(PD1.sy, PD2.sy)
+
+    def test_spectrogram(self):
+        # --- Time-frequency map, dominant frequency as y
+        t = np.arange(0,100,0.01)
+        y = np.where(t<50, np.sin(2*np.pi*5*t), np.sin(2*np.pi*20*t))
+        PD = PlotData(t, y, sx='Time [s]', sy='F [N]')
+        PD.toSpectrogram(nExp=8, nTimeMax=50, nFreqMax=1000)
+        self.assertEqual(PD.image['z'].shape, (129, len(PD.x)))
+        self.assertTrue(len(PD.x)<=50)
+        np.testing.assert_almost_equal(PD.y[0] , 5 , 0)
+        np.testing.assert_almost_equal(PD.y[-1], 20, 0)
+        self.assertEqual(PD.sy, 'Frequency [Hz]')
+
+    def test_cross(self):
+        # --- Coherence and H1 of responses linearly related to the reference
+        from pydatview.plotdata import crossMultiplePD
+        t = np.arange(0,200,0.1)
+        x = np.random.normal(0,1,len(t))
+        PDs = [PlotData(t, x, sx='Time [s]', sy='F [N]')]
+        PDs += [PlotData(t, g*x + np.random.normal(0,0.01,len(t)), sx='Time [s]', sy='u{} [m]'.format(g)) for g in [2,3]]
+        PDc = crossMultiplePD(PDs, yType='Coherence', nExp=7)
+        self.assertEqual(len(PDc), 2)
+        for pd in PDc:
+            np.testing.assert_allclose(pd.y, 1, atol=1e-3)
+        PDc = crossMultiplePD(PDs, yType='|H1|', nExp=7)
+        for pd,g in zip(PDc,[2,3]):
+            np.testing.assert_allclose(pd.y, g, rtol=1e-2)
+        self.assertEqual(PDc[0].sy, '|H1| [m/N]')
+
+    def test_markov(self):
+        # --- Cycle matrices, one per signal or summed over the tables with the same column
+        from pydatview.plotdata import markovMultiplePD
+        from pydatview.tools.fatigue import cycle_matrix, rainflow_astm
+        np.random.seed(0)
+        t = np.arange(0,100,0.1)
+        Y = [np.sin(t)*(i+1) + np.random.normal(0,0.1,len(t)) for i in range(3)]
+        PDs = [PlotData(t, y, sx='Time [s]', sy='M [Nm]') for y in Y]
+        PDm = markovMultiplePD(PDs, nAmpl=10, nMean=5)
+        self.assertEqual(len(PDm), 3)
+        for pd, y in zip(PDm, Y):
+            np.testing.assert_array_equal(pd.image['z'], cycle_matrix(y, 10, 5, rainflow_astm)[0])
+        self.assertEqual(PDm[0].sy, 'Range [Nm]')
+        PDm = markovMultiplePD(PDs, nAmpl=10, nMean=5, bMerge=True)
+        self.assertEqual(len(PDm), 1)
+        np.testing.assert_allclose(PDm[0].Info('nCycles')[0], np.sum([cycle_matrix(y, 10, 5, rainflow_astm)[0] for y in Y]))
+        np.testing.assert_allclose(PDm[0].yMax()[0], PDm[0].image['y'][-1])
+
     def test_MinMax(self):
         # Test Min Max scaling (between 0 and 1)
         x = np.linspace(-2,2,100)
@@ -37,6 +115,171 @@ class TestPlotData(unittest.TestCase):
         self.assertAlmostEqual(np.max(PD.x),1.0)
         self.assertAlmostEqual(np.max(PD.y),1.0)
 
+    def test_stats(self):
+        # --- Test the (fused) statistics against the numpy nan-functions
+        x = np.linspace(0,10,200001)
+        y = np.sin(x) + x/10
+        y[[10,5000,150000]] = np.nan
+        PD = PlotData(x,y)
+        np.testing.assert_almost_equal(PD.y0Mean()[0], np.nanmean(y))
+        np.testing.assert_almost_equal(PD.y0Std()[0] , np.nanstd(y))
+        self.assertEqual(PD.y0Min()[0], np.nanmin(y))
+        self.assertEqual(PD.y0Max()[0], np.nanmax(y))
+        self.assertEqual(PD.xAtYMin()[0], x[np.nanargmin(y)])
+        self.assertEqual(PD.xAtYMax()[0], x[np.nanargmax(y)])
+        self.assertEqual(PD._x0Max[0], 10)
+        self.assertEqual(PD.y0Mean()[1], pretty_num(np.nanmean(y)))
+
+    def test_lazy_stats(self):
+        # --- Statistics are cached until the data changes
+        x = np.linspace(0,1,101)
+        PD = PlotData(x,x**2)
+        self.assertEqual(len(PD._cache), 0)
+        np.testing.assert_almost_equal(PD.inty()[0], 1/3, 4)
+        self.assertTrue(PD.inty() is PD.inty())
+        PD.y = 2*x**2
+        np.testing.assert_almost_equal(PD.inty()[0], 2/3, 4)
+        self.assertEqual(PD.yMax()[0], 2)
+        # Original data stats are kept
+        self.assertEqual(PD.y0Max()[0], 1)
+
+    def test_window_stats(self):
+        # --- Statistics between measurements and within a zoom window
+        x = np.linspace(0,10,1001)
+        y = np.sin(x)
+        y[500] = np.nan
+        PD = PlotData(x,y)
+        PD.xyMeas1 = [x[700], y[700]]
+        PD.xyMeas2 = [x[100], y[100]]
+        np.testing.assert_almost_equal(PD.yMeanMeas()[0], np.nanmean(y[100:700]))
+        np.testing.assert_almost_equal(PD.yStdMeas()[0] , np.nanstd (y[100:700]))
+        self.assertEqual(PD.yMinMeas()[0]   , np.nanmin(y[100:700]))
+        self.assertEqual(PD.xAtYMaxMeas()[0], x[100+np.nanargmax(y[100:700])])
+        I = (x>=2) & (x<=8)
+        np.testing.assert_almost_equal(PD.yMeanZoom((2,8))[0], np.nanmean(y[I]))
+        self.assertEqual(PD.yMaxZoom((8,2))[0], np.nanmax(y[I]))
+        self.assertEqual(PD.yMinZoom(None)[1], 'NA')
+        # Large windows far from the global mean (step with a large offset)
+        np.random.seed(0)
+        y = np.concatenate((np.zeros(20000), 1e6+np.random.normal(0,1,20000)))
+        y[30000] = np.nan
+        x = np.arange(len(y))
+        PD = PlotData(x,y)
+        for i0, i1 in [(25000,26000), (29000,31001), (100,39900), (19000,21000)]:
+            I = (x>=i0) & (x<=i1)
+            np.testing.assert_allclose(PD.yStdZoom((i0,i1))[0] , np.nanstd (y[I]), rtol=1e-8)
+            np.testing.assert_allclose(PD.yMeanZoom((i0,i1))[0], np.nanmean(y[I]), rtol=1e-12)
+        # Segment tree of the block moments, random windows
+        from pydatview.tools.stats import RangeStatsIndex
+        R = RangeStatsIndex(y[19000:21000], blockSize=4)
+        for i0, i1 in np.sort(np.random.randint(0, 2000, (50,2)), axis=1):
+            if i1>i0:
+                np.testing.assert_allclose(R.std(i0, i1), np.nanstd(y[19000+i0:19000+i1]), rtol=1e-8, atol=1e-12)
+
+    def test_hasNaN(self):
+        # --- Fast paths for data flagged without NaN give the same results
+        x = np.linspace(0,10,1001)
+        y = np.sin(x)
+        PD1 = PlotData(x,y)
+        PD2 = PlotData(x,y)
+        PD2.xHasNaN = False
+        PD2.yHasNaN = False
+        PD2._post_init()
+        self.assertTrue(PD1.yHasNaN is None)
+        for f in ['y0Mean','y0Std','y0Min','y0Max','xAtYMin','yMedian']:
+            self.assertEqual(getattr(PD1,f)(), getattr(PD2,f)())
+        self.assertEqual(PD1.yMaxZoom((2,8)), PD2.yMaxZoom((2,8)))
+        # Flag is reset when the data is set
+        PD2.y = y*2
+        self.assertTrue(PD2.yHasNaN is None)
+
+    def test_xSampling(self):
+        # --- Window statistics with uniform, sorted and unsorted x
+        y = np.sin(np.linspace(0,10,1001))
+        for x in [np.linspace(0,10,1001), np.linspace(0,10,1001)**2/10, np.linspace(10,0,1001)]:
+            PD = PlotData(x,y)
+            I = (x>=2) & (x<=8)
+            np.testing.assert_almost_equal(PD.yMeanZoom((2,8))[0], np.mean(y[I]))
+            self.assertEqual(PD.yMaxZoom((2,8))[0], np.max(y[I]))
+            PD.xyMeas1 = [x[700], y[700]]
+            PD.xyMeas2 = [x[100], y[100]]
+            self.assertEqual(PD.yMinMeas()[0], np.min(y[100:700]))
+        self.assertTrue(PlotData(np.arange(10),np.arange(10))._xSampling()['uniform'])
+
+    def test_batch_stats(self):
+        # --- Statistics of several signals at once
+        from pydatview.plotdata import statsMultiplePD
+        import pandas as pd
+        x  = np.linspace(0,1,500)
+        df = pd.DataFrame(data={'a':np.sin(x), 'b':np.cos(x), 'c':x**2})
+        df.iloc[10,1] = np.nan
+        PDs = [PlotData(x, df.iloc[:,i].values) for i in range(3)]
+        statsMultiplePD(PDs)
+        for i,PD in enumerate(PDs):
+            y = df.iloc[:,i].values
+            np.testing.assert_almost_equal(PD.y0Mean()[0], np.nanmean(y))
+            np.testing.assert_almost_equal(PD.y0Std()[0] , np.nanstd(y))
+            self.assertEqual(PD.y0Min()[0], np.nanmin(y))
+            self.assertEqual(PD.xAtYMax()[0], x[np.nanargmax(y)])
+
+    def test_ensemble(self):
+        # --- Ensemble statistics of signals from many tables, on a common x grid
+        from pydatview.plotdata import ensembleMultiplePD
+        x = np.linspace(0,10,201)
+        Y = np.array([np.sin(x+0.1*i) + 0.05*i for i in range(40)])
+        PDs = [PlotData(x, y, sx='t', sy='y') for y in Y]
+        PDe = ensembleMultiplePD(PDs, percentiles=[10,50,90])
+        self.assertEqual(len(PDe), 1)
+        R = PDe[0].ensemble
+        np.testing.assert_almost_equal(PDe[0].y, np.mean(Y,axis=0))
+        np.testing.assert_almost_equal(R['std'], np.std(Y,axis=0))
+        np.testing.assert_almost_equal(R['min'], np.min(Y,axis=0))
+        np.testing.assert_almost_equal(R['max'], np.max(Y,axis=0))
+        dY = np.max(np.diff(np.sort(Y,axis=0),axis=0))
+        for p in [10,50,90]:
+            np.testing.assert_allclose(R['percentiles'][p], np.percentile(Y,p,axis=0), atol=dY)
+        self.assertEqual(PDe[0].ensN()[0], 40)
+        # Signals on different grids are interpolated
+        PDs = [PlotData(x, x), PlotData(x[::2], 2*x[::2])]
+        R = ensembleMultiplePD(PDs, nGrid=11)[0].ensemble
+        np.testing.assert_almost_equal(R['mean'], 1.5*R['x'])
+        # More than 255 signals (larger histogram counts)
+        from pydatview.tools.stats import ensemble_stats
+        Y = np.array([np.sin(x+0.01*i) + 0.005*i for i in range(300)])
+        R = ensemble_stats([(x, y) for y in Y], percentiles=[50])
+        dY = np.max(np.diff(np.sort(Y,axis=0),axis=0))
+        np.testing.assert_allclose(R['percentiles'][50], np.percentile(Y,50,axis=0), atol=dY)
+
+    def test_compare(self):
+        # --- Comparison of tables with the same or similar columns, interpolated on the first table
+        from pydatview.plotdata import compareMultiplePD
+        x1 = np.linspace(0,10,101)
+        x2 = np.sort(np.random.uniform(0,10,80))
+        for mode in ['nTabs_SameCols','nTabs_SimCols']:
+            PDs=[]
+            for it,x in enumerate([x1,x2]):
+                for j in range(3):
+                    pd = PlotData(x, np.sin(x)*(j+1), sx='x', sy='c{}'.format(j))
+                    pd.it, pd.st = it, 'tab{}'.format(it)
+                    pd.iy = j+1 if mode=='nTabs_SameCols' else 2*j+it+1
+                    PDs.append(pd)
+            PDc = compareMultiplePD(PDs, mode, 'Absolute')
+            self.assertEqual(len(PDc), 3)
+            for j,pd in enumerate(PDc):
+                np.testing.assert_almost_equal(pd.x, x1)
+                np.testing.assert_almost_equal(pd.y, np.interp(x1, x2, np.sin(x2)*(j+1)) - np.sin(x1)*(j+1))
+
+    def test_leq(self):
+        # --- Equivalent loads for several Wohler exponents, from a single rainflow count
+        from pydatview.tools.fatigue import eq_load
+        t = np.linspace(0,600,30001)
+        y = np.sin(2*np.pi*0.1*t) + 0.5*np.sin(2*np.pi*1.2*t) + np.random.normal(0,0.1,len(t))
+        PD = PlotData(t, y)
+        for m in [3,4,5,7,8,9,10,12]:
+            np.testing.assert_allclose(PD.leq(m=m)[0], eq_load(y, m=m, neq=600)[0][0], rtol=1e-12)
+        self.assertEqual(len([k for k in PD._cache if k[0]=='_rainflowCycles']), 1)
+        self.assertTrue(np.isnan(PlotData(t, 0*t).leq(m=3)[0]))
+
     def test_PDF(self):
         # --- Test the PDF conversion of plotdata
         # Check that the PDF of random normal noise is a Gaussian
@@ -23,6 +23,17 @@ class TestSignal(unittest.TestCase):
         self.assertEqual(zero_crossings(np.array([ 1,-1]),direction='up'  )[0].size,0)
         self.assertEqual(zero_crossings(np.array([-1, 1]),direction='down')[0].size,0)
 
+    def test_sampling_info(self):
+        S = sampling_info(np.linspace(0,1,10**5+1))
+        self.assertTrue(S['uniform'])
+        np.testing.assert_almost_equal(S['dx'], 1e-5)
+        S = sampling_info(np.array([0,1,1,3]))
+        self.assertEqual((S['sorted'],S['increasing'],S['uniform'],S['dx']), (True,False,False,None))
+        S = sampling_info(np.array([0,2,1]))
+        self.assertEqual((S['sorted'],S['increasing'],S['uniform']), (False,False,False))
+        S = sampling_info(np.array(['a','b']))
+        self.assertFalse(S['sorted'])
+
     def test_up_down_sample(self):
         name = 'Time-based'
         x, y = applySampler(range(0, 4), [5, 0, 5, 0], {'name': name, 'param': [2]})
@@ -38,5 +49,53 @@ class TestSignal(unittest.TestCase):
         self.assertTrue(np.all(x==[0, 0.5, 1, 1.5, 2]))
         self.assertTrue(np.all(df["y"]==[0, 3, 6, 0, -6]))
 
+    def test_filters(self):
+        # First order filters, same as the sample by sample recursion
+        np.random.seed(0)
+        dt = 0.01
+        y  = np.cumsum(np.random.normal(0,1,5000))
+        for fc in [0.1, 10]:
+            tau = 1/(2*np.pi*fc)
+            a1, a2 = dt/(tau+dt), tau/(tau+dt)
+            y1, y2 = np.zeros(len(y)), np.zeros(len(y))
+            y1[0] = y[0]
+            for i in range(1,len(y)):
+                y1[i] = a1*y[i] + (1-a1)*y1[i-1]
+                y2[i] = a2*y2[i-1] + a2*(y[i]-y[i-1])
+            np.testing.assert_allclose(lowpass1(y, dt, fc), y1, rtol=1e-10, atol=1e-10)
+            np.testing.assert_allclose(highpass1(y, dt, fc), y2+np.mean(y)-np.mean(y2), rtol=1e-10, atol=1e-10)
+            # Blocked numpy scan
+            np.testing.assert_allclose(recursion1(y, 1-a1, y0=2, blockSize=100), recursion1(y, 1-a1, y0=2), rtol=1e-10)
+        # Butterworth: slow sine kept (no delay if zero-phase), fast sine removed
+        t  = np.arange(0, 100, dt)
+        y  = np.sin(2*np.pi*0.2*t) + np.sin(2*np.pi*20*t)
+        x = {'name':'', 'param':2, 'btype':'low', 'order':4, 'zeroPhase':True}
+        np.testing.assert_allclose(applyFilter(t, y, x)[500:-500], np.sin(2*np.pi*0.2*t)[500:-500], atol=1e-3)
+        x = {'name':'', 'param':20, 'btype':'band', 'order':4, 'zeroPhase':True}
+        np.testing.assert_allclose(applyFilter(t, y, x)[500:-500], np.sin(2*np.pi*20*t)[500:-500], atol=1e-2)
+        x = {'name':'', 'param':2, 'btype':'high', 'order':4, 'zeroPhase':False}
+        np.testing.assert_allclose(np.std(applyFilter(t, y, x)[500:]), np.sqrt(0.5), rtol=1e-2) # phase shifted
+        self.assertRaises(Exception, butter_filter, y, dt, 60)
+        for filt in FILTERS:
+            self.assertEqual(len(applyFilter(t, y, filt)), len(y))
+
+    def test_filter_table(self):
+        # All the numeric columns at once, by blocks of columns, same as column by column
+        np.random.seed(0)
+        t  = np.arange(0, 10, 0.01)
+        df = pd.DataFrame({'Time':t, 'Name':['a']*len(t)})
+        for i in range(5):
+            df['y{}'.format(i)] = np.cumsum(np.random.normal(0,1,len(t)))
+        df['i'] = np.arange(len(t))
+        Y = df[['y0','y1','y2','y3','y4']].values
+        np.testing.assert_allclose(recursion1(Y, 0.9, y0=Y[0], blockSize=100)[:,3], recursion1(Y[:,3], 0.9, y0=Y[0,3]), rtol=1e-10)
+        for filt in FILTERS:
+            df_new = applyFilterDF(df, 'Time', filt, blockBytes=2*8*len(t), nThreads=2)
+            np.testing.assert_equal(df_new.columns.values, df.columns.values)
+            np.testing.assert_equal(df_new['Name'].values, df['Name'].values)
+            np.testing.assert_equal(df_new['Time'].values, t)
+            for c in ['y0', 'y4', 'i']:
+                np.testing.assert_allclose(df_new[c].values, applyFilter(t, df[c].values.astype(float), filt), rtol=1e-10, atol=1e-10)
+
 if __name__ == '__main__':
     unittest.main()